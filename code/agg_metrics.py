@@ -0,0 +1,662 @@
+#!/usr/bin/env python3
+
+import sqlite3
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from file_paths import database_path
+
+### Computes the metrics of an agg table for every period at once
+### Metrics are tuples of (col_title, func, additional_func_args) where func
+### is the paceutils method loop_plot_df would be called with.
+### Methods with a query in batched_sql are computed for all periods in one
+### query against a TEMP calendar table (period, start_date, end_date),
+### their additional_func_args are bound to the ? parameters of the query.
+### Table name args cannot be bound, so only the tables listed for the
+### method in batched_table_args are formatted into its query.
+### All other methods are computed with loop_plot_df as before.
+### Monthly values of methods are kept for the run so quarterly values of
+### additive methods in rollups, rates in ratio_rollups and team methods
+### in team_rollups are derived from them instead of queried.
+
+batched_sql = {
+    "Enrollment.census_on_end_date": """
+        SELECT c.period, (
+            SELECT COUNT(*) FROM enrollment
+            WHERE enrollment_date <= c.end_date
+            AND (disenrollment_date >= c.end_date OR disenrollment_date IS NULL)
+        )
+        FROM calendar c;
+        """,
+    "Enrollment.enrolled": """
+        SELECT c.period, (
+            SELECT COUNT(*) FROM enrollment
+            WHERE enrollment_date BETWEEN c.start_date AND c.end_date
+        )
+        FROM calendar c;
+        """,
+    "Enrollment.disenrolled": """
+        SELECT c.period, (
+            SELECT COUNT(*) FROM enrollment
+            WHERE disenrollment_date BETWEEN c.start_date AND c.end_date
+        )
+        FROM calendar c;
+        """,
+    "Enrollment.deaths": """
+        SELECT c.period, (
+            SELECT COUNT(*) FROM enrollment
+            WHERE disenrollment_date BETWEEN c.start_date AND c.end_date
+            AND disenroll_type = 'Deceased'
+        )
+        FROM calendar c;
+        """,
+    "Enrollment.net_enrollment": """
+        SELECT c.period, (
+            SELECT COUNT(*) FROM enrollment
+            WHERE enrollment_date BETWEEN c.start_date AND c.end_date
+        ) - (
+            SELECT COUNT(*) FROM enrollment
+            WHERE disenrollment_date BETWEEN c.start_date AND c.end_date
+        )
+        FROM calendar c;
+        """,
+    "CenterEnrollment.census_on_end_date": """
+        SELECT c.period, (
+            SELECT COUNT(*) FROM enrollment
+            WHERE center = ?
+            AND enrollment_date <= c.end_date
+            AND (disenrollment_date >= c.end_date OR disenrollment_date IS NULL)
+        )
+        FROM calendar c;
+        """,
+    "CenterEnrollment.enrolled": """
+        SELECT c.period, (
+            SELECT COUNT(*) FROM enrollment
+            WHERE center = ?
+            AND enrollment_date BETWEEN c.start_date AND c.end_date
+        )
+        FROM calendar c;
+        """,
+    "CenterEnrollment.disenrolled": """
+        SELECT c.period, (
+            SELECT COUNT(*) FROM enrollment
+            WHERE center = ?
+            AND disenrollment_date BETWEEN c.start_date AND c.end_date
+        )
+        FROM calendar c;
+        """,
+    "CenterEnrollment.deaths": """
+        SELECT c.period, (
+            SELECT COUNT(*) FROM enrollment
+            WHERE center = ?
+            AND disenrollment_date BETWEEN c.start_date AND c.end_date
+            AND disenroll_type = 'Deceased'
+        )
+        FROM calendar c;
+        """,
+    "Incidents.total_incidents": """
+        SELECT c.period, (
+            SELECT COUNT(*) FROM {table}
+            WHERE date_time_occurred BETWEEN c.start_date AND c.end_date
+        )
+        FROM calendar c;
+        """,
+    "Incidents.ppts_w_incident": """
+        SELECT c.period, (
+            SELECT COUNT(DISTINCT member_id) FROM {table}
+            WHERE date_time_occurred BETWEEN c.start_date AND c.end_date
+        )
+        FROM calendar c;
+        """,
+    "Utilization.admissions_count": """
+        SELECT c.period, (
+            SELECT COUNT(*) FROM {table}
+            WHERE admission_date BETWEEN c.start_date AND c.end_date
+        )
+        FROM calendar c;
+        """,
+    "Utilization.discharges_count": """
+        SELECT c.period, (
+            SELECT COUNT(*) FROM {table}
+            WHERE discharge_date BETWEEN c.start_date AND c.end_date
+        )
+        FROM calendar c;
+        """,
+    "Utilization.unique_admissions_count": """
+        SELECT c.period, (
+            SELECT COUNT(DISTINCT member_id) FROM {table}
+            WHERE admission_date BETWEEN c.start_date AND c.end_date
+        )
+        FROM calendar c;
+        """,
+    "Utilization.weekend_admissions_count": """
+        SELECT c.period, (
+            SELECT COUNT(*) FROM {table}
+            WHERE admission_date BETWEEN c.start_date AND c.end_date
+            AND dow IN ('Saturday', 'Sunday')
+        )
+        FROM calendar c;
+        """,
+}
+
+incident_tables = ["burns", "falls", "infections", "med_errors", "wounds"]
+
+# inpatient views, er_only has no discharge_date
+stay_tables = ["acute", "psych", "skilled", "respite", "custodial", "nursing_home"]
+
+# methods whose first additional_func_arg is the table their query reads
+batched_table_args = {
+    "Incidents.total_incidents": incident_tables,
+    "Incidents.ppts_w_incident": incident_tables,
+    "Utilization.admissions_count": stay_tables + ["er_only"],
+    "Utilization.discharges_count": stay_tables,
+    "Utilization.unique_admissions_count": stay_tables + ["er_only"],
+    "Utilization.weekend_admissions_count": stay_tables + ["er_only"],
+}
+
+# how the monthly values of a method combine into a longer period,
+# methods not listed (distinct ppt counts) are queried for each period
+rollups = {
+    "Enrollment.census_on_end_date": "last",
+    "Enrollment.enrolled": "sum",
+    "Enrollment.disenrolled": "sum",
+    "Enrollment.deaths": "sum",
+    "Enrollment.net_enrollment": "sum",
+    "CenterEnrollment.census_on_end_date": "last",
+    "CenterEnrollment.enrolled": "sum",
+    "CenterEnrollment.disenrolled": "sum",
+    "CenterEnrollment.deaths": "sum",
+    "Incidents.total_incidents": "sum",
+    "Utilization.admissions_count": "sum",
+    "Utilization.discharges_count": "sum",
+    "Utilization.weekend_admissions_count": "sum",
+    "Utilization.utilization_days": "sum",
+}
+
+# rates whose value for a longer period is the sum of the monthly values
+# of a numerator over the sum of those of a denominator times a scale,
+# each component is (method name, if it takes the metric's args)
+ratio_rollups = {
+    "Utilization.admissions_per_100MM": (
+        ("admissions_count", True),
+        ("member_months", False),
+        100,
+    ),
+    "Utilization.days_per_100MM": (
+        ("utilization_days", True),
+        ("member_months", False),
+        100,
+    ),
+    "Utilization.weekend_admission_percent": (
+        ("weekend_admissions_count", True),
+        ("admissions_count", True),
+        100,
+    ),
+}
+
+# team methods whose quarterly frame is the sum of their monthly frames
+team_rollups = {
+    "Team.admissions_by_team": "sum",
+    "Team.discharges_by_team": "sum",
+    "Team.days_by_team": "sum",
+    "Team.er_only_visits_by_team": "sum",
+}
+
+# monthly values of methods computed this run,
+# (method key, args) to {start_date: (end_date, value)}
+monthly_components = {}
+
+# monthly frames of team methods computed this run,
+# (method key, args, col_suffix) to (calendar, frame)
+monthly_team_frames = {}
+
+
+def period_calendar(helper, params, freq):
+    """
+    Creates the calendar of periods loop_plot_df uses for params and freq
+
+    loop_plot_df is run with a function that records the
+    period it is called with instead of querying the database,
+    so the periods and month labels are exactly those of loop_plot_df.
+
+    Args:
+        helper(paceutils helper): instance with a loop_plot_df method
+        params(tuple): start date and end date in format 'YYYY-MM-DD'
+        freq(str): "MS" or "QS"
+
+    Returns:
+        DataFrame: month, params, start_date and end_date of each period
+    """
+    periods = []
+
+    def record_period(period_params, *args):
+        periods.append(period_params)
+        return 0
+
+    plot_df = helper.loop_plot_df(record_period, params, freq=freq)
+
+    calendar = pd.DataFrame({"month": plot_df["Month"].values})
+    calendar["params"] = periods
+    calendar["start_date"] = [
+        pd.to_datetime(period[0]).strftime("%Y-%m-%d") for period in periods
+    ]
+    calendar["end_date"] = [
+        pd.to_datetime(period[1]).strftime("%Y-%m-%d") for period in periods
+    ]
+
+    return calendar
+
+
+def create_calendar_table(conn, calendar):
+    """
+    Loads the calendar into a TEMP table for the batched queries
+
+    Args:
+        conn(Sqlite3 Connection): connection to the database
+        calendar(DataFrame): calendar from period_calendar
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.calendar;")
+    conn.execute(
+        """
+        CREATE TEMP TABLE calendar (
+            period INTEGER PRIMARY KEY,
+            start_date TEXT,
+            end_date TEXT
+        );
+        """
+    )
+    conn.executemany(
+        "INSERT INTO calendar VALUES (?, ?, ?)",
+        zip(range(calendar.shape[0]), calendar["start_date"], calendar["end_date"]),
+    )
+
+
+def metric_key(func):
+    """
+    Returns the batched_sql key of a paceutils method
+
+    Args:
+        func(method): paceutils method
+
+    Returns:
+        str: class name and method name
+    """
+    return f"{type(func.__self__).__name__}.{func.__name__}"
+
+
+def batched_query(key, args):
+    """
+    Returns the batched query of a method and the args bound to it
+
+    Args:
+        key(str): batched_sql key of the method
+        args(list): additional_func_args of the metric
+
+    Returns:
+        tuple: SQL and parameters, (None, None) if the table arg is not listed
+    """
+    if key in batched_table_args:
+        if (not args) or (args[0] not in batched_table_args[key]):
+            return None, None
+        return batched_sql[key].format(table=args[0]), tuple(args[1:])
+
+    return batched_sql[key], tuple(args)
+
+
+def rolled_up_value(components, start_date, end_date, how):
+    """
+    Combines the monthly values covering a period into its value
+
+    Args:
+        components(dict): start_date to (end_date, value) of each month
+        start_date(str): first day of the period
+        end_date(str): last day of the period
+        how(str): "sum" to add the months, "last" for the last month's value
+
+    Returns:
+        value for the period, None if the months do not cover it
+    """
+    values = []
+    month_start = start_date
+
+    while month_start in components:
+        month_end, value = components[month_start]
+        if month_end > end_date:
+            return None
+        values.append(value)
+        if month_end == end_date:
+            if any(pd.isnull(value) for value in values):
+                return None
+            return sum(values) if how == "sum" else values[-1]
+        month_start = (pd.to_datetime(month_end) + pd.DateOffset(days=1)).strftime(
+            "%Y-%m-%d"
+        )
+
+    return None
+
+
+def record_components(calendar, key, args, values):
+    """
+    Keeps the monthly values of a method for the rest of the run
+
+    Args:
+        calendar(DataFrame): monthly calendar from period_calendar
+        key(str): class name and method name
+        args(list): additional_func_args of the method
+        values(array): value for each month of the calendar
+    """
+    monthly_components.setdefault((key, tuple(args)), {}).update(
+        zip(calendar["start_date"], zip(calendar["end_date"], list(values)))
+    )
+
+
+def rolled_up_values(calendar, key, args):
+    """
+    Derives the value of a method for every period of the calendar
+    from the monthly values kept earlier in the run
+
+    Args:
+        calendar(DataFrame): calendar from period_calendar
+        key(str): class name and method name
+        args(list): additional_func_args of the method
+
+    Returns:
+        array: value for each period, None if the months do not cover them all
+    """
+    periods = list(zip(calendar["start_date"], calendar["end_date"]))
+
+    if key in rollups:
+        components = monthly_components.get((key, tuple(args)), {})
+        values = [
+            rolled_up_value(components, start_date, end_date, rollups[key])
+            for start_date, end_date in periods
+        ]
+    elif key in ratio_rollups:
+        class_name = key.split(".")[0]
+        parts = []
+        for method_name, takes_args in ratio_rollups[key][:2]:
+            components = monthly_components.get(
+                (f"{class_name}.{method_name}", tuple(args) if takes_args else ()),
+                {},
+            )
+            parts.append(
+                [
+                    rolled_up_value(components, start_date, end_date, "sum")
+                    for start_date, end_date in periods
+                ]
+            )
+        values = [
+            None
+            if pd.isnull(numerator) or pd.isnull(denominator) or denominator == 0
+            else numerator / denominator * ratio_rollups[key][2]
+            for numerator, denominator in zip(*parts)
+        ]
+    else:
+        return None
+
+    if any(value is None for value in values):
+        return None
+
+    return pd.Series(values).values
+
+
+def batched_values(conn, calendar, key, args):
+    """
+    Computes a method for every period of the calendar in one query
+
+    benchmarks.benchmark_batched_metrics checks the queries against
+    their paceutils methods.
+
+    Args:
+        conn(Sqlite3 Connection): connection with the calendar table
+        calendar(DataFrame): calendar from period_calendar
+        key(str): class name and method name
+        args(list): additional_func_args of the method
+
+    Returns:
+        array: value for each period, None if not batched
+    """
+    if key not in batched_sql:
+        return None
+
+    sql, sql_params = batched_query(key, args)
+    if sql is None:
+        return None
+
+    rows = dict(conn.execute(sql, sql_params).fetchall())
+    return pd.Series([rows.get(period) for period in range(calendar.shape[0])]).values
+
+
+def method_values(helper, conn, calendar, params, freq, func, args):
+    """
+    Computes a method for every period of the calendar, in one query
+    if it is batched and with loop_plot_df if not
+
+    Args:
+        helper(paceutils helper): instance with a loop_plot_df method
+        conn(Sqlite3 Connection): connection with the calendar table
+        calendar(DataFrame): calendar from period_calendar
+        params(tuple): start date and end date in format 'YYYY-MM-DD'
+        freq(str): "MS" or "QS"
+        func(method): paceutils method
+        args(list): additional_func_args of the method
+
+    Returns:
+        array: value for each period
+    """
+    values = batched_values(conn, calendar, metric_key(func), args)
+    if values is not None:
+        return values
+
+    if args:
+        dff = helper.loop_plot_df(func, params, freq=freq, additional_func_args=args)
+    else:
+        dff = helper.loop_plot_df(func, params, freq=freq)
+
+    return calendar["month"].map(dict(zip(dff["Month"], dff["Value"]))).values
+
+
+def record_ratio_components(helper, conn, calendar, params, key, args):
+    """
+    Computes and keeps the monthly numerator and denominator of a rate
+    in ratio_rollups that are not kept for every month yet,
+    nothing is kept if the helper has no method for a component
+
+    Args:
+        helper(paceutils helper): instance with the component methods
+        conn(Sqlite3 Connection): connection with the calendar table
+        calendar(DataFrame): monthly calendar from period_calendar
+        params(tuple): start date and end date in format 'YYYY-MM-DD'
+        key(str): class name and method name of the rate
+        args(list): additional_func_args of the rate
+    """
+    class_name = key.split(".")[0]
+
+    for method_name, takes_args in ratio_rollups[key][:2]:
+        component_args = list(args) if takes_args else []
+        component_key = f"{class_name}.{method_name}"
+        components = monthly_components.get((component_key, tuple(component_args)))
+
+        if components is not None and set(calendar["start_date"]) <= set(components):
+            continue
+
+        func = getattr(helper, method_name, None)
+        if func is None:
+            return
+
+        values = method_values(
+            helper, conn, calendar, params, "MS", func, component_args
+        )
+        record_components(calendar, component_key, component_args, values)
+
+
+def compute_metrics(helper, params, freq, metrics, rollup_quarters=True):
+    """
+    Computes metrics for each period between the params dates
+
+    Metrics with a batched query are computed for all periods in one query,
+    the rest with loop_plot_df. Quarterly values of metrics in rollups or
+    ratio_rollups are derived from the monthly values computed earlier in
+    the run when those cover every quarter. Values match those of loop_plot_df.
+
+    Args:
+        helper(paceutils helper): instance with a loop_plot_df method
+        params(tuple): start date and end date in format 'YYYY-MM-DD'
+        freq(str): "MS" or "QS" indicates if values should be grouped monthly
+            or quarterly
+        metrics(list): tuples of (col_title, func, additional_func_args)
+        rollup_quarters(bool): if quarterly values of additive metrics are
+            rolled up from the monthly values computed earlier in the run
+
+    Returns:
+        DataFrame: month column and a column for each metric
+    """
+    calendar = period_calendar(helper, params, freq)
+    columns = {"month": calendar["month"].values}
+
+    # the source database is only read, the calendar is a TEMP table
+    conn = sqlite3.connect(f"{Path(database_path).as_uri()}?mode=ro", uri=True)
+    create_calendar_table(conn, calendar)
+
+    for col_title, func, args in metrics:
+        key = metric_key(func)
+
+        values = None
+        if freq == "QS" and rollup_quarters:
+            values = rolled_up_values(calendar, key, args)
+
+        if values is None:
+            values = method_values(helper, conn, calendar, params, freq, func, args)
+
+        if freq == "MS":
+            if key in rollups:
+                record_components(calendar, key, args, values)
+            if key in ratio_rollups:
+                record_ratio_components(helper, conn, calendar, params, key, args)
+
+        columns[col_title] = values
+
+    conn.close()
+
+    # the wide frame is built once from all the columns
+    return pd.DataFrame(columns)
+
+
+def rolled_up_team_frame(calendar, months, key, args, col_suffix):
+    """
+    Derives the quarterly frame of a team method from
+    its monthly frame computed earlier in the run
+
+    Args:
+        calendar(DataFrame): quarterly calendar from period_calendar
+        months(array): month values of the quarterly team frames
+        key(str): class name and method name
+        args(list): additional_func_args of the method
+        col_suffix(str): suffix of the team columns
+
+    Returns:
+        DataFrame: month column and a column for each team,
+            None if the months do not cover every quarter
+    """
+    if (key, tuple(args), col_suffix) not in monthly_team_frames:
+        return None
+
+    month_calendar, month_frame = monthly_team_frames[(key, tuple(args), col_suffix)]
+    if (month_frame.shape[0] != month_calendar.shape[0]) or (
+        len(months) != calendar.shape[0]
+    ):
+        return None
+
+    columns = {"month": np.asarray(months)}
+    for col in month_frame.columns.drop("month"):
+        components = dict(
+            zip(
+                month_calendar["start_date"],
+                zip(month_calendar["end_date"], month_frame[col].tolist()),
+            )
+        )
+        values = [
+            rolled_up_value(components, start_date, end_date, team_rollups[key])
+            for start_date, end_date in zip(
+                calendar["start_date"], calendar["end_date"]
+            )
+        ]
+        if any(value is None for value in values):
+            return None
+        columns[col] = values
+
+    return pd.DataFrame(columns)
+
+
+def team_metric_frame(
+    helper, calendar, months, params, freq, func, args=None, col_suffix=""
+):
+    """
+    Creates the frame loop_plot_team_df creates for a team method
+
+    Quarterly frames of methods in team_rollups are derived from the
+    monthly frames computed earlier in the run when those cover every quarter.
+
+    Args:
+        helper(paceutils Team): instance with a loop_plot_team_df method
+        calendar(DataFrame): calendar from period_calendar
+        months(array): month values of the team frames
+        params(tuple): start date and end date in format 'YYYY-MM-DD'
+        freq(str): "MS" or "QS"
+        func(method): paceutils Team method
+        args(list): additional_func_args of the method
+        col_suffix(str): suffix of the team columns
+
+    Returns:
+        DataFrame: month column and a column for each team
+    """
+    key = metric_key(func)
+    args = list(args or [])
+
+    frame = None
+    if freq == "QS" and key in team_rollups:
+        frame = rolled_up_team_frame(calendar, months, key, args, col_suffix)
+
+    if frame is None:
+        if args:
+            frame = helper.loop_plot_team_df(
+                func,
+                params,
+                freq=freq,
+                additional_func_args=args,
+                col_suffix=col_suffix,
+            )
+        else:
+            frame = helper.loop_plot_team_df(
+                func, params, freq=freq, col_suffix=col_suffix
+            )
+
+    if freq == "MS" and key in team_rollups:
+        monthly_team_frames[(key, tuple(args), col_suffix)] = (calendar, frame)
+
+    return frame
+
+
+def combine_month_frames(months, frames):
+    """
+    Combines frames with a month column into one frame with a row for
+    each of months, the same as left merging each frame on month in turn
+    but the wide frame is built once instead of copied for every merge.
+    Frames already in the order of months are not copied before then.
+
+    Args:
+        months(array): month values of the combined frame
+        frames(list): DataFrames with a month column
+
+    Returns:
+        DataFrame: month column and the other columns of every frame
+    """
+    columns = {"month": np.asarray(months)}
+
+    for frame in frames:
+        if not np.array_equal(frame["month"].values, columns["month"]):
+            frame = frame.set_index("month").reindex(months).reset_index()
+        for col in frame.columns.drop("month"):
+            columns[col] = frame[col].values
+
+    return pd.DataFrame(columns)
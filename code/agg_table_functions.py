@@ -1,4 +1,5 @@
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from paceutils import (
     Enrollment,
     Demographics,
@@ -12,6 +13,13 @@ from paceutils import (
 import pandas as pd
 import sqlite3
 from data_to_sql import sql_table_utils as stu
+from agg_metrics import (
+    compute_metrics,
+    combine_month_frames,
+    period_calendar,
+    team_metric_frame,
+)
+from query_cache import cache_helper_queries, print_cache_report
 from file_paths import (
     processed_data,
     agg_db_path,
@@ -21,6 +29,48 @@ from file_paths import (
 
 end_date = pd.to_datetime("today").strftime("%Y-%m-%d")
 
+# when writes is a list, agg tables are added to it instead of written,
+# used in run_agg_tables workers so only the main process writes to agg.db
+deferred_writes = {"writes": None}
+
+
+def write_agg_table(agg_df, table_name, db_path, update, log_name):
+    """
+    Writes an aggregate table to the aggregate database
+
+    Args:
+        agg_df(DataFrame): aggregate table
+        table_name(str): name of the table in the aggregate database
+        db_path(str): path to the aggregate database
+        update(bool): if the table being updated or created
+        log_name(str): name of the log file
+
+    Output:
+        creates empty text fill in log folder so the Lugi pipeline
+            can be told the process is complete.
+    """
+    if deferred_writes["writes"] is not None:
+        deferred_writes["writes"].append(
+            (agg_df, table_name, db_path, update, log_name)
+        )
+        return
+
+    conn = sqlite3.connect(db_path)
+
+    if update:
+        stu.update_sql_table(agg_df, table_name, conn, ["month"], agg_table=True)
+
+    else:
+        stu.create_table(agg_df, table_name, conn, ["month"], agg_table=True)
+
+    conn.commit()
+    conn.close()
+
+    open(
+        f"{update_logs_folder}\\{log_name}{str(pd.to_datetime('today').date())}.txt",
+        "a",
+    ).close()
+
 
 def create_enrollment_agg_table(
     params=("2005-12-01", end_date), db_path=agg_db_path, freq="MS", update=True
@@ -47,6 +97,7 @@ def create_enrollment_agg_table(
             can be told the process is complete.
     """
     e = Enrollment()
+    cache_helper_queries(e, "enrollment")
 
     if str(update).lower() == "true":
         if freq == "MS":
@@ -70,15 +121,10 @@ def create_enrollment_agg_table(
         "conversion_rate_180_days": e.conversion_rate_180_days,
     }
 
-    enrollment_agg = e.loop_plot_df(e.census_on_end_date, params, freq=freq).rename(
-        columns={"Month": "month", "Value": "census"}
-    )
+    metrics = [("census", e.census_on_end_date, [])]
+    metrics.extend((col_title, func, []) for col_title, func in enrollment_funcs.items())
 
-    for col_title, func in enrollment_funcs.items():
-        dff = e.loop_plot_df(func, params, freq=freq).rename(
-            columns={"Month": "month", "Value": col_title}
-        )
-        enrollment_agg = enrollment_agg.merge(dff, on="month", how="left")
+    enrollment_agg = compute_metrics(e, params, freq, metrics)
 
     prev_months = [0]
     prev_months.extend(enrollment_agg["census"][:-1])
@@ -100,24 +146,7 @@ def create_enrollment_agg_table(
     else:
         table_name = "enrollment"
 
-    conn = sqlite3.connect(db_path)
-
-    if update:
-
-        stu.update_sql_table(
-            enrollment_agg, table_name, conn, ["month"], agg_table=True
-        )
-
-    else:
-        stu.create_table(enrollment_agg, table_name, conn, ["month"], agg_table=True)
-
-    conn.commit()
-    conn.close()
-
-    open(
-        f"{update_logs_folder}\\enrollment_agg{str(pd.to_datetime('today').date())}.txt",
-        "a",
-    ).close()
+    write_agg_table(enrollment_agg, table_name, db_path, update, "enrollment_agg")
 
     return enrollment_agg
 
@@ -147,6 +176,7 @@ def create_demographic_agg_table(
             can be told the process is complete.
     """
     d = Demographics()
+    cache_helper_queries(d, "demographics")
 
     if str(update).lower() == "true":
         if freq == "MS":
@@ -178,15 +208,10 @@ def create_demographic_agg_table(
         "percent_attending_dc": d.percent_attending_dc,
     }
 
-    demo_agg = d.loop_plot_df(d.avg_age, params, freq=freq).rename(
-        columns={"Month": "month", "Value": "avg_age"}
-    )
+    metrics = [("avg_age", d.avg_age, [])]
+    metrics.extend((col_title, func, []) for col_title, func in demographic_func.items())
 
-    for col_title, func in demographic_func.items():
-        dff = d.loop_plot_df(func, params, freq=freq).rename(
-            columns={"Month": "month", "Value": col_title}
-        )
-        demo_agg = demo_agg.merge(dff, on="month", how="left")
+    demo_agg = compute_metrics(d, params, freq, metrics)
 
     demo_agg.to_csv(f"{processed_data}\\demographics_agg.csv", index=False)
 
@@ -195,21 +220,7 @@ def create_demographic_agg_table(
     else:
         table_name = "demographics"
 
-    conn = sqlite3.connect(db_path)
-
-    if update:
-        stu.update_sql_table(demo_agg, table_name, conn, ["month"], agg_table=True)
-
-    else:
-        stu.create_table(demo_agg, table_name, conn, ["month"], agg_table=True)
-
-    conn.commit()
-    conn.close()
-
-    open(
-        f"{update_logs_folder}\\demographic_agg{str(pd.to_datetime('today').date())}.txt",
-        "a",
-    ).close()
+    write_agg_table(demo_agg, table_name, db_path, update, "demographic_agg")
 
     return demo_agg
 
@@ -244,6 +255,7 @@ def create_incidents_agg_tables(
             can be told the process is complete.
     """
     i = Incidents()
+    cache_helper_queries(i, incident_table)
 
     if str(update).lower() == "true":
         if freq == "MS":
@@ -292,9 +304,7 @@ def create_incidents_agg_tables(
     }
 
     all_funcs = {**incidents_func, **additonal_funcs[incident_table]}
-    df = i.loop_plot_df(
-        i.incident_per_100MM, params, freq=freq, additional_func_args=[incident_table]
-    ).rename(columns={"Month": "month", "Value": "per_100MM"})
+    metrics = [("per_100MM", i.incident_per_100MM, [incident_table])]
 
     for col_title, func in all_funcs.items():
         if col_title in [
@@ -307,15 +317,11 @@ def create_incidents_agg_tables(
             "third_degree_rate",
             "rn_assessment_percent",
         ]:
-            dff = i.loop_plot_df(func, params, freq=freq).rename(
-                columns={"Month": "month", "Value": col_title}
-            )
+            metrics.append((col_title, func, []))
         else:
-            dff = i.loop_plot_df(
-                func, params, freq=freq, additional_func_args=[incident_table]
-            ).rename(columns={"Month": "month", "Value": col_title})
+            metrics.append((col_title, func, [incident_table]))
 
-        df = df.merge(dff, on="month", how="left")
+    df = compute_metrics(i, params, freq, metrics)
 
     df.to_csv(f"{processed_data}\\{incident_table}_agg.csv", index=False)
 
@@ -324,20 +330,7 @@ def create_incidents_agg_tables(
     else:
         table_name = incident_table
 
-    conn = sqlite3.connect(db_path)
-
-    if update:
-        stu.update_sql_table(df, table_name, conn, ["month"], agg_table=True)
-
-    else:
-        stu.create_table(df, table_name, conn, ["month"], agg_table=True)
-    conn.commit()
-    conn.close()
-
-    open(
-        f"{update_logs_folder}\\{incident_table}_agg{str(pd.to_datetime('today').date())}.txt",
-        "a",
-    ).close()
+    write_agg_table(df, table_name, db_path, update, f"{incident_table}_agg")
 
     return df
 
@@ -367,6 +360,7 @@ def create_utilization_table(
             can be told the process is complete.
     """
     u = Utilization()
+    cache_helper_queries(u, "utilization")
 
     if str(update).lower() == "true":
         if freq == "MS":
@@ -403,42 +397,29 @@ def create_utilization_table(
         "_percent": u.ppts_in_utl_percent,
     }
 
-    utl_agg = u.loop_plot_df(u.er_to_inp_rate, params, freq=freq).rename(
-        columns={"Month": "month", "Value": "er_to_inp_rate"}
-    )
+    metrics = [("er_to_inp_rate", u.er_to_inp_rate, [])]
 
     for col_title, func in utilization_func.items():
         for utilization in utilization_types:
-            dff = u.loop_plot_df(
-                func, params, freq=freq, additional_func_args=[utilization]
-            ).rename(columns={"Month": "month", "Value": utilization + col_title})
-            utl_agg = utl_agg.merge(dff, on="month", how="left")
+            metrics.append((utilization + col_title, func, [utilization]))
 
     for utilization in ["acute", "psych", "er_only"]:
-        dff = u.loop_plot_df(
-            u.readmits_30day_rate, params, freq=freq, additional_func_args=[utilization]
-        ).rename(
-            columns={"Month": "month", "Value": utilization + "_30_day_readmit_rate"}
+        metrics.append(
+            (utilization + "_30_day_readmit_rate", u.readmits_30day_rate, [utilization])
         )
-        utl_agg = utl_agg.merge(dff, on="month", how="left")
 
     for col_title, func in er_visit_func.items():
-        dff = u.loop_plot_df(
-            func, params, freq=freq, additional_func_args=["er_only"]
-        ).rename(columns={"Month": "month", "Value": col_title})
-        utl_agg = utl_agg.merge(dff, on="month", how="left")
+        metrics.append((col_title, func, ["er_only"]))
 
     for col_title, func in nf_only_funcs.items():
         for nf_type in ["skilled", "respite", "custodial", "alfs"]:
-            dff = u.loop_plot_df(
-                func, params, freq=freq, additional_func_args=[nf_type]
-            ).rename(columns={"Month": "month", "Value": nf_type + col_title})
-            utl_agg = utl_agg.merge(dff, on="month", how="left")
+            metrics.append((nf_type + col_title, func, [nf_type]))
 
-    dff = u.loop_plot_df(
-        u.percent_nf_discharged_to_higher_loc, params, freq=freq
-    ).rename(columns={"Month": "month", "Value": "nf_higher_loc_discharge_percent"})
-    utl_agg = utl_agg.merge(dff, on="month", how="left")
+    metrics.append(
+        ("nf_higher_loc_discharge_percent", u.percent_nf_discharged_to_higher_loc, [])
+    )
+
+    utl_agg = compute_metrics(u, params, freq, metrics)
 
     utl_agg.to_csv(f"{processed_data}\\utilization_agg.csv", index=False)
 
@@ -446,20 +427,8 @@ def create_utilization_table(
         table_name = "utilization_q"
     else:
         table_name = "utilization"
-    conn = sqlite3.connect(db_path)
-
-    if update:
-        stu.update_sql_table(utl_agg, table_name, conn, ["month"], agg_table=True)
-
-    else:
-        stu.create_table(utl_agg, table_name, conn, ["month"], agg_table=True)
-    conn.commit()
-    conn.close()
 
-    open(
-        f"{update_logs_folder}\\utilization_agg{str(pd.to_datetime('today').date())}.txt",
-        "a",
-    ).close()
+    write_agg_table(utl_agg, table_name, db_path, update, "utilization_agg")
 
     return utl_agg
 
@@ -489,6 +458,7 @@ def create_quality_agg_table(
             can be told the process is complete.
     """
     q = Quality()
+    cache_helper_queries(q, "quality")
 
     if str(update).lower() == "true":
         if freq == "MS":
@@ -510,15 +480,10 @@ def create_quality_agg_table(
         "avg_days_until_nf_admission": q.avg_days_until_nf_admission,
     }
 
-    quality_agg = q.loop_plot_df(q.mortality_rate, params, freq=freq).rename(
-        columns={"Month": "month", "Value": "mortality_rate"}
-    )
+    metrics = [("mortality_rate", q.mortality_rate, [])]
+    metrics.extend((col_title, func, []) for col_title, func in quality_func.items())
 
-    for col_title, func in quality_func.items():
-        dff = q.loop_plot_df(func, params, freq=freq).rename(
-            columns={"Month": "month", "Value": col_title}
-        )
-        quality_agg = quality_agg.merge(dff, on="month", how="left")
+    quality_agg = compute_metrics(q, params, freq, metrics)
 
     quality_agg.to_csv(f"{processed_data}\\quality_agg.csv", index=False)
 
@@ -527,21 +492,7 @@ def create_quality_agg_table(
     else:
         table_name = "quality"
 
-    conn = sqlite3.connect(db_path)
-
-    if update:
-        stu.update_sql_table(quality_agg, table_name, conn, ["month"], agg_table=True)
-
-    else:
-        stu.create_table(quality_agg, table_name, conn, ["month"], agg_table=True)
-
-    conn.commit()
-    conn.close()
-
-    open(
-        f"{update_logs_folder}\\quality_agg{str(pd.to_datetime('today').date())}.txt",
-        "a",
-    ).close()
+    write_agg_table(quality_agg, table_name, db_path, update, "quality_agg")
 
     return quality_agg
 
@@ -571,6 +522,7 @@ def create_team_utl_agg_table(
             can be told the process is complete.
     """
     t = Team()
+    cache_helper_queries(t, "team_utl")
 
     if str(update).lower() == "true":
         if freq == "MS":
@@ -600,27 +552,33 @@ def create_team_utl_agg_table(
         "er_only_visits": t.er_only_visits_by_team,
     }
 
-    utl_team = t.loop_plot_team_df(t.ppts_on_team, params, freq=freq)
-    
-    utl_team.drop(
-        [col for col in utl_team.columns if col != "month"], axis=1, inplace=True
-    )
+    months = t.loop_plot_team_df(t.ppts_on_team, params, freq=freq)["month"]
+    calendar = period_calendar(t, params, freq)
 
+    team_frames = []
     for col_title, func in utilization.items():
-        dff = t.loop_plot_team_df(func, params, freq=freq, col_suffix=f"_{col_title}")
-        utl_team = utl_team.merge(dff, on="month", how="left")
+        team_frames.append(
+            team_metric_frame(
+                t, calendar, months, params, freq, func, col_suffix=f"_{col_title}"
+            )
+        )
 
     for col_title, func in utilization_need_args.items():
         for utilization in utilization_types:
-            dff = t.loop_plot_team_df(
-                func,
-                params,
-                freq=freq,
-                additional_func_args=[utilization],
-                col_suffix=f"_{utilization}{col_title}",
+            team_frames.append(
+                team_metric_frame(
+                    t,
+                    calendar,
+                    months,
+                    params,
+                    freq,
+                    func,
+                    [utilization],
+                    col_suffix=f"_{utilization}{col_title}",
+                )
             )
-            utl_team = utl_team.merge(dff, on="month", how="left")
 
+    utl_team = combine_month_frames(months, team_frames)
 
     utl_team.to_csv(f"{processed_data}\\utl_team.csv", index=False)
 
@@ -629,20 +587,7 @@ def create_team_utl_agg_table(
     else:
         table_name = "team_utl"
 
-    conn = sqlite3.connect(db_path)
-
-    if update:
-        stu.update_sql_table(utl_team, table_name, conn, ["month"], agg_table=True)
-
-    else:
-        stu.create_table(utl_team, table_name, conn, ["month"], agg_table=True)
-    conn.commit()
-    conn.close()
-
-    open(
-        f"{update_logs_folder}\\team_utilization_agg{str(pd.to_datetime('today').date())}.txt",
-        "a",
-    ).close()
+    write_agg_table(utl_team, table_name, db_path, update, "team_utilization_agg")
 
     return utl_team
 
@@ -672,6 +617,7 @@ def create_team_info_agg_table(
             can be told the process is complete.
     """
     t = Team()
+    cache_helper_queries(t, "team_info")
 
     if str(update).lower() == "true":
         if freq == "MS":
@@ -690,15 +636,14 @@ def create_team_info_agg_table(
         "ppts": t.ppts_on_team,
         "mortality": t.mortality_by_team,
     }
-    team_info_df = t.loop_plot_team_df(t.ppts_on_team, params, freq=freq)
-    
-    team_info_df.drop(
-        [col for col in team_info_df.columns if col != "month"], axis=1, inplace=True
-    )
+    months = t.loop_plot_team_df(t.ppts_on_team, params, freq=freq)["month"]
+
+    team_frames = [
+        t.loop_plot_team_df(func, params, freq=freq, col_suffix=f"_{col_title}")
+        for col_title, func in team_info.items()
+    ]
 
-    for col_title, func in team_info.items():
-        dff = t.loop_plot_team_df(func, params, freq=freq, col_suffix=f"_{col_title}")
-        team_info_df = team_info_df.merge(dff, on="month", how="left")
+    team_info_df = combine_month_frames(months, team_frames)
 
     team_info_df.to_csv(f"{processed_data}\\team_info_df.csv", index=False)
 
@@ -707,20 +652,7 @@ def create_team_info_agg_table(
     else:
         table_name = "team_info"
 
-    conn = sqlite3.connect(db_path)
-
-    if update:
-        stu.update_sql_table(team_info_df, table_name, conn, ["month"], agg_table=True)
-
-    else:
-        stu.create_table(team_info_df, table_name, conn, ["month"], agg_table=True)
-    conn.commit()
-    conn.close()
-
-    open(
-        f"{update_logs_folder}\\team_info_agg{str(pd.to_datetime('today').date())}.txt",
-        "a",
-    ).close()
+    write_agg_table(team_info_df, table_name, db_path, update, "team_info_agg")
 
     return team_info_df
 
@@ -750,6 +682,7 @@ def create_team_incidents_agg_table(
             can be told the process is complete.
     """
     t = Team()
+    cache_helper_queries(t, "team_incidents")
 
     if str(update).lower() == "true":
         if freq == "MS":
@@ -769,22 +702,22 @@ def create_team_incidents_agg_table(
         "_unique_ppts": t.ppts_w_incident_by_team,
     }
 
-    incidents_team = t.loop_plot_team_df(t.ppts_on_team, params, freq=freq)
-
-    incidents_team.drop(
-        [col for col in incidents_team.columns if col != "month"], axis=1, inplace=True
-    )
+    months = t.loop_plot_team_df(t.ppts_on_team, params, freq=freq)["month"]
 
+    team_frames = []
     for col_title, func in incidents.items():
         for incident in incident_types:
-            dff = t.loop_plot_team_df(
-                func,
-                params,
-                freq=freq,
-                additional_func_args=[incident],
-                col_suffix=f"_{incident}{col_title}",
+            team_frames.append(
+                t.loop_plot_team_df(
+                    func,
+                    params,
+                    freq=freq,
+                    additional_func_args=[incident],
+                    col_suffix=f"_{incident}{col_title}",
+                )
             )
-            incidents_team = incidents_team.merge(dff, on="month", how="left")
+
+    incidents_team = combine_month_frames(months, team_frames)
 
     incidents_team.to_csv(f"{processed_data}\\incidents_team.csv", index=False)
 
@@ -793,21 +726,7 @@ def create_team_incidents_agg_table(
     else:
         table_name = "team_incidents"
 
-    conn = sqlite3.connect(db_path)
-    if update:
-        stu.update_sql_table(
-            incidents_team, table_name, conn, ["month"], agg_table=True
-        )
-
-    else:
-        stu.create_table(incidents_team, table_name, conn, ["month"], agg_table=True)
-    conn.commit()
-    conn.close()
-
-    open(
-        f"{update_logs_folder}\\team_incidents_agg{str(pd.to_datetime('today').date())}.txt",
-        "a",
-    ).close()
+    write_agg_table(incidents_team, table_name, db_path, update, "team_incidents_agg")
 
     return incidents_team
 
@@ -921,6 +840,7 @@ def create_center_agg_table(
             can be told the process is complete.
     """
     ce = CenterEnrollment()
+    cache_helper_queries(ce, "center")
 
     if str(update).lower() == "true":
         if freq == "MS":
@@ -945,28 +865,16 @@ def create_center_agg_table(
         "Westerly": "wes",
     }
 
-    enrollment_agg = ce.loop_plot_df(
-        ce.census_on_end_date, params, freq=freq, additional_func_args=["Providence"]
-    ).rename(columns={"Month": "month", "Value": "pvd_census"})
-
-    dff = ce.loop_plot_df(
-        ce.census_on_end_date, params, freq=freq, additional_func_args=["Woonsocket"]
-    ).rename(columns={"Month": "month", "Value": "woon_census"})
-
-    enrollment_agg = enrollment_agg.merge(dff, on="month", how="left")
-
-    dff = ce.loop_plot_df(
-        ce.census_on_end_date, params, freq=freq, additional_func_args=["Westerly"]
-    ).rename(columns={"Month": "month", "Value": "wes_census"})
-
-    enrollment_agg = enrollment_agg.merge(dff, on="month", how="left")
+    metrics = [
+        (center_abr + "_census", ce.census_on_end_date, [center])
+        for center, center_abr in center_shorthand_dict.items()
+    ]
 
     for col_title, func in enrollment_funcs.items():
         for center, center_abr in center_shorthand_dict.items():
-            dff = ce.loop_plot_df(
-                func, params, freq=freq, additional_func_args=[center]
-            ).rename(columns={"Month": "month", "Value": center_abr + col_title})
-            enrollment_agg = enrollment_agg.merge(dff, on="month", how="left")
+            metrics.append((center_abr + col_title, func, [center]))
+
+    enrollment_agg = compute_metrics(ce, params, freq, metrics)
 
     dc_attendance = create_dc_attnd_table(params, freq)
     enrollment_agg = enrollment_agg.merge(dc_attendance, on="month", how="left")
@@ -976,74 +884,134 @@ def create_center_agg_table(
     else:
         table_name = "center_enrollment"
 
-    conn = sqlite3.connect(db_path)
+    write_agg_table(enrollment_agg, table_name, db_path, update, "center_agg")
 
-    if update:
-        stu.update_sql_table(
-            enrollment_agg, table_name, conn, ["month"], agg_table=True
-        )
+    return enrollment_agg
 
-    else:
-        stu.create_table(enrollment_agg, table_name, conn, ["month"], agg_table=True)
 
-    conn.commit()
-    conn.close()
+# agg builders and the keyword arguments they are run with
+agg_builders = {
+    "enrollment": (create_enrollment_agg_table, {}),
+    "demographics": (create_demographic_agg_table, {}),
+    "falls": (create_incidents_agg_tables, {"incident_table": "falls"}),
+    "infections": (create_incidents_agg_tables, {"incident_table": "infections"}),
+    "med_errors": (create_incidents_agg_tables, {"incident_table": "med_errors"}),
+    "wounds": (create_incidents_agg_tables, {"incident_table": "wounds"}),
+    "burns": (create_incidents_agg_tables, {"incident_table": "burns"}),
+    "utilization": (create_utilization_table, {}),
+    "quality": (create_quality_agg_table, {}),
+    "team_utl": (create_team_utl_agg_table, {}),
+    "team_info": (create_team_info_agg_table, {}),
+    "team_incidents": (create_team_incidents_agg_table, {}),
+    "center": (create_center_agg_table, {}),
+}
+
+
+def build_agg_tables(builder_name, update=True):
+    """
+    Runs an agg builder monthly and then quarterly
+    and prints the hit rate of its cached queries
 
-    open(
-        f"{update_logs_folder}\\center_agg{str(pd.to_datetime('today').date())}.txt",
-        "a",
-    ).close()
+    Args:
+        builder_name(str): key of the builder in agg_builders
+        update(bool): if the tables are being updated or created
 
-    return enrollment_agg
+    Returns:
+        list: deferred writes of the tables, empty if they were written
+    """
+    builder, kwargs = agg_builders[builder_name]
 
+    builder(update=update, **kwargs)
+    builder(freq="QS", update=update, **kwargs)
+    print_cache_report(builder_name)
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
+    writes = deferred_writes["writes"]
+    if writes is None:
+        return []
 
-    parser.add_argument(
-        "--update",
-        default=True,
-        help="Are we updating the database or creating it? True for update",
-    )
+    deferred_writes["writes"] = []
+    return writes
 
-    arguments = parser.parse_args()
 
-    create_enrollment_agg_table(**vars(arguments))
-    create_demographic_agg_table(**vars(arguments))
+def start_agg_worker():
+    """
+    Sets up a run_agg_tables worker process to hand its tables
+    back to the main process instead of writing them
+    """
+    deferred_writes["writes"] = []
+
 
-    create_incidents_agg_tables(incident_table="falls", **vars(arguments))
-    create_incidents_agg_tables(incident_table="infections", **vars(arguments))
-    create_incidents_agg_tables(incident_table="med_errors", **vars(arguments))
-    create_incidents_agg_tables(incident_table="wounds", **vars(arguments))
-    create_incidents_agg_tables(incident_table="burns", **vars(arguments))
+def run_agg_tables(update=True, workers=1, builder_names=None):
+    """
+    Builds the aggregate tables, across a pool of worker processes
+    if workers is more than 1
 
-    create_utilization_table(**vars(arguments))
-    create_quality_agg_table(**vars(arguments))
+    The builders only read from the source database so they run
+    in parallel, each worker hands back its tables and the main process
+    is the single writer to the aggregate database. If a builder fails
+    the tables of every other builder are still written, then the
+    first failure is raised.
 
-    create_team_utl_agg_table(**vars(arguments))
-    create_team_info_agg_table(**vars(arguments))
-    create_team_incidents_agg_table(**vars(arguments))
-    create_center_agg_table(**vars(arguments))
+    Args:
+        update(bool): if the tables are being updated or created
+        workers(int): number of worker processes
+        builder_names(list): keys of agg_builders to run, defaults to all
 
-    create_enrollment_agg_table(freq="QS", **vars(arguments))
-    create_demographic_agg_table(freq="QS", **vars(arguments))
+    Output:
+        aggregate tables written to the aggregate database
+    """
+    if builder_names is None:
+        builder_names = list(agg_builders.keys())
+
+    if workers <= 1:
+        for builder_name in builder_names:
+            build_agg_tables(builder_name, update)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=start_agg_worker
+    ) as executor:
+        futures = {
+            executor.submit(build_agg_tables, builder_name, update): builder_name
+            for builder_name in builder_names
+        }
+
+        # tables of builders that finish are written even if another fails
+        failures = []
+        for future in as_completed(futures):
+            try:
+                writes = future.result()
+            except Exception as e:
+                print(f"{futures[future]} agg tables failed: {e}")
+                failures.append(e)
+                continue
+
+            for write in writes:
+                write_agg_table(*write)
+            print(f"{futures[future]} agg tables written")
+
+    if failures:
+        raise failures[0]
 
-    create_incidents_agg_tables(freq="QS", incident_table="falls", **vars(arguments))
-    create_incidents_agg_tables(
-        freq="QS", incident_table="infections", **vars(arguments)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--update",
+        default=True,
+        help="Are we updating the database or creating it? True for update",
     )
-    create_incidents_agg_tables(
-        freq="QS", incident_table="med_errors", **vars(arguments)
+
+    parser.add_argument(
+        "--workers",
+        default=1,
+        type=int,
+        help="Number of processes the aggregate tables are built across",
     )
-    create_incidents_agg_tables(freq="QS", incident_table="wounds", **vars(arguments))
-    create_incidents_agg_tables(freq="QS", incident_table="burns", **vars(arguments))
 
-    create_utilization_table(freq="QS", **vars(arguments))
-    create_quality_agg_table(freq="QS", **vars(arguments))
+    arguments = parser.parse_args()
 
-    create_team_utl_agg_table(freq="QS", **vars(arguments))
-    create_team_info_agg_table(freq="QS", **vars(arguments))
-    create_team_incidents_agg_table(freq="QS", **vars(arguments))
-    create_center_agg_table(freq="QS", **vars(arguments))
+    run_agg_tables(update=arguments.update, workers=arguments.workers)
 
     print("Complete")
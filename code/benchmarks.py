@@ -0,0 +1,890 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from data_to_sql import sql_table_utils as stu
+from process_db_data import process_utilization as utl
+from process_db_data.data_cleaning_utils import create_id_col
+import agg_metrics
+from agg_metrics import (
+    combine_month_frames,
+    compute_metrics,
+    period_calendar,
+    team_metric_frame,
+)
+
+### Benchmarks for the database loaders
+### All data is randomly generated so no ppt information is needed to run them
+
+
+def synthetic_member_ids(n_members=2000, seed=0):
+    """
+    Creates an array of member_ids
+
+    Args:
+        n_members(int): number of member_ids to create
+        seed(int): seed for the random number generator
+
+    Returns:
+        array: member_ids
+    """
+    rng = np.random.RandomState(seed)
+    population = np.arange(1000, max(100000, n_members * 2))
+    return rng.choice(population, n_members, replace=False)
+
+
+def synthetic_dates(rng, n_rows, start="2005-12-01", end="2019-12-01"):
+    """
+    Creates a pandas Series of random dates between start and end
+
+    Args:
+        rng(RandomState): numpy random number generator
+        n_rows(int): number of dates to create
+        start(str): first possible date
+        end(str): last possible date
+
+    Returns:
+        Series: datetime64 series
+    """
+    start = pd.to_datetime(start)
+    days = (pd.to_datetime(end) - start).days
+    return pd.Series(start + pd.to_timedelta(rng.randint(0, days, n_rows), unit="D"))
+
+
+def synthetic_payments(n_rows, member_ids, seed=0):
+    """
+    Creates a dataframe shaped like the processed payments file
+
+    Args:
+        n_rows(int): number of rows to create
+        member_ids(array): member_ids to sample from
+        seed(int): seed for the random number generator
+
+    Returns:
+        DataFrame: payments dataframe
+    """
+    rng = np.random.RandomState(seed)
+    vendors = np.array([f"Vendor {i}" for i in range(400)])
+    df = pd.DataFrame(
+        {
+            "id_col": np.arange(n_rows),
+            "claim_id": [f"C{i:09d}" for i in rng.randint(0, 10 ** 8, n_rows)],
+            "date_paid": synthetic_dates(rng, n_rows),
+            "date_claim": synthetic_dates(rng, n_rows),
+            "service_date": synthetic_dates(rng, n_rows),
+            "service_date_to": synthetic_dates(rng, n_rows),
+            "specialty_code": rng.choice(["A1", "B2", "C3", "D4"], n_rows),
+            "service": rng.choice(["Lab", "Transport", "Inpatient", "DME"], n_rows),
+            "account": rng.randint(5000, 6000, n_rows),
+            "account_description": rng.choice(["Medical", "Facility"], n_rows),
+            "total_paid": rng.gamma(2, 250, n_rows).round(2),
+            "member_id": rng.choice(member_ids, n_rows),
+            "check_num": [str(i) for i in rng.randint(0, 10 ** 6, n_rows)],
+            "vendor": rng.choice(vendors, n_rows),
+            "length_of_service": rng.randint(1, 30, n_rows).astype(float),
+            "service_code": rng.choice(["99213", "99214", "A0428", "E0110"], n_rows),
+        }
+    )
+    return df
+
+
+def synthetic_claims_detail(n_rows, member_ids, seed=0):
+    """
+    Creates a dataframe shaped like the processed claims_detail file
+
+    Args:
+        n_rows(int): number of rows to create
+        member_ids(array): member_ids to sample from
+        seed(int): seed for the random number generator
+
+    Returns:
+        DataFrame: claims_detail dataframe
+    """
+    rng = np.random.RandomState(seed)
+    vendors = np.array([f"Vendor {i}" for i in range(400)])
+    icd_codes = np.array([f"I{i:03d}" for i in range(500)])
+    df = pd.DataFrame(
+        {
+            "claim_id": [f"C{i:09d}" for i in rng.randint(0, 10 ** 8, n_rows)],
+            "claim_line_id": np.arange(n_rows),
+            "claim_type": rng.choice(["Professional", "Institutional"], n_rows),
+            "first_dos": synthetic_dates(rng, n_rows),
+            "last_dos": synthetic_dates(rng, n_rows),
+            "received_date": synthetic_dates(rng, n_rows),
+            "claim_line_status": rng.choice(["Paid", "Denied", "Pended"], n_rows),
+            "member_id": rng.choice(member_ids, n_rows),
+            "vendor": rng.choice(vendors, n_rows),
+            "diag_code1": rng.choice(icd_codes, n_rows),
+            "diag_code2": rng.choice(icd_codes, n_rows),
+            "procedure_code": rng.choice(["99213", "99214", "A0428"], n_rows),
+            "line_charges": rng.gamma(2, 300, n_rows).round(2),
+            "line_units": rng.randint(1, 5, n_rows).astype(float),
+            "line_paid": rng.gamma(2, 200, n_rows).round(2),
+            "check_date": synthetic_dates(rng, n_rows),
+            "claim_line_created_date": synthetic_dates(rng, n_rows),
+        }
+    )
+    return df
+
+
+def time_create_table(df, table_name, primary_key, bulk_load):
+    """
+    Creates the table in a new database in a temporary folder
+    and times the create_table call
+
+    Args:
+        df(DataFrame): pandas dataframe to be turned into sql table
+        table_name(str): name of the table to create
+        primary_key(list): list of columns to use as a primary key
+        bulk_load(bool): indicates if bulk-load mode is used
+
+    Returns:
+        float: rows written per second
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        conn = sqlite3.connect(os.path.join(tmp_dir, "benchmark.db"))
+        ppts = pd.DataFrame({"member_id": np.unique(df["member_id"])})
+        stu.create_table(ppts, "ppts", conn, ["member_id"])
+
+        stu.set_bulk_load(bulk_load)
+        try:
+            start = time.perf_counter()
+            stu.create_table(
+                df,
+                table_name,
+                conn,
+                primary_key,
+                ["member_id"],
+                ["ppts"],
+                ["member_id"],
+            )
+            elapsed = time.perf_counter() - start
+
+            # loaded tables are stamped so cached query results are dropped
+            stamps = dict(
+                conn.execute("SELECT table_name, change_count FROM table_changes")
+            )
+            assert stamps.get("ppts") == 1 and stamps.get(table_name) == 1
+        finally:
+            stu.set_bulk_load(False)
+            conn.close()
+
+        stu.invalidate_member_ids()
+
+    return df.shape[0] / elapsed
+
+
+def benchmark_bulk_load(n_rows=500000):
+    """
+    Compares rows/second written by create_table with and without
+    bulk-load mode for the claims_detail and payments tables
+
+    Args:
+        n_rows(int): number of rows in each table
+
+    Returns:
+        DataFrame: rows/second for each table and mode
+    """
+    member_ids = synthetic_member_ids()
+    tables = {
+        "claims_detail": (
+            stu.create_sql_dates(
+                synthetic_claims_detail(n_rows, member_ids), ["first_dos", "last_dos"]
+            ),
+            ["claim_line_id"],
+        ),
+        "payments": (
+            stu.create_sql_dates(synthetic_payments(n_rows, member_ids)),
+            ["id_col"],
+        ),
+    }
+
+    results = []
+    for table_name, (df, primary_key) in tables.items():
+        for bulk_load in [False, True]:
+            rows_per_second = time_create_table(
+                df.copy(), table_name, primary_key, bulk_load
+            )
+            results.append(
+                {
+                    "table": table_name,
+                    "bulk_load": bulk_load,
+                    "rows": n_rows,
+                    "rows_per_second": round(rows_per_second),
+                }
+            )
+
+    return pd.DataFrame(results)
+
+
+def legacy_create_sql_dates(df, additional_date_cols=None):
+    """
+    create_sql_dates as it was before dates were parsed once per
+    distinct value, kept to check the results and timings match
+
+    Args:
+        df(DataFrame): pandas dataframe to have dates parsed
+        additional_date_cols(list): list of columns that have date
+            data in them, but do not have date in the name
+
+    Returns:
+        DataFrame: cleaned dataframe
+    """
+    date_cols = [col for col in df.columns if "date" in col]
+    if additional_date_cols is not None:
+        date_cols = date_cols + additional_date_cols
+    for col in date_cols:
+        df[col] = pd.to_datetime(df[col]).dt.strftime("%Y-%m-%d")
+        df[col].replace({"NaT": np.nan}, inplace=True)
+    return df
+
+
+def as_csv_dates(df, seed=0):
+    """
+    Writes the datetime columns as the strings read back from a processed
+    csv file, with 5% of the values missing
+
+    Args:
+        df(DataFrame): pandas dataframe with datetime columns
+        seed(int): seed for the random number generator
+
+    Returns:
+        DataFrame: dataframe with the dates as strings
+    """
+    rng = np.random.RandomState(seed)
+    for col, dtype in df.dtypes.items():
+        if str(dtype).startswith("datetime"):
+            df[col] = df[col].dt.strftime("%Y-%m-%d")
+            df.loc[rng.rand(df.shape[0]) < 0.05, col] = np.nan
+    return df
+
+
+def benchmark_dates(n_rows=1000000):
+    """
+    Compares seconds taken by create_sql_dates and the legacy version on the
+    claims_detail and payments tables and checks the results are identical
+
+    Args:
+        n_rows(int): number of rows in each table
+
+    Returns:
+        DataFrame: seconds for each table and version
+    """
+    member_ids = synthetic_member_ids()
+    tables = {
+        "claims_detail": (
+            as_csv_dates(synthetic_claims_detail(n_rows, member_ids)),
+            ["first_dos", "last_dos"],
+        ),
+        "payments": (as_csv_dates(synthetic_payments(n_rows, member_ids)), None),
+    }
+
+    results = []
+    for table_name, (df, additional_date_cols) in tables.items():
+        times = {}
+        parsed = {}
+        for version, func in [
+            ("legacy", legacy_create_sql_dates),
+            ("create_sql_dates", stu.create_sql_dates),
+        ]:
+            df_copy = df.copy()
+            start = time.perf_counter()
+            parsed[version] = func(df_copy, additional_date_cols)
+            times[version] = time.perf_counter() - start
+
+        pd.testing.assert_frame_equal(parsed["legacy"], parsed["create_sql_dates"])
+
+        results.append(
+            {
+                "table": table_name,
+                "rows": n_rows,
+                "legacy_seconds": round(times["legacy"], 2),
+                "seconds": round(times["create_sql_dates"], 2),
+                "speedup": round(times["legacy"] / times["create_sql_dates"], 1),
+            }
+        )
+
+    return pd.DataFrame(results)
+
+
+def synthetic_inpatient(n_rows, member_ids, seed=0):
+    """
+    Creates a dataframe shaped like the inpatient data passed to
+    discharge_admit_diff, with 2% of discharge dates missing
+
+    Args:
+        n_rows(int): number of rows to create
+        member_ids(array): member_ids to sample from
+        seed(int): seed for the random number generator
+
+    Returns:
+        DataFrame: inpatient dataframe
+    """
+    rng = np.random.RandomState(seed)
+    admission_date = synthetic_dates(rng, n_rows)
+    discharge_date = admission_date + pd.to_timedelta(
+        rng.randint(0, 30, n_rows), unit="D"
+    )
+    discharge_date[rng.rand(n_rows) < 0.02] = pd.NaT
+    df = pd.DataFrame(
+        {
+            "member_id": rng.choice(member_ids, n_rows),
+            "admission_date": admission_date,
+            "discharge_date": discharge_date,
+            "facility": rng.choice(["Hospital A", "Hospital B", "Hospital C"], n_rows),
+            "admission_type": rng.choice(["Acute Hospital", "Psych Unit"], n_rows),
+        }
+    )
+    return df
+
+
+def legacy_discharge_admit_diff(df, admit_diff=False):
+    """
+    discharge_admit_diff as it was before it was vectorized, for creating
+    the database only, kept to check the results and timings match
+
+    Args:
+        df(DataFrame): pandas dataframe to have column added
+        admit_diff: indicates if the difference is in admission dates
+            or in the discharge date and next admission date
+
+    Returns:
+        df(DataFrame): pandas dataframe
+    """
+    if admit_diff:
+        diff_date = "admission_date"
+        sorted_df = (
+            df.sort_values(["member_id", "admission_date"], ascending=False)
+            .reset_index(drop=True)
+            .copy()
+        )
+    else:
+        diff_date = "discharge_date"
+        df["discharge_date"] = pd.to_datetime(df["discharge_date"])
+        sorted_df = (
+            df.sort_values(
+                ["member_id", "admission_date", "discharge_date"], ascending=False
+            )
+            .reset_index(drop=True)
+            .copy()
+        )
+
+    sorted_df["days_since_last_admission"] = np.nan
+
+    for mem_id in sorted_df.member_id.unique():
+        if sorted_df[sorted_df.member_id == mem_id].shape[0] > 1:
+            for i in sorted_df[sorted_df.member_id == mem_id].index[:-1]:
+                sorted_df.at[i, "days_since_last_admission"] = (
+                    sorted_df.at[i, "admission_date"] - sorted_df.at[(i + 1), diff_date]
+                ) / np.timedelta64(1, "D")
+
+    sorted_df.reset_index(drop=True, inplace=True)
+
+    sorted_df = sorted_df[
+        (
+            (sorted_df["days_since_last_admission"] >= 0)
+            | (sorted_df["days_since_last_admission"].isnull())
+        )
+    ]
+
+    sorted_df.drop_duplicates(
+        subset=[col for col in sorted_df.columns if col != "days_since_last_admission"],
+        inplace=True,
+        keep="last",
+    )
+
+    return sorted_df
+
+
+def benchmark_admit_diff(base_rows=5000, scales=(1, 10, 100), legacy_max_rows=50000):
+    """
+    Compares seconds taken by discharge_admit_diff and the legacy loop at
+    multiples of today's inpatient volume and checks the results are identical
+
+    The legacy loop is only timed up to legacy_max_rows as it grows
+    with members x rows
+
+    Args:
+        base_rows(int): approximate number of inpatient rows today
+        scales(tuple): multiples of base_rows to time
+        legacy_max_rows(int): largest number of rows to time the legacy loop on
+
+    Returns:
+        DataFrame: seconds for each scale and version
+    """
+    results = []
+    for scale in scales:
+        n_rows = base_rows * scale
+        # members grow with volume, at roughly 5 admissions each
+        member_ids = synthetic_member_ids(n_rows // 5)
+        df = synthetic_inpatient(n_rows, member_ids)
+
+        for admit_diff in [False, True]:
+            result = {"rows": n_rows, "admit_diff": admit_diff}
+
+            df_copy = df.copy()
+            start = time.perf_counter()
+            new = utl.discharge_admit_diff(
+                df_copy, update=False, admit_diff=admit_diff
+            )
+            result["seconds"] = round(time.perf_counter() - start, 3)
+
+            if n_rows <= legacy_max_rows:
+                df_copy = df.copy()
+                start = time.perf_counter()
+                legacy = legacy_discharge_admit_diff(df_copy, admit_diff=admit_diff)
+                result["legacy_seconds"] = round(time.perf_counter() - start, 3)
+                pd.testing.assert_frame_equal(legacy, new)
+
+            results.append(result)
+
+    return pd.DataFrame(results)
+
+
+def synthetic_incidents(n_rows, member_ids, seed=0):
+    """
+    Creates a dataframe shaped like the incident data passed to create_id_col,
+    with times of day so some members have several incidents on one date
+
+    Args:
+        n_rows(int): number of rows to create
+        member_ids(array): member_ids to sample from
+        seed(int): seed for the random number generator
+
+    Returns:
+        DataFrame: incident dataframe
+    """
+    rng = np.random.RandomState(seed)
+    date_time_occurred = synthetic_dates(rng, n_rows, start="2017-01-01")
+    date_time_occurred += pd.to_timedelta(rng.randint(0, 24 * 60, n_rows), unit="m")
+    df = pd.DataFrame(
+        {
+            "member_id": rng.choice(member_ids, n_rows),
+            "date_time_occurred": date_time_occurred,
+            "location": rng.choice(["PACE", "Home", "NF", "ALF"], n_rows),
+            "injury": rng.choice(["None", "Minor", "Major"], n_rows),
+        }
+    )
+    return df
+
+
+def legacy_create_id_col(df, pk, id_col, create_col=True):
+    """
+    create_id_col as it was before ids were given a sequence number,
+    kept to compare timings
+
+    Args:
+        df(DataFrame): pandas dataframe to add id_col to
+        pk(list or tuple): member id column name and a date column name
+            to be used to crate an ID column
+        id_col: name of the id column
+        create_col(bool): indicates if the column should be added to the df
+
+    Returns:
+        pandas Series: the newly created id column
+    """
+    df.dropna(subset=["member_id"], inplace=True)
+    member_ints = df[pk[0]].astype(int)
+    date_ints = df[pk[1]].dt.strftime("%Y%m%d").astype(int)
+
+    if create_col:
+        df[id_col] = member_ints + date_ints
+
+    if df[id_col].duplicated().sum() != 0:
+        df[id_col] += df[id_col].duplicated()
+        legacy_create_id_col(df, pk, id_col, create_col=False)
+
+    df.drop_duplicates(
+        subset=[col for col in df.columns if col != id_col], inplace=True, keep="last"
+    )
+
+    return df[id_col]
+
+
+def benchmark_ids(scales=(5000, 50000, 500000), legacy_max_rows=50000):
+    """
+    Compares seconds taken by create_id_col and the legacy recursive version
+    on incidents and inpatient dataframes, and checks the ids are unique,
+    the same when the rows are shuffled and kept when a column
+    outside the pk of rows with unique pk values is edited
+
+    The legacy version is only timed up to legacy_max_rows as it recurses
+    once for every id it has to bump, and is reported as a RecursionError
+    when it runs out of stack
+
+    Args:
+        scales(tuple): numbers of rows to time
+        legacy_max_rows(int): largest number of rows to time the legacy version on
+
+    Returns:
+        DataFrame: seconds for each table and number of rows
+    """
+    id_pks = {
+        "incidents": ["member_id", "date_time_occurred"],
+        "inpatient": ["member_id", "admission_date", "facility"],
+    }
+
+    results = []
+    for n_rows in scales:
+        member_ids = synthetic_member_ids(max(n_rows // 20, 100))
+        tables = {
+            "incidents": synthetic_incidents(n_rows, member_ids),
+            "inpatient": synthetic_inpatient(n_rows, member_ids),
+        }
+
+        for table_name, df in tables.items():
+            result = {"table": table_name, "rows": n_rows}
+
+            df_copy = df.copy()
+            start = time.perf_counter()
+            ids = create_id_col(df_copy, id_pks[table_name], "id_col")
+            result["seconds"] = round(time.perf_counter() - start, 3)
+
+            assert ids.is_unique
+            shuffled = df.sample(frac=1, random_state=1)
+            shuffled_ids = create_id_col(shuffled, id_pks[table_name], "id_col")
+            pd.testing.assert_frame_equal(
+                df_copy.assign(id_col=ids).sort_values("id_col").reset_index(drop=True),
+                shuffled.assign(id_col=shuffled_ids)
+                .sort_values("id_col")
+                .reset_index(drop=True),
+            )
+
+            # editing a column outside the pk keeps the id of every row
+            # whose pk values are unique, rows sharing them are ordered
+            # by their contents
+            edited = df.copy()
+            edit_col = [col for col in df.columns if col not in id_pks[table_name]][0]
+            edited[edit_col] = edited[edit_col].sample(frac=1, random_state=2).values
+            edited_ids = create_id_col(edited, id_pks[table_name], "id_col")
+            unique_pk = ~df_copy.duplicated(id_pks[table_name], keep=False)
+            common = edited_ids.index.intersection(ids.index[unique_pk.values])
+            pd.testing.assert_series_equal(edited_ids[common], ids[common])
+
+            if n_rows <= legacy_max_rows:
+                df_copy = df.copy()
+                start = time.perf_counter()
+                try:
+                    legacy_create_id_col(df_copy, id_pks[table_name], "id_col")
+                    result["legacy_seconds"] = round(time.perf_counter() - start, 3)
+                except RecursionError:
+                    # each bump is a level of recursion, busy dates run out of stack
+                    result["legacy_seconds"] = "RecursionError"
+
+            results.append(result)
+
+    return pd.DataFrame(results)
+
+
+def synthetic_metric_frames(n_months, n_metrics, teams=None, seed=0):
+    """
+    Creates frames shaped like the loop_plot_df results of an agg builder,
+    or the loop_plot_team_df results if teams are given
+
+    Args:
+        n_months(int): number of periods in each frame
+        n_metrics(int): number of frames to create
+        teams(list): team names, each frame has a column per team
+        seed(int): seed for the random number generator
+
+    Returns:
+        Index: months of the frames
+        list: DataFrames with a month column
+    """
+    rng = np.random.RandomState(seed)
+    months = pd.date_range("2005-12-01", periods=n_months, freq="MS").strftime(
+        "%Y-%m-%d"
+    )
+
+    frames = []
+    for metric in range(n_metrics):
+        if teams is None:
+            cols = [f"metric_{metric}"]
+        else:
+            cols = [f"{team}_metric_{metric}" for team in teams]
+        frame = pd.DataFrame(rng.rand(n_months, len(cols)), columns=cols)
+        frame.insert(0, "month", months)
+        frames.append(frame)
+
+    return months, frames
+
+
+def legacy_merge_frames(months, frames):
+    """
+    Assembles metric frames the way the agg builders did before
+    they were combined once, by left merging each in turn
+
+    Args:
+        months(Index): months of the frames
+        frames(list): DataFrames with a month column
+
+    Returns:
+        DataFrame: month column and the other columns of every frame
+    """
+    agg = pd.DataFrame({"month": months})
+    for frame in frames:
+        agg = agg.merge(frame, on="month", how="left")
+    return agg
+
+
+def metric_columns_frame(months, frames):
+    """
+    Assembles single metric frames the way compute_metrics does,
+    as aligned columns built into one frame
+
+    Args:
+        months(Index): months of the frames
+        frames(list): DataFrames with a month column and one value column
+
+    Returns:
+        DataFrame: month column and the value column of every frame
+    """
+    columns = {"month": months}
+    for frame in frames:
+        col = frame.columns[1]
+        columns[col] = pd.Series(frame[col].values, index=frame["month"])[months].values
+    return pd.DataFrame(columns)
+
+
+def time_and_peak_memory(func, *args):
+    """
+    Runs func and measures the seconds taken and the peak memory allocated
+
+    Args:
+        func(function): function to run
+        args: arguments for func
+
+    Returns:
+        result of func
+        float: seconds taken
+        float: peak MB allocated while func ran
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result, round(seconds, 3), round(peak / 1024 ** 2, 2)
+
+
+def benchmark_agg_assembly(scales=(120, 1200), n_teams=8):
+    """
+    Compares seconds and peak memory of assembling the utilization and
+    team_utl agg frames in one step against merging each metric on month,
+    and checks the frames are identical
+
+    The metric values are random as the paceutils queries are not run,
+    only the assembly of the wide frame is measured
+
+    Args:
+        scales(tuple): numbers of months to time
+        n_teams(int): number of teams in the team frames
+
+    Returns:
+        DataFrame: seconds and peak MB for each build and number of months
+    """
+    # 65 single value metrics in utilization, 26 team metrics in team_utl
+    builds = {
+        "utilization": (65, None, metric_columns_frame),
+        "team_utl": (
+            26,
+            [f"team_{team}" for team in range(n_teams)],
+            combine_month_frames,
+        ),
+    }
+
+    results = []
+    for n_months in scales:
+        for build, (n_metrics, teams, assemble) in builds.items():
+            months, frames = synthetic_metric_frames(n_months, n_metrics, teams)
+            result = {"build": build, "months": n_months}
+
+            new, result["seconds"], result["peak_mb"] = time_and_peak_memory(
+                assemble, months, frames
+            )
+            legacy, result["legacy_seconds"], result["legacy_peak_mb"] = (
+                time_and_peak_memory(legacy_merge_frames, months, frames)
+            )
+            pd.testing.assert_frame_equal(legacy, new)
+
+            results.append(result)
+
+    return pd.DataFrame(results)
+
+
+# additional_func_args the methods of each class are checked with,
+# methods with a table arg are checked for every table they are batched for
+batched_check_args = {
+    "CenterEnrollment": [["Providence"], ["Woonsocket"], ["Westerly"]],
+    "Utilization": [["acute"], ["psych"], ["skilled"], ["respite"], ["custodial"]],
+    "Team": [["acute"], ["psych"], ["skilled"], ["respite"], ["custodial"]],
+    "Team.er_only_visits_by_team": [[]],
+}
+
+
+def batched_check_metrics(helpers):
+    """
+    Lists a metric for every batched or rolled up method
+    and the args it is checked with
+
+    Args:
+        helpers(dict): paceutils class name to an instance of the class
+
+    Returns:
+        list: tuples of (col_title, func, additional_func_args)
+    """
+    keys = list(agg_metrics.batched_sql)
+    keys += [key for key in agg_metrics.rollups if key not in keys]
+    keys += list(agg_metrics.ratio_rollups)
+
+    metrics = []
+    for key in keys:
+        class_name, method_name = key.split(".")
+        func = getattr(helpers[class_name], method_name)
+        if key in agg_metrics.batched_table_args:
+            args_list = [[table] for table in agg_metrics.batched_table_args[key]]
+        else:
+            args_list = batched_check_args.get(class_name, [[]])
+        for args in args_list:
+            metrics.append(("_".join([method_name] + args), func, args))
+
+    return metrics
+
+
+def benchmark_batched_metrics(params=("2017-07-01", None), freqs=("MS", "QS")):
+    """
+    Compares seconds taken to compute every batched or rolled up agg
+    metric with compute_metrics and with loop_plot_df, and checks the
+    values are identical for every period
+
+    Quarters are computed after months so rolled up quarterly values
+    are checked as well, team methods in team_rollups are checked against
+    loop_plot_team_df. Unlike the other benchmarks this reads the
+    database at database_path and needs paceutils installed.
+
+    Args:
+        params(tuple): start date and end date in format 'YYYY-MM-DD',
+            an end date of None is today
+        freqs(tuple): frequencies to check, in order
+
+    Returns:
+        DataFrame: seconds for each metric and freq
+    """
+    from paceutils import CenterEnrollment, Enrollment, Incidents, Team, Utilization
+
+    if params[1] is None:
+        params = (params[0], pd.to_datetime("today").strftime("%Y-%m-%d"))
+
+    helpers = {
+        helper.__name__: helper()
+        for helper in [CenterEnrollment, Enrollment, Incidents, Utilization]
+    }
+    team = Team()
+
+    results = []
+    for freq in freqs:
+        for col_title, func, args in batched_check_metrics(helpers):
+            helper = func.__self__
+            start = time.perf_counter()
+            batched = compute_metrics(helper, params, freq, [(col_title, func, args)])
+            seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            if args:
+                dff = helper.loop_plot_df(
+                    func, params, freq=freq, additional_func_args=args
+                )
+            else:
+                dff = helper.loop_plot_df(func, params, freq=freq)
+            loop_seconds = time.perf_counter() - start
+
+            loop_values = batched["month"].map(dict(zip(dff["Month"], dff["Value"])))
+            assert np.allclose(
+                pd.to_numeric(batched[col_title]).astype(float),
+                pd.to_numeric(loop_values).astype(float),
+                equal_nan=True,
+            ), f"{col_title} {freq} does not match loop_plot_df"
+
+            results.append(
+                {
+                    "metric": col_title,
+                    "freq": freq,
+                    "seconds": round(seconds, 3),
+                    "loop_seconds": round(loop_seconds, 3),
+                }
+            )
+
+        months = team.loop_plot_team_df(team.ppts_on_team, params, freq=freq)["month"]
+        calendar = period_calendar(team, params, freq)
+        for key in agg_metrics.team_rollups:
+            func = getattr(team, key.split(".")[1])
+            for args in batched_check_args.get(key, batched_check_args["Team"]):
+                col_suffix = "_".join([""] + args)
+
+                start = time.perf_counter()
+                frame = team_metric_frame(
+                    team, calendar, months, params, freq, func, args, col_suffix
+                )
+                seconds = time.perf_counter() - start
+
+                start = time.perf_counter()
+                if args:
+                    loop_frame = team.loop_plot_team_df(
+                        func,
+                        params,
+                        freq=freq,
+                        additional_func_args=args,
+                        col_suffix=col_suffix,
+                    )
+                else:
+                    loop_frame = team.loop_plot_team_df(
+                        func, params, freq=freq, col_suffix=col_suffix
+                    )
+                loop_seconds = time.perf_counter() - start
+
+                pd.testing.assert_frame_equal(
+                    frame, loop_frame, check_dtype=False, check_exact=False
+                )
+
+                results.append(
+                    {
+                        "metric": key.split(".")[1] + col_suffix,
+                        "freq": freq,
+                        "seconds": round(seconds, 3),
+                        "loop_seconds": round(loop_seconds, 3),
+                    }
+                )
+
+    return pd.DataFrame(results)
+
+
+benchmarks = {
+    "bulk_load": benchmark_bulk_load,
+    "dates": benchmark_dates,
+    "admit_diff": benchmark_admit_diff,
+    "ids": benchmark_ids,
+    "agg_assembly": benchmark_agg_assembly,
+    "batched_metrics": benchmark_batched_metrics,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--benchmark",
+        default="bulk_load",
+        choices=list(benchmarks.keys()),
+        help="Name of the benchmark to run",
+    )
+
+    arguments = parser.parse_args()
+
+    print(benchmarks[arguments.benchmark]())
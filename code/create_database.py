@@ -2,6 +2,7 @@
 
 import luigi
 import shutil
+import sqlite3
 import os
 import time
 import pandas as pd
@@ -75,6 +76,7 @@ from data_to_sql import (
 )
 
 import agg_table_functions as atf
+from data_to_sql.sql_table_utils import set_bulk_load, analyze_database
 
 class GetCognifyFile(luigi.Task):
     cognify_filepath = luigi.Parameter(default="")
@@ -835,11 +837,52 @@ class CensusToSQL(luigi.Task):
     def run(self):
         monthly_census_to_sql.monthly_census_to_sql(update=False)
 
+class AnalyzeDatabase(luigi.Task):
+    log_file = f"{update_logs_folder}\\analyze_{str(pd.to_datetime('today').date())}.txt"
+
+    def requires(self):
+        return [InpatientToSQL(),
+        AddressesToSQL(),
+        ALfsToSQL(),
+        ApptsToSQL(),
+        AuthsToSQL(),
+        BurnsToSQL(),
+        AdmitClaimsToSQL(),
+        ClaimsDetailsToSQL(),
+        PaymentsToSQL(),
+        CentersToSQL(),
+        CenterDaysToSQL(),
+        DemographicsToSQL(),
+        DxToSQL(),
+        EnrollmentToSQL(),
+        EROnlyToSQL(),
+        FallsToSQL(),
+        InfectionsToSQL(),
+        InfluToSQL(),
+        MedErrorsToSQL(),
+        MedsToSQL(),
+        PnuemoToSQL(),
+        ReferralsToSQL(),
+        TeamsToSQL(),
+        WoundsToSQL(),
+        CensusToSQL()]
+
+    def output(self):
+        return luigi.LocalTarget(self.log_file)
+
+    def run(self):
+        # statistics are gathered once every table is loaded,
+        # so the agg table queries are planned with them
+        conn = sqlite3.connect(database_path)
+        analyze_database(conn)
+        conn.close()
+        open(self.log_file, "a").close()
+
 class EnrollmentAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\enrollment_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(), CensusToSQL(), ReferralsToSQL()]
+        return [AnalyzeDatabase(), EnrollmentToSQL(), CensusToSQL(), ReferralsToSQL()]
     
     def output(self):
         return luigi.LocalTarget(self.log_file)
@@ -852,7 +895,8 @@ class DemographicAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\demographic_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         DxToSQL(),
         ClaimsDetailsToSQL(),
         AdmitClaimsToSQL(),
@@ -870,7 +914,8 @@ class FallsAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\falls_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         BurnsToSQL(),
         FallsToSQL(),
@@ -890,7 +935,8 @@ class InfectionsAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\infections_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         BurnsToSQL(),
         FallsToSQL(),
@@ -910,7 +956,8 @@ class MedErrorsAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\med_errors_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         BurnsToSQL(),
         FallsToSQL(),
@@ -930,7 +977,8 @@ class WoundsAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\wounds_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         BurnsToSQL(),
         FallsToSQL(),
@@ -950,7 +998,8 @@ class BurnsErrorsAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\burns_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         BurnsToSQL(),
         FallsToSQL(),
@@ -970,7 +1019,8 @@ class UtilizationAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\utilization_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         ClaimsDetailsToSQL(),
         AdmitClaimsToSQL(),
@@ -990,7 +1040,8 @@ class QualityAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\quality_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         ClaimsDetailsToSQL(),
         AdmitClaimsToSQL(),
@@ -1012,7 +1063,8 @@ class TeamUtilizationAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\team_utilization_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         ClaimsDetailsToSQL(),
         AdmitClaimsToSQL(),
@@ -1034,7 +1086,8 @@ class TeamInfoAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\team_info_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         ClaimsDetailsToSQL(),
         AdmitClaimsToSQL(),
@@ -1056,7 +1109,8 @@ class TeamIncidentsAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\team_incidents_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         ClaimsDetailsToSQL(),
         AdmitClaimsToSQL(),
@@ -1083,7 +1137,8 @@ class CenterAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\center_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         ClaimsDetailsToSQL(),
         AdmitClaimsToSQL(),
@@ -1216,6 +1271,10 @@ class CreateDatabasePipeline(luigi.Task):
         print("Complete")
 
 if __name__ == "__main__":
-    result = luigi.build([CreateDatabasePipeline()], local_scheduler=True)
+    set_bulk_load(True)
+    try:
+        result = luigi.build([CreateDatabasePipeline()], local_scheduler=True)
+    finally:
+        set_bulk_load(False)
     with open(luigi_log, "w") as myfile:
         myfile.write(f"Date: {str(pd.to_datetime('today').date())}{result}")
@@ -3,7 +3,12 @@
 import argparse
 import sqlite3
 import pandas as pd
-from data_to_sql.sql_table_utils import create_table, update_sql_table, create_sql_dates
+from data_to_sql.sql_table_utils import (
+    create_table,
+    create_sql_dates,
+    update_sql_table,
+    add_facility_ids,
+)
 from file_paths import database_path, processed_data, update_logs_folder
 
 
@@ -14,6 +19,9 @@ def admission_claims_to_sql(update=True):
     Creates or Updates the database table using the
     indicated primary keys and foreign keys
 
+    If being updated claims are upserted on claim_id, so late arriving
+        claims are added and corrections to existing claims are applied
+
     Args:
         update(bool): indicates if database table is being updated or not
 
@@ -35,11 +43,9 @@ def admission_claims_to_sql(update=True):
     conn = sqlite3.connect(database_path)
 
     if update is True:
+        add_facility_ids("admission_claims", "provider", conn)
         update_sql_table(admission_claims, "admission_claims", conn, primary_key)
 
-        c = conn.cursor()
-        c.execute("DROP TABLE IF EXISTS temp;")
-
         print("admission_claims updated...")
 
     else:
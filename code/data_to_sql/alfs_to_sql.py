@@ -32,9 +32,6 @@ def alfs_to_sql(update=True):
     if update is True:
         update_sql_table(alfs, "alfs", conn, primary_key)
 
-        c = conn.cursor()
-        c.execute("DROP TABLE IF EXISTS temp;")
-
         print("alfs updated...")
 
     else:
@@ -32,9 +32,6 @@ def appts_to_sql(update=True):
     if update is True:
         update_sql_table(appts, "appointments", conn, primary_key)
 
-        c = conn.cursor()
-        c.execute("DROP TABLE IF EXISTS temp;")
-
         print("appointments updated...")
 
     else:
@@ -35,9 +35,6 @@ def center_days_to_sql(update=True):
     if update is True:
         update_sql_table(center_days, "center_days", conn, primary_key)
 
-        c = conn.cursor()
-        c.execute("DROP TABLE IF EXISTS temp;")
-
         print("center_days updated...")
 
     else:
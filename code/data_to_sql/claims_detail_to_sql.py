@@ -3,7 +3,12 @@
 import argparse
 import sqlite3
 import pandas as pd
-from data_to_sql.sql_table_utils import create_table, create_sql_dates
+from data_to_sql.sql_table_utils import (
+    create_table,
+    create_sql_dates,
+    update_sql_table,
+    add_facility_ids,
+)
 from file_paths import database_path, processed_data, update_logs_folder
 
 
@@ -14,7 +19,8 @@ def claims_detail_to_sql(update=True):
     Creates or Updates the database table using the
     indicated primary keys and foreign keys
 
-    If table is being updated - it is dropped and replaced entirely
+    If table is being updated claim lines are upserted on claim_line_id,
+        so new lines are added and the status of existing lines is refreshed
     
     Args:
         update(bool): indicates if database table is being updated or not
@@ -37,18 +43,8 @@ def claims_detail_to_sql(update=True):
     conn = sqlite3.connect(database_path)
 
     if update is True:
-        c = conn.cursor()
-        c.execute(f"DROP TABLE IF EXISTS claims_detail")
-
-        create_table(
-            claims_detail,
-            "claims_detail",
-            conn,
-            primary_key,
-            foreign_key,
-            ref_table,
-            ref_col,
-        )
+        add_facility_ids("claims_detail", "vendor", conn)
+        update_sql_table(claims_detail, "claims_detail", conn, primary_key)
 
         print("claims_detail updated...")
 
@@ -34,9 +34,6 @@ def demographics_to_sql(update=True):
     if update is True:
         update_sql_table(demographics, "demographics", conn, primary_key)
 
-        c = conn.cursor()
-        c.execute("DROP TABLE IF EXISTS temp;")
-
         print("demographics updated...")
 
     else:
@@ -3,7 +3,7 @@
 import argparse
 import sqlite3
 import pandas as pd
-from data_to_sql.sql_table_utils import create_table, update_sql_table, create_sql_dates
+from data_to_sql.sql_table_utils import create_table, rebuild_table, create_sql_dates
 from file_paths import database_path, processed_data, update_logs_folder
 
 
@@ -32,10 +32,7 @@ def dx_to_sql(update=True):
     conn = sqlite3.connect(database_path)
 
     if update is True:
-        c = conn.cursor()
-        c.execute("DROP TABLE IF EXISTS dx;")
-
-        create_table(dx, "dx", conn, primary_key, foreign_key, ref_table, ref_col)
+        rebuild_table(dx, "dx", conn, primary_key, foreign_key, ref_table, ref_col)
 
         print("dx updated...")
 
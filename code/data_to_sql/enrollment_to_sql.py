@@ -4,6 +4,7 @@ import argparse
 import sqlite3
 import pandas as pd
 from data_to_sql.sql_table_utils import create_table, update_sql_table, create_sql_dates
+from process_db_data.process_utilization import invalidate_enrollment
 from file_paths import database_path, processed_data, update_logs_folder
 
 
@@ -13,6 +14,8 @@ def enrollment_to_sql(update=True):
     Parse the dates to match SQL format of YYYY-MM-DD
     Creates or Updates the database table using the
     indicated primary keys and foreign keys
+    Enrollment dates cached by the utilization processors are cleared
+    once the table is written so they are read from the new table
 
     Args:
         update(bool): indicates if database table is being updated or not
@@ -35,9 +38,6 @@ def enrollment_to_sql(update=True):
 
         update_sql_table(enrollment, "enrollment", conn, primary_key)
 
-        c = conn.cursor()
-        c.execute("DROP TABLE IF EXISTS temp;")
-
         print("enrollment updated...")
 
     else:
@@ -49,6 +49,7 @@ def enrollment_to_sql(update=True):
 
     conn.commit()
     conn.close()
+    invalidate_enrollment()
 
     open(
         f"{update_logs_folder}\\enrollment_{str(pd.to_datetime('today').date())}.txt",
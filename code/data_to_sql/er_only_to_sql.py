@@ -3,7 +3,12 @@
 import argparse
 import sqlite3
 import pandas as pd
-from data_to_sql.sql_table_utils import create_table, update_sql_table, create_sql_dates
+from data_to_sql.sql_table_utils import (
+    create_table,
+    rebuild_table,
+    create_sql_dates,
+    update_last_admissions,
+)
 from file_paths import database_path, processed_data, update_logs_folder
 
 
@@ -16,6 +21,8 @@ def er_only_to_sql(update=True):
 
     If table is being updated - any visit with an admission date greater
     than 3 months from today is dropped
+
+    The last_admissions rows for er_only are refreshed once the table is loaded
     
     Args:
         update(bool): indicates if database table is being updated or not
@@ -35,10 +42,7 @@ def er_only_to_sql(update=True):
     conn = sqlite3.connect(database_path)
 
     if update is True:
-        c = conn.cursor()
-
-        c.execute(f"DROP TABLE IF EXISTS er_only")
-        create_table(
+        rebuild_table(
             er_only, "er_only", conn, primary_key, foreign_key, ref_table, ref_col
         )
 
@@ -53,6 +57,7 @@ def er_only_to_sql(update=True):
 
         print("er_only created...")
 
+    update_last_admissions(conn, "er_only", "er_only")
     conn.commit()
     conn.close()
 
@@ -3,7 +3,8 @@
 import argparse
 import sqlite3
 import pandas as pd
-from data_to_sql.sql_table_utils import create_table, update_sql_table
+from data_to_sql.sql_table_utils import create_table, update_sql_table, rebuild_table
+from process_db_data.data_cleaning_utils import id_member_multiplier
 from file_paths import (
     database_path,
     processed_data,
@@ -33,10 +34,24 @@ def grievances_to_sql(update=True):
     conn = sqlite3.connect(database_path)
 
     if update is True:
-        update_sql_table(grievances, "grievances", conn, primary_key)
-
-        c = conn.cursor()
-        c.execute("DROP TABLE IF EXISTS temp;")
+        # griev_ids made before the member/date/sequence format are replaced
+        # by rebuilding the table once, upserting would keep both ids
+        legacy_ids = conn.execute(
+            "SELECT COUNT(*) FROM grievances WHERE griev_id < ?",
+            (id_member_multiplier,),
+        ).fetchone()[0]
+        if legacy_ids:
+            rebuild_table(
+                grievances,
+                "grievances",
+                conn,
+                primary_key,
+                foreign_key,
+                ref_table,
+                ref_col,
+            )
+        else:
+            update_sql_table(grievances, "grievances", conn, primary_key)
 
         print("grievances updated...")
 
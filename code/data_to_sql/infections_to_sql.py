@@ -3,7 +3,7 @@
 import argparse
 import sqlite3
 import pandas as pd
-from data_to_sql.sql_table_utils import create_table, create_sql_dates
+from data_to_sql.sql_table_utils import create_table, rebuild_table, create_sql_dates
 from file_paths import database_path, processed_data, update_logs_folder
 
 
@@ -14,7 +14,8 @@ def infections_to_sql(update=True):
     Creates or Updates the database table using the
     indicated primary keys and foreign keys
 
-    If table is being updated - it is dropped and replaced entirely
+    If table is being updated - it is rebuilt in a shadow table
+    and swapped in once loaded
     
     Args:
         update(bool): indicates if database table is being updated or not
@@ -34,10 +35,7 @@ def infections_to_sql(update=True):
     conn = sqlite3.connect(database_path)
 
     if update is True:
-        c = conn.cursor()
-        c.execute(f"DROP TABLE IF EXISTS infections")
-
-        create_table(
+        rebuild_table(
             infections, "infections", conn, primary_key, foreign_key, ref_table, ref_col
         )
 
@@ -34,9 +34,6 @@ def influ_to_sql(update=True):
     if update is True:
         update_sql_table(influ, "influ", conn, primary_key)
 
-        c = conn.cursor()
-        c.execute("DROP TABLE IF EXISTS temp;")
-
         print("influ updated...")
 
     else:
@@ -3,7 +3,12 @@
 import argparse
 import sqlite3
 import pandas as pd
-from data_to_sql.sql_table_utils import create_table, update_sql_table, create_sql_dates
+from data_to_sql.sql_table_utils import (
+    create_table,
+    rebuild_table,
+    create_sql_dates,
+    update_last_admissions,
+)
 from file_paths import database_path, processed_data, update_logs_folder
 
 
@@ -16,6 +21,10 @@ def inpatient_to_sql(update=True):
 
     When creating the database, 6 views are created;
         acute, psych, nursing_home, custodial, respite, and skilled
+    When updating, the table is rebuilt in a shadow table and the views
+        are recreated when it is swapped in
+    The last_admissions rows for acute, psych and nursing_home are
+        refreshed once the table is loaded
 
     If table is being updated - any visit with an admission date greater
     than 3 months from today is dropped
@@ -38,10 +47,7 @@ def inpatient_to_sql(update=True):
     conn = sqlite3.connect(database_path)
 
     if update is True:
-        c = conn.cursor()
-
-        c.execute(f"DROP TABLE IF EXISTS inpatient")
-        create_table(
+        rebuild_table(
             acute, "inpatient", conn, primary_key, foreign_key, ref_table, ref_col
         )
 
@@ -107,6 +113,9 @@ def inpatient_to_sql(update=True):
             """
         )
 
+    update_last_admissions(conn, "acute", "acute")
+    update_last_admissions(conn, "psych", "psych")
+    update_last_admissions(conn, "nursing_home", "nursing_home")
     conn.commit()
     conn.close()
 
@@ -34,9 +34,6 @@ def meds_to_sql(update=True):
     if update is True:
         update_sql_table(meds, "medications", conn, primary_key)
 
-        c = conn.cursor()
-        c.execute("DROP TABLE IF EXISTS temp;")
-
         print("medications updated...")
 
     else:
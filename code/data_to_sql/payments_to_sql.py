@@ -3,9 +3,14 @@
 import argparse
 import sqlite3
 import pandas as pd
-from data_to_sql.sql_table_utils import create_table, update_sql_table, create_sql_dates
+from data_to_sql.sql_table_utils import (
+    create_table,
+    create_sql_dates,
+    append_new_rows,
+    add_facility_ids,
+    set_watermark,
+)
 from file_paths import database_path, processed_data, update_logs_folder
-from paceutils import Helpers
 
 
 def payments_to_sql(update=True):
@@ -15,9 +20,10 @@ def payments_to_sql(update=True):
     Creates or Updates the database table using the
     indicated primary keys and foreign keys
 
-    If being updated only payments with a date greater than or equal to
-        the most recent date in the database table are added
-        
+    If being updated only payments with a date paid on or after the
+        payments watermark are considered, payments already in the table
+        are skipped and new payments are appended with the next id_col
+
     Args:
         update(bool): indicates if database table is being updated or not
 
@@ -26,17 +32,7 @@ def payments_to_sql(update=True):
             can be told the process is complete.
     """
     payments = pd.read_csv(f"{processed_data}\\payments.csv", low_memory=False)
-    if update:
-        h = Helpers(database_path)
-        first_id_val = h.single_value_query("SELECT MAX(id_col) FROM payments") + 1
-        max_date = h.single_value_query("SELECT MAX(date_paid) FROM payments")
-
-        payments = payments[payments["date_paid"] >= max_date].copy()
-        payments.reset_index(inplace=True, drop=True)
-
-        payments["id_col"] = list(range(first_id_val, first_id_val + payments.shape[0]))
-
-    else:
+    if not update:
         payments.reset_index(inplace=True)
         payments.rename(columns={"index": "id_col"}, inplace=True)
 
@@ -50,11 +46,15 @@ def payments_to_sql(update=True):
     conn = sqlite3.connect(database_path)
 
     if update is True:
-
-        update_sql_table(payments, "payments", conn, primary_key)
-
-        c = conn.cursor()
-        c.execute("DROP TABLE IF EXISTS temp;")
+        add_facility_ids("payments", "vendor", conn)
+        # a payment has no id in the source, every other column identifies it
+        # facility_id is derived from vendor so it is left out of the key
+        natural_key = [
+            col for col in payments.columns if col not in ["id_col", "facility_id"]
+        ]
+        append_new_rows(
+            payments, "payments", conn, "date_paid", natural_key, id_col="id_col"
+        )
 
         print("payments updated...")
 
@@ -62,6 +62,7 @@ def payments_to_sql(update=True):
         create_table(
             payments, "payments", conn, primary_key, foreign_key, ref_table, ref_col
         )
+        set_watermark("payments", conn, "date_paid")
 
         print("payments created...")
 
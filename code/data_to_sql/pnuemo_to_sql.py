@@ -34,9 +34,6 @@ def pnuemo_to_sql(update=True):
     if update is True:
         update_sql_table(pneumo, "pneumo", conn, primary_key)
 
-        c = conn.cursor()
-        c.execute("DROP TABLE IF EXISTS temp;")
-
         print("pneumo updated...")
 
     else:
@@ -3,7 +3,11 @@
 import argparse
 import sqlite3
 import pandas as pd
-from data_to_sql.sql_table_utils import create_table, update_sql_table
+from data_to_sql.sql_table_utils import (
+    create_table,
+    update_sql_table,
+    invalidate_member_ids,
+)
 from file_paths import database_path, processed_data, update_logs_folder
 
 
@@ -13,6 +17,7 @@ def ppts_to_sql(update=True):
     Parse the dates to match SQL format of YYYY-MM-DD
     Creates or Updates the database table using the
     indicated primary keys
+    The shared member_id cache is invalidated once the table is written
 
     Args:
         update(bool): indicates if database table is being updated or not
@@ -30,9 +35,6 @@ def ppts_to_sql(update=True):
     if update is True:
         update_sql_table(ppts, "ppts", conn, primary_key)
 
-        c = conn.cursor()
-        c.execute("DROP TABLE IF EXISTS temp;")
-
         print("ppts updated...")
 
     else:
@@ -43,6 +45,8 @@ def ppts_to_sql(update=True):
     conn.commit()
     conn.close()
 
+    invalidate_member_ids()
+
     open(
         f"{update_logs_folder}\\ppts_{str(pd.to_datetime('today').date())}.txt", "a"
     ).close()
@@ -3,7 +3,7 @@
 import argparse
 import sqlite3
 import pandas as pd
-from data_to_sql.sql_table_utils import create_table, update_sql_table, create_sql_dates
+from data_to_sql.sql_table_utils import create_table, rebuild_table, create_sql_dates
 from file_paths import database_path, processed_data, update_logs_folder
 
 
@@ -37,10 +37,7 @@ def referrals_to_sql(update=True):
     conn = sqlite3.connect(database_path)
 
     if update is True:
-        c = conn.cursor()
-        c.execute("DROP TABLE IF EXISTS referrals;")
-
-        create_table(referrals, "referrals", conn, primary_key)
+        rebuild_table(referrals, "referrals", conn, primary_key)
 
         print("referrals updated...")
 
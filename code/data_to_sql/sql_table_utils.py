@@ -1,13 +1,618 @@
 #!/usr/bin/env python3
 
+import re
+import threading
 import warnings
+from contextlib import contextmanager
 import pandas as pd
 import numpy as np
-from file_paths import database_path
-from paceutils import Helpers
+from data_to_sql.table_schemas import table_schemas, table_indexes
 
 warnings.simplefilter(action="ignore", category=FutureWarning)
 
+# member_ids in the ppts table, shared by every loader in the process
+member_id_cache = {"database": None, "member_ids": None}
+
+
+def invalidate_member_ids():
+    """
+    Clears the cached ppts member_ids.
+    Should be called any time the ppts table is written to.
+    """
+    member_id_cache["database"] = None
+    member_id_cache["member_ids"] = None
+
+
+def current_member_ids(conn):
+    """
+    Returns the member_ids in the ppts table of the connected database
+    as a sorted numpy array.
+
+    The ids are queried once using the connection passed in and then
+    shared until invalidate_member_ids is called or a connection to
+    a different database file is used.
+
+    Args:
+        conn(Sqlite3 Connection): connection to the database
+
+    Returns:
+        array: sorted unique member_ids
+    """
+    # in memory databases have no file name, so fall back to the connection
+    database = conn.execute("PRAGMA database_list").fetchone()[2] or id(conn)
+
+    if (member_id_cache["member_ids"] is None) or (
+        member_id_cache["database"] != database
+    ):
+        member_ids = np.array(
+            [tup[0] for tup in conn.execute("SELECT member_id FROM ppts").fetchall()]
+        )
+        member_id_cache["member_ids"] = np.unique(member_ids)
+        member_id_cache["database"] = database
+
+    return member_id_cache["member_ids"]
+
+
+def filter_current_members(df, conn, member_col="member_id"):
+    """
+    Removes any rows with a member_id not found in the ppts table
+
+    Args:
+        df(DataFrame): pandas dataframe to be filtered
+        conn(Sqlite3 Connection): connection to the database
+        member_col(str): name of the member_id column in df
+
+    Returns:
+        DataFrame: filtered dataframe
+    """
+    mask = np.isin(df[member_col].values, current_member_ids(conn))
+    return df[mask].copy()
+
+
+# connection settings used while the database is being created from scratch
+# cache_size is negative so it is read as KiB (~500MB)
+bulk_load_pragmas = [
+    "PRAGMA cache_size = -512000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA foreign_keys = 1",
+]
+
+bulk_load_settings = {"enabled": False, "chunksize": 50000}
+
+
+def set_bulk_load(enabled=True, chunksize=50000):
+    """
+    Turns bulk-load mode on or off for every create_table call in the process.
+
+    In bulk-load mode each connection gets the bulk_load_pragmas and rows
+    are written with chunked executemany inserts inside one transaction
+    per table, with foreign key checks deferred to the commit.
+
+    Args:
+        enabled(bool): indicates if bulk-load mode should be used
+        chunksize(int): number of rows passed to each executemany call
+    """
+    bulk_load_settings["enabled"] = enabled
+    bulk_load_settings["chunksize"] = chunksize
+
+
+def set_load_pragmas(conn):
+    """
+    Sets the PRAGMAs used when writing to the database.
+    Uses the bulk_load_pragmas if bulk-load mode is on.
+
+    Args:
+        conn(Sqlite3 Connection): connection to the database
+    """
+    if bulk_load_settings["enabled"]:
+        for pragma in bulk_load_pragmas:
+            conn.execute(pragma)
+    else:
+        conn.execute("PRAGMA foreign_keys = 1")
+        conn.execute("PRAGMA journal_mode = MEMORY")
+
+
+# create dictionary that will map pandas types to SQLite types
+pd2sql = {
+    "flo": "FLOAT",
+    "int": "INTEGER",
+    "Int": "INTEGER",
+    "dat": "DATETIME",
+    "tim": "DATETIME",
+    "cat": "TEXT",
+    "obj": "TEXT",
+}
+
+def table_schema(table_name, agg_table=False):
+    """
+    Returns the declared schema for the table from table_schemas.
+    Tables that are not declared, and tables in the aggregate database,
+    get an empty schema so every column type comes from pd2sql.
+
+    Args:
+        table_name(str): name of the table
+        agg_table(bool): Indicates if this is a table in the aggregate database
+
+    Returns:
+        dict: without_rowid flag and dictionary of column name to SQLite type
+    """
+    if agg_table or (table_name not in table_schemas):
+        return {"without_rowid": False, "columns": {}}
+    return table_schemas[table_name]
+
+
+def column_sql_type(schema, col, dtype):
+    """
+    Returns the SQLite type of a column, using the declared type if
+    the column is in the schema and the pandas dtype if it is not.
+
+    Args:
+        schema(dict): schema returned by table_schema
+        col(str): name of the column
+        dtype(dtype): pandas dtype of the column
+
+    Returns:
+        str: SQLite type
+    """
+    if col in schema["columns"]:
+        return schema["columns"][col]
+    return pd2sql[str(dtype)[:3]]
+
+
+def drop_null_primary_keys(df, table_name, primary_key, schema):
+    """
+    Prepares the primary key values of a table declared WITHOUT ROWID,
+    as those tables do not allow NULL in the primary key columns.
+
+    Missing values of key columns in the schema's key_fill are replaced
+    with the declared value, then rows still missing a key value are
+    removed and the number removed for each column is printed.
+
+    Args:
+        df(DataFrame): pandas dataframe to be written to the table
+        table_name(str): name of the table
+        primary_key(list): list of columns to use as a primary key
+        schema(dict): schema returned by table_schema
+
+    Returns:
+        DataFrame: dataframe without missing primary key values
+    """
+    if not schema["without_rowid"]:
+        return df
+
+    key_fill = {
+        col: value
+        for col, value in schema.get("key_fill", {}).items()
+        if col in primary_key and df[col].isnull().any()
+    }
+    if key_fill:
+        df = df.fillna(key_fill)
+
+    null_keys = df[primary_key].isnull()
+    if null_keys.values.any():
+        for col in primary_key:
+            if null_keys[col].any():
+                print(
+                    f"{table_name}: {null_keys[col].sum()} rows missing {col} dropped"
+                )
+        df = df[~null_keys.any(axis=1)].copy()
+    return df
+
+
+# only one thread in the process writes to the database at a time,
+# the lock is not shared with other processes such as luigi workers,
+# those wait on SQLite's database lock for busy_timeout ms
+write_lock = threading.RLock()
+
+write_settings = {"busy_timeout": 600000}
+
+
+@contextmanager
+def database_write(conn):
+    """
+    Context manager that holds the write lock for the database.
+
+    The write_lock is acquired so other threads of the process wait, and a
+    BEGIN IMMEDIATE transaction is started so any other process writing to
+    the same file waits on the busy_timeout instead of failing. The
+    transaction is committed on exit, or rolled back if an exception is
+    raised. A connection with journal_mode OFF is moved to MEMORY first,
+    as a rollback is undefined without a journal.
+
+    Everything written inside must use the connection directly, such as
+    bulk_insert, not df.to_sql, which commits on its own.
+
+    Staging data should be done before entering so the lock is held
+    only while the table is being written.
+
+    Args:
+        conn(Sqlite3 Connection): connection to the database
+    """
+    with write_lock:
+        conn.commit()
+        if conn.execute("PRAGMA journal_mode").fetchone()[0] == "off":
+            conn.execute("PRAGMA journal_mode = MEMORY")
+        conn.execute(f"PRAGMA busy_timeout = {write_settings['busy_timeout']}")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            # deferred foreign key checks fail here, so this is rolled back too
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def bulk_insert(df, table_name, conn, chunksize=None):
+    """
+    Inserts all rows of the dataframe into an existing table using chunked
+    executemany calls. Foreign key checks are deferred until the
+    transaction is committed, which is left to the caller.
+
+    Args:
+        df(DataFrame): pandas dataframe to be inserted
+        table_name(str): name of the table to insert into
+        conn(Sqlite3 Connection): connection to the database
+        chunksize(int): number of rows passed to each executemany call
+    """
+    if chunksize is None:
+        chunksize = bulk_load_settings["chunksize"]
+
+    insert_cols = ", ".join(col for col in df.columns)
+    placeholders = ", ".join(["?"] * df.shape[1])
+    insert_sql = f"INSERT INTO {table_name} ({insert_cols}) VALUES ({placeholders})"
+
+    datetime_cols = [
+        col for col, dtype in df.dtypes.items() if str(dtype).startswith("datetime")
+    ]
+    extension_cols = [
+        col
+        for col, dtype in df.dtypes.items()
+        if pd.api.types.is_extension_array_dtype(dtype)
+    ]
+
+    c = conn.cursor()
+    c.execute("PRAGMA defer_foreign_keys = ON")
+
+    for start in range(0, df.shape[0], chunksize):
+        chunk = df.iloc[start : start + chunksize]
+        # sqlite3 can not bind Timestamps, write them the way to_sql does
+        # NaN is bound as NULL by sqlite, pd.NA of nullable dtypes is not
+        columns = [
+            chunk[col].dt.strftime("%Y-%m-%d %H:%M:%S").tolist()
+            if col in datetime_cols
+            else chunk[col].astype(object).where(chunk[col].notnull(), None).tolist()
+            if col in extension_cols
+            else chunk[col].tolist()
+            for col in chunk.columns
+        ]
+        c.executemany(insert_sql, zip(*columns))
+
+
+def stage_temp_table(df, conn, staging_table, schema):
+    """
+    Loads the dataframe into a TEMP table on the connection.
+
+    TEMP tables only exist for the connection that created them and are
+    not part of the database file, so loaders for different tables can
+    stage at the same time without holding the write lock.
+
+    Args:
+        df(DataFrame): pandas dataframe to be staged
+        conn(Sqlite3 Connection): connection to the database
+        staging_table(str): name of the TEMP table to create
+        schema(dict): schema returned by table_schema, used for column types
+    """
+    c = conn.cursor()
+    c.execute(f"DROP TABLE IF EXISTS temp.{staging_table}")
+
+    col_sql = ", ".join(
+        [
+            f"{col} {column_sql_type(schema, col, dtype)}"
+            for col, dtype in df.dtypes.iteritems()
+        ]
+    )
+    c.execute(f"CREATE TEMP TABLE {staging_table} ({col_sql})")
+
+    bulk_insert(df, staging_table, conn)
+    conn.commit()
+
+
+def update_set_cols(df, table_name, primary_key):
+    """
+    Returns the columns that are set when an existing row is updated.
+
+    Medications keep their original start_date and teams never have
+    end_date overwritten, it is set by update_sql_table after the merge.
+
+    Args:
+        df(DataFrame): pandas dataframe being loaded
+        table_name(str): name of the table
+        primary_key(list): list of columns to use as a primary key
+
+    Returns:
+        list: columns to update
+    """
+    if table_name == "medications":
+        set_cols = [
+            df_col
+            for df_col in df.columns
+            if (df_col not in primary_key) & (df_col != "start_date")
+        ]
+    elif table_name == "teams":
+        set_cols = [df_col for df_col in df.columns if df_col != "end_date"]
+    else:
+        set_cols = [df_col for df_col in df.columns if df_col not in primary_key]
+
+    # old_center is only used to close the previous center in update mode
+    return [col for col in set_cols if col not in ["old_center", "row_hash"]]
+
+
+def add_row_hash(df, table_name, primary_key):
+    """
+    Adds a row_hash column with a hash of each row's update columns.
+
+    The hash is computed with pandas in one vectorized pass and stored
+    as a signed 64 bit integer so SQLite can hold it.
+
+    Args:
+        df(DataFrame): pandas dataframe being loaded
+        table_name(str): name of the table
+        primary_key(list): list of columns to use as a primary key
+
+    Returns:
+        DataFrame: dataframe with a row_hash column
+    """
+    hash_cols = [
+        col
+        for col in update_set_cols(df, table_name, primary_key)
+        if col not in primary_key
+    ]
+    row_hash = pd.util.hash_pandas_object(df[hash_cols], index=False)
+    df = df.copy()
+    df["row_hash"] = row_hash.values.view(np.int64)
+    return df
+
+
+def create_indexes(table_name, conn, agg_table=False, schema_table=None):
+    """
+    Creates the secondary indexes listed for the table in table_indexes.
+
+    Only missing indexes are built, so this can be called after every load.
+    Any index with a column that is not in the table is skipped.
+
+    Index names alternate between idx_<table>_<cols> and the same name
+    with _alt, so a shadow table can be indexed while the table it
+    replaces still holds the other name.
+
+    Args:
+        table_name(str): name of the table to index
+        conn(Sqlite3 Connection): connection to the database
+        agg_table(bool): Indicates if this is a table in the aggregate database
+        schema_table(str): name the table is listed under in table_indexes,
+            if different from table_name
+
+    Output:
+        Indexes on the table in the connected database
+    """
+    if agg_table:
+        return None
+    if schema_table is None:
+        schema_table = table_name
+
+    c = conn.cursor()
+    table_cols = [row[1] for row in c.execute(f"PRAGMA table_info({table_name})")]
+    existing = dict(
+        c.execute("SELECT name, tbl_name FROM sqlite_master WHERE type = 'index'")
+    )
+
+    for index_cols in table_indexes.get(schema_table, []):
+        missing_cols = [col for col in index_cols if col not in table_cols]
+        if missing_cols:
+            print(f"{table_name}: index skipped, missing columns {missing_cols}")
+            continue
+
+        index_names = [f"idx_{schema_table}_{'_'.join(index_cols)}"]
+        index_names.append(f"{index_names[0]}_alt")
+        if any(existing.get(name) == table_name for name in index_names):
+            continue
+        index_name = [name for name in index_names if name not in existing][0]
+
+        c.execute(
+            f"""
+            CREATE INDEX {index_name}
+            ON {table_name} ({', '.join(index_cols)})
+            """
+        )
+
+
+def analyze_database(conn):
+    """
+    Runs ANALYZE so the query planner has up to date statistics
+    for choosing between the primary keys and the secondary indexes.
+
+    Args:
+        conn(Sqlite3 Connection): connection to the database
+    """
+    with database_write(conn):
+        conn.execute("ANALYZE")
+
+
+def rebuild_table(
+    df,
+    table_name,
+    conn,
+    primary_key,
+    foreign_key=None,
+    ref_table=None,
+    ref_col=None,
+    min_row_ratio=0.5,
+):
+    """
+    Replaces a table without readers ever seeing it missing or half loaded.
+
+    The new rows are loaded into <table_name>__new with bulk-load settings
+    and indexed. If the new table has no rows, or fewer than min_row_ratio
+    times the rows of the current table, it is dropped and a ValueError
+    is raised, leaving the current table in place.
+
+    Otherwise one short transaction drops any views that select from the
+    table, drops the current table, renames the new table and recreates
+    the views.
+
+    Args:
+        df(DataFrame): pandas dataframe to be turned into sql table
+        table_name(str): name of the table to be replaced
+        conn(Sqlite3 Connection): connection to the database
+        primary_key(list): list of columns to use as a primary key
+        foreign_key(list): list of column to use as a foreign key
+        ref_table(list): list of tables the foreign key columns correspond to
+        ref_col(list): list of columns in the references tables the foreign key columns correspond to
+        min_row_ratio(float): smallest allowed ratio of new rows to current rows
+
+    Output:
+        Replaced table in the connected database
+    """
+    shadow_table = f"{table_name}__new"
+    c = conn.cursor()
+    with database_write(conn):
+        c.execute(f"DROP TABLE IF EXISTS {shadow_table}")
+
+    bulk_enabled = bulk_load_settings["enabled"]
+    bulk_load_settings["enabled"] = True
+    try:
+        create_table(
+            df,
+            shadow_table,
+            conn,
+            primary_key,
+            foreign_key,
+            ref_table,
+            ref_col,
+            schema_table=table_name,
+        )
+    finally:
+        bulk_load_settings["enabled"] = bulk_enabled
+        set_load_pragmas(conn)
+
+    new_rows = c.execute(f"SELECT COUNT(*) FROM {shadow_table}").fetchone()[0]
+    table_exists = c.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (table_name,),
+    ).fetchone()[0]
+    if table_exists:
+        old_rows = c.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    else:
+        old_rows = 0
+
+    if (new_rows == 0) or (new_rows < old_rows * min_row_ratio):
+        with database_write(conn):
+            c.execute(f"DROP TABLE IF EXISTS {shadow_table}")
+        raise ValueError(
+            f"{table_name} not replaced, new table has {new_rows} rows "
+            f"and the current table has {old_rows}"
+        )
+
+    swap_shadow_table(table_name, shadow_table, conn)
+
+    print(f"{table_name}: replaced {old_rows} rows with {new_rows} rows")
+
+
+def swap_shadow_table(table_name, shadow_table, conn):
+    """
+    Replaces a table with its shadow table in one short transaction.
+
+    Any views that select from the table are dropped, the current table
+    is dropped, the shadow table is renamed and the views are recreated.
+
+    Args:
+        table_name(str): name of the table to be replaced
+        shadow_table(str): name of the loaded table replacing it
+        conn(Sqlite3 Connection): connection to the database
+
+    Output:
+        Replaced table in the connected database
+    """
+    c = conn.cursor()
+    # the swap is journaled so a failure leaves the current table in place
+    conn.execute("PRAGMA journal_mode = DELETE")
+    with database_write(conn):
+        views = c.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'view'"
+        ).fetchall()
+        dependent_views = [
+            (name, sql)
+            for name, sql in views
+            if re.search(rf"\b{table_name}\b", sql, re.IGNORECASE)
+        ]
+        for name, sql in dependent_views:
+            c.execute(f"DROP VIEW {name}")
+        c.execute(f"DROP TABLE IF EXISTS {table_name}")
+        c.execute(f"ALTER TABLE {shadow_table} RENAME TO {table_name}")
+        for name, sql in dependent_views:
+            c.execute(sql)
+        stamp_table_change(table_name, conn)
+    set_load_pragmas(conn)
+
+
+# formats tried, in order, before pandas is left to infer the format
+date_formats = ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%m/%d/%Y", "%m/%d/%Y %H:%M"]
+
+
+def parse_dates(values):
+    """
+    Parses date values using the first format in date_formats that
+    every value matches, falling back to letting pandas infer it.
+
+    Args:
+        values(Index): date values to parse
+
+    Returns:
+        DatetimeIndex: parsed dates
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return pd.DatetimeIndex(values)
+    # an empty column is read as float NaN, which has no format to match
+    if (len(values) == 0) or values.isnull().all():
+        return pd.DatetimeIndex([pd.NaT] * len(values))
+    for date_format in date_formats:
+        try:
+            return pd.DatetimeIndex(pd.to_datetime(values, format=date_format))
+        except (ValueError, TypeError):
+            continue
+    # parsed as a Series, as create_sql_dates did, since a Float64Index
+    # of numeric dates cannot be converted directly
+    return pd.DatetimeIndex(pd.to_datetime(pd.Series(values)))
+
+
+def iso_dates(col):
+    """
+    Converts a column of dates to YYYY-MM-DD strings, with NaN for
+    missing dates.
+
+    Each distinct value is parsed and formatted once and the results are
+    mapped back to the rows, so repeated dates cost nothing extra.
+    Formatting is done by numpy on datetime64[D] values, not with
+    strftime on each element.
+
+    Args:
+        col(Series): column of dates as strings or datetimes
+
+    Returns:
+        Series: column of ISO date strings
+    """
+    codes, uniques = pd.factorize(col)
+    dates = parse_dates(uniques)
+
+    iso = dates.values.astype("datetime64[D]").astype(str).astype(object)
+    iso[dates.isna()] = np.nan
+    # factorize codes missing values as -1, which picks up the NaN at the end
+    iso = np.append(iso, np.nan)
+
+    return pd.Series(iso[codes], index=col.index)
+
 
 def create_sql_dates(df, additional_date_cols=None):
     """
@@ -27,8 +632,7 @@ def create_sql_dates(df, additional_date_cols=None):
     if additional_date_cols is not None:
         date_cols = date_cols + additional_date_cols
     for col in date_cols:
-        df[col] = pd.to_datetime(df[col]).dt.strftime("%Y-%m-%d")
-        df[col].replace({"NaT": np.nan}, inplace=True)
+        df[col] = iso_dates(df[col])
     return df
 
 
@@ -41,6 +645,7 @@ def create_table(
     ref_table=None,
     ref_col=None,
     agg_table=False,
+    schema_table=None,
 ):
     """
     Takes a pandas dataframe, sqlite3 connection, primary key columns,
@@ -49,6 +654,12 @@ def create_table(
 
     Foreign_keys are is set to 1 for the database
     Any ppts not found in the ppts table are removed from df
+    The table is created and written while holding database_write
+    Column types and WITHOUT ROWID come from table_schemas if the table
+    is declared there, otherwise types are mapped from the pandas dtypes
+    Secondary indexes from table_indexes are built after the rows are written
+    Rows are written with bulk_insert inside the write transaction
+    If bulk-load mode is on the bulk_load_pragmas are used
     SQL Query is built;
         Create TABLE IF NOT EXISTS table_name
         Then columns, dtypes are looped through and if/then statements
@@ -63,41 +674,35 @@ def create_table(
         ref_table(list): list of tables the foreign key columns correspond to
         ref_col(list): list of columns in the references tables the foreign key columns correspond to
         agg_table(bool): Indicates if this is a table in the aggregate database
+        schema_table(str): name the table is declared under in table_schemas,
+            if different from table_name
 
     Output:
         New table in the connected database
 
     """
-    # create dictionary that will map pandas types to SQLite types
-    pd2sql = {
-        "flo": "FLOAT",
-        "int": "INTEGER",
-        "dat": "DATETIME",
-        "tim": "DATETIME",
-        "cat": "TEXT",
-        "obj": "TEXT",
-    }
-
     if (not agg_table) and (ref_table is not None):
         if ref_table[0] == "ppts":
             df[ref_col] = df[ref_col].astype(int)
-            helper = Helpers(database_path)
-            current_mem_ids = [
-                tup[0]
-                for tup in helper.fetchall_query("SELECT member_id FROM ppts", [])
-            ]
+            df = filter_current_members(df, conn)
 
-            df = df[df.member_id.isin(current_mem_ids)].copy()
+    # rebuild_table loads shadow tables under the name they are declared as
+    shadow_table = schema_table is not None
+    if schema_table is None:
+        schema_table = table_name
+    schema = table_schema(schema_table, agg_table)
+    df = drop_null_primary_keys(df, table_name, primary_key, schema)
+    if schema.get("row_hash", False):
+        df = add_row_hash(df, schema_table, primary_key)
 
-    conn.execute("PRAGMA foreign_keys = 1")
-    conn.execute("PRAGMA journal_mode = OFF")
+    set_load_pragmas(conn)
     # build sql query to create tables
     sql_query = """"""
     sql_query += f"CREATE TABLE IF NOT EXISTS {table_name} ("
 
     if (foreign_key is None) and (len(primary_key) == 1):
         for col, dtype in df.dtypes.iteritems():
-            sql_type = pd2sql[str(dtype)[:3]]
+            sql_type = column_sql_type(schema, col, dtype)
             if col == df.columns[-1]:
                 end = ""
             else:
@@ -109,7 +714,7 @@ def create_table(
 
     elif (foreign_key is not None) and (len(primary_key) == 1):
         for col, dtype in df.dtypes.iteritems():
-            sql_type = pd2sql[str(dtype)[:3]]
+            sql_type = column_sql_type(schema, col, dtype)
             if col in primary_key:
                 sql_query += f"{col} {sql_type} PRIMARY KEY,"
             else:
@@ -120,7 +725,7 @@ def create_table(
             sql_query += f"FOREIGN KEY ({fk}) REFERENCES {rtb} ({rcol}) "
     else:
         for col, dtype in df.dtypes.iteritems():
-            sql_type = pd2sql[str(dtype)[:3]]
+            sql_type = column_sql_type(schema, col, dtype)
             sql_query += f"{col} {sql_type},"
         # create primary key SQL
 
@@ -140,44 +745,63 @@ def create_table(
 
         sql_query += pk
 
-    sql_query += ");"
+    if schema["without_rowid"]:
+        sql_query += ") WITHOUT ROWID;"
+    else:
+        sql_query += ");"
 
-    c = conn.cursor()
-    c.execute(sql_query)
-    conn.commit()
     # take pandas dataframe and append all rows to our sql table
     df.drop_duplicates(subset=primary_key, inplace=True)
-    df.to_sql(table_name, conn, if_exists="append", index=False)
-    conn.commit()
+    with database_write(conn):
+        c = conn.cursor()
+        c.execute(sql_query)
+        # rows are inserted in the transaction, df.to_sql would commit
+        bulk_insert(df, table_name, conn)
+        # indexes are built once the rows are in, not maintained row by row
+        create_indexes(table_name, conn, agg_table, schema_table)
+        # shadow tables are stamped when they are swapped in
+        if not agg_table and not shadow_table:
+            stamp_table_change(table_name, conn)
 
 
-def update_sql_table(df, table_name, conn, primary_key, agg_table=False):
+def update_sql_table(df, table_name, conn, primary_key, agg_table=False, upsert=True):
     """
     Takes a pandas dataframe, sqlite3 connection and primary key columns,
     to create a table in the connected database.
 
     Foreign_keys are is set to 1 for the database
     Any ppts not found in the ppts table are removed from df
-    New dataframe is added to the database as a temp table
+    New dataframe is added to the connection as a TEMP table named
+    staging_{table_name}, so loaders for different tables never share
+    a staging table. The statements below run while holding database_write.
 
     SQL to filter the existing table for updating is created;
         This is where the primary key columns match
         For the updating query we want to only update rows with matching primary keys
             this means we do not want to SET on the primary key columns
-        SET SQL is of the form table.col = (SELECT col FROM temp WHERE pks match)
+        SET SQL is of the form table.col = (SELECT col FROM staging WHERE pks match)
         The update query ends up being;
             UPDATE table_nam
             SET using the set SQL above created with a for loop
-            WHERE EXISTS (set cols in temp where pks match)
+            WHERE EXISTS (set cols in staging where pks match)
 
         Next new rows are added to the table using INSERT OR REPLACE
-        WHERE NOT EXISTS rows in temp where the pks match.
+        WHERE NOT EXISTS rows in staging where the pks match.
+
+    If upsert is True (the default) the two statements above are replaced
+    by a single INSERT ... ON CONFLICT(pks) DO UPDATE against the staging table
+    with a unique index on the primary key columns. Rows are only rewritten
+    if one of the SET columns has changed.
 
-    If the updating table is addresses, any member_id in the temp table that
+    Tables with row_hash set in table_schemas store a hash of the SET
+    columns, so the upsert compares the stored and staged hashes instead.
+
+    If the updating table is addresses, any member_id in the staging table that
     already exists in addresses with an as_of date less than the as_of in
-    the temp has active set to 0.
+    the staging table has active set to 0.
 
-    Lastly the temp table is dropped.
+    Any secondary indexes from table_indexes that are missing are created
+    and lastly the staging table is dropped.
 
     Args:
         df(DataFrame): pandas dataframe to be turned into sql table
@@ -185,6 +809,11 @@ def update_sql_table(df, table_name, conn, primary_key, agg_table=False):
         conn(Sqlite3 Connection): connection to the database
         primary_key(list): list of columns to use as a primary key
         agg_table(bool): Indicates if this is a table in the aggregate database
+        upsert(bool): Indicates if the single pass upsert should be used
+            instead of the UPDATE then INSERT statements
+
+    Returns:
+        dict: count of inserted, updated and unchanged rows if upsert is True
 
     Output:
         Updated table in the connected database
@@ -193,130 +822,553 @@ def update_sql_table(df, table_name, conn, primary_key, agg_table=False):
     if df.shape[0] == 0:
         return None
     if (table_name != "ppts") & (not agg_table):
-        helper = Helpers(database_path)
-        current_mem_ids = [
-            tup[0] for tup in helper.fetchall_query("SELECT member_id FROM ppts", [])
-        ]
-        df = df[df.member_id.isin(current_mem_ids)].copy()
+        df = filter_current_members(df, conn)
 
     conn.execute("PRAGMA foreign_keys = 1")
-    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA journal_mode = MEMORY")
     c = conn.cursor()
 
-    # create temp table with possibly new data from Cognify
-    df.to_sql("temp", conn, index=False, if_exists="replace")
-
-    if table_name == "centers":
-        update_old_team_end_dates = """
-                                    UPDATE centers
-                                    SET end_date = (SELECT start_date FROM temp 
-                                                    WHERE member_id=centers.member_id
-                                                    AND old_center NOT NULL
-                                                    AND start_date != centers.end_date
-                                                    AND old_center != centers.center),
-                                    center = (SELECT old_center FROM temp
-                                            WHERE member_id=centers.member_id
-                                            AND old_center NOT NULL
-                                            AND start_date != centers.end_date
-                                            AND old_center != centers.center)
-                                    WHERE EXISTS (SELECT start_date, old_center FROM temp
-                                                    WHERE member_id=centers.member_id
-                                                    AND old_center NOT NULL
-                                                    AND start_date != centers.end_date
-                                                    AND old_center != centers.center)
-                                    """
-        c.execute(update_old_team_end_dates)
-        conn.commit()
-        df.drop(["old_center"], axis=1, inplace=True)
-        df.to_sql("temp", conn, index=False, if_exists="replace")
+    schema = table_schema(table_name, agg_table)
+    df = drop_null_primary_keys(df, table_name, primary_key, schema)
 
-    # filters sql table for non new rows
-    # and updates the cols
-    filter_sql = f"""WHERE {primary_key[0]} = {table_name}.{primary_key[0]}"""
+    if upsert:
+        # a pk can only be upserted once per statement
+        df = df.drop_duplicates(subset=primary_key)
+    if schema.get("row_hash", False):
+        df = add_row_hash(df, table_name, primary_key)
+        table_cols = [row[1] for row in c.execute(f"PRAGMA table_info({table_name})")]
+        if "row_hash" not in table_cols:
+            # existing rows get a NULL hash and are rewritten once
+            c.execute(f"ALTER TABLE {table_name} ADD COLUMN row_hash INTEGER")
+            conn.commit()
 
-    try:
-        for col in primary_key[1:]:
-            filter_sql += f"""
-                AND {col} = {table_name}.{col}
+    # create staging table with possibly new data from Cognify
+    staging_table = f"staging_{table_name}"
+    stage_temp_table(df, conn, staging_table, schema)
+
+    with database_write(conn):
+        if table_name == "centers":
+            update_old_team_end_dates = f"""
+                                        UPDATE centers
+                                        SET end_date = (SELECT start_date FROM {staging_table} 
+                                                        WHERE member_id=centers.member_id
+                                                        AND old_center NOT NULL
+                                                        AND start_date != centers.end_date
+                                                        AND old_center != centers.center),
+                                        center = (SELECT old_center FROM {staging_table}
+                                                WHERE member_id=centers.member_id
+                                                AND old_center NOT NULL
+                                                AND start_date != centers.end_date
+                                                AND old_center != centers.center)
+                                        WHERE EXISTS (SELECT start_date, old_center FROM {staging_table}
+                                                        WHERE member_id=centers.member_id
+                                                        AND old_center NOT NULL
+                                                        AND start_date != centers.end_date
+                                                        AND old_center != centers.center)
+                                        """
+            c.execute(update_old_team_end_dates)
+            # old_center is left in the staging table, it is not selected below
+            df = df.drop(["old_center"], axis=1)
+
+        set_cols = update_set_cols(df, table_name, primary_key)
+        if "row_hash" in df.columns:
+            set_cols = set_cols + ["row_hash"]
+
+        if upsert:
+            counts = upsert_from_staging(
+                df,
+                table_name,
+                conn,
+                primary_key,
+                [col for col in set_cols if col not in primary_key],
+                staging_table,
+            )
+        else:
+            counts = None
+            # filters sql table for non new rows
+            # and updates the cols
+            filter_sql = (
+                f"""WHERE {primary_key[0]} = {table_name}.{primary_key[0]}"""
+            )
+
+            try:
+                for col in primary_key[1:]:
+                    filter_sql += f"""
+                        AND {col} = {table_name}.{col}
+                        """
+            except IndexError:
+                pass
+
+            set_sql = ", ".join(
+                [
+                    f"""{col} = (SELECT {col} FROM {staging_table} {filter_sql})"""
+                    for col in set_cols
+                ]
+            )
+            join_cols = ", ".join(set_cols)
+            exists_sql = f"""(SELECT {join_cols} FROM {staging_table} {filter_sql})"""
+
+            c.execute(
+                f"""
+                UPDATE {table_name}
+                SET {set_sql}
+                WHERE EXISTS {exists_sql};
                 """
-    except IndexError:
-        pass
+            )
 
-    if table_name == "medications":
-        set_cols = [
-            df_col
-            for df_col in df.columns
-            if (df_col not in primary_key) & (df_col != "start_date")
-        ]
-    elif table_name == "teams":
-        set_cols = [df_col for df_col in df.columns if df_col != "end_date"]
-    else:
-        set_cols = [df_col for df_col in df.columns if df_col not in primary_key]
+            # inserts new data if there is a primary key in the pandas df
+            # that is not in the sql table
 
-    set_sql = ", ".join(
-        [f"""{col} = (SELECT {col} FROM temp {filter_sql})""" for col in set_cols]
-    )
-    join_cols = ", ".join(set_cols)
-    exists_sql = f"""(SELECT {join_cols} FROM temp {filter_sql})"""
+            insert_cols = ", ".join(col for col in df.columns)
+
+            compare_pk_sql = " AND ".join(
+                [f"""f.{col} = t.{col}""" for col in primary_key]
+            )
+
+            c.execute(
+                f"""
+                INSERT INTO {table_name} ({insert_cols})
+                SELECT {insert_cols} FROM {staging_table} t
+                WHERE NOT EXISTS
+                    (SELECT {insert_cols} from {table_name} f
+                    WHERE {compare_pk_sql});
+                """
+            )
+
+        if table_name == "addresses":
+            as_of_date = df["as_of"].unique()[0]
+            c.execute(
+                f"""
+            UPDATE addresses
+            SET active = 0
+            WHERE addresses.member_id IN (SELECT member_id FROM {staging_table})
+            AND addresses.as_of < {as_of_date};       
+            """
+            )
+
+        if table_name == "teams":
+            as_of_date = df["start_date"].unique()[0]
+            c.execute(
+                f"""
+            UPDATE teams
+            SET end_date = {as_of_date}
+            WHERE teams.member_id IN (SELECT member_id FROM {staging_table})
+            AND teams.start_date < {as_of_date}
+            AND teams.end_date IS NULL;
+            """
+            )
+            c.execute(
+                f"""
+            UPDATE teams
+            SET end_date = (SELECT disenrollment_date FROM enrollment
+                            WHERE member_id=teams.member_id)
+            WHERE teams.member_id IN (SELECT member_id FROM enrollment
+            WHERE disenrollment_date NOT NULL)
+            AND teams.end_date IS NULL;
+            """
+            )
+
+        create_indexes(table_name, conn, agg_table)
+        if not agg_table:
+            stamp_table_change(table_name, conn)
+
+    c.execute(f"DROP TABLE IF EXISTS temp.{staging_table}")
+    conn.commit()
+
+    return counts
+
+
+def upsert_from_staging(df, table_name, conn, primary_key, set_cols, staging_table):
+    """
+    Merges the rows of the staging table into the indicated table in a
+    single pass.
+
+    A unique index is created on the primary key columns of the staging table,
+    rows that do not exist in the table are counted and then one
+    INSERT ... ON CONFLICT(pks) DO UPDATE is run. The DO UPDATE only fires
+    if at least one of the SET columns is different, so unchanged rows are
+    not rewritten. If the table stores a row_hash only the hashes are
+    compared. Committing is left to the caller.
 
+    Args:
+        df(DataFrame): pandas dataframe that was loaded into the staging table
+        table_name(str): name of the table to be updated
+        conn(Sqlite3 Connection): connection to the database
+        primary_key(list): list of columns to use as a primary key
+        set_cols(list): list of columns to update for existing rows
+        staging_table(str): name of the TEMP table holding the new rows
+
+    Returns:
+        dict: count of inserted, updated and unchanged rows
+    """
+    c = conn.cursor()
+
+    pk_cols = ", ".join(primary_key)
     c.execute(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS temp.{staging_table}_pk "
+        f"ON {staging_table} ({pk_cols})"
+    )
+
+    staged = c.execute(f"SELECT COUNT(*) FROM {staging_table}").fetchone()[0]
+
+    compare_pk_sql = " AND ".join([f"""f.{col} = t.{col}""" for col in primary_key])
+    inserted = c.execute(
         f"""
-        UPDATE {table_name}
-        SET {set_sql}
-        WHERE EXISTS {exists_sql};
+        SELECT COUNT(*) FROM {staging_table} t
+        WHERE NOT EXISTS
+            (SELECT 1 FROM {table_name} f
+            WHERE {compare_pk_sql});
         """
-    )
+    ).fetchone()[0]
 
-    conn.commit()
-    # inserts new data if there is a primary key in the pandas df
-    # that is not in the sql table
+    if set_cols:
+        set_sql = ", ".join([f"""{col} = excluded.{col}""" for col in set_cols])
+        if "row_hash" in set_cols:
+            # one integer compare instead of comparing every column
+            changed_sql = f"{table_name}.row_hash IS NOT excluded.row_hash"
+        else:
+            changed_sql = " OR ".join(
+                [f"""{table_name}.{col} IS NOT excluded.{col}""" for col in set_cols]
+            )
+        conflict_sql = f"DO UPDATE SET {set_sql} WHERE {changed_sql}"
+    else:
+        conflict_sql = "DO NOTHING"
 
     insert_cols = ", ".join(col for col in df.columns)
 
-    compare_pk_sql = " AND ".join([f"""f.{col} = t.{col}""" for col in primary_key])
-
+    changes_before = conn.total_changes
+    # WHERE true is needed so the ON CONFLICT is not parsed as a join
     c.execute(
         f"""
         INSERT INTO {table_name} ({insert_cols})
-        SELECT {insert_cols} FROM temp t
-        WHERE NOT EXISTS
-            (SELECT {insert_cols} from {table_name} f
-            WHERE {compare_pk_sql});
+        SELECT {insert_cols} FROM {staging_table} WHERE true
+        ON CONFLICT ({pk_cols}) {conflict_sql};
         """
     )
+    updated = conn.total_changes - changes_before - inserted
+
+    counts = {
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": staged - inserted - updated,
+    }
+    print(
+        f"{table_name}: {counts['inserted']} inserted, "
+        f"{counts['updated']} updated, {counts['unchanged']} unchanged"
+    )
+
+    return counts
+
 
-    if table_name == "addresses":
-        as_of_date = df["as_of"].unique()[0]
+def update_last_admissions(conn, utilization_type, source):
+    """
+    Refreshes the last_admissions rows for a utilization type from the
+    table or view it is loaded into.
+
+    last_admissions holds each member's most recent admission and discharge
+    date per utilization type (acute, psych, nursing_home, er_only), so new
+    visits can be scored without reading the member's whole history.
+    Sources without a discharge_date column store NULL.
+
+    Args:
+        conn(Sqlite3 Connection): connection to the database
+        utilization_type(str): utilization type the rows are stored under
+        source(str): table or view with the visits of that type
+
+    Output:
+        Updated last_admissions table in the connected database
+    """
+    c = conn.cursor()
+    source_cols = [row[1] for row in c.execute(f"PRAGMA table_info({source})")]
+    if "discharge_date" in source_cols:
+        discharge_sql = "discharge_date"
+    else:
+        discharge_sql = "NULL"
+
+    with database_write(conn):
         c.execute(
-            f"""
-        UPDATE addresses
-        SET active = 0
-        WHERE addresses.member_id IN (SELECT member_id FROM temp)
-        AND addresses.as_of < {as_of_date};       
-        """
+            """
+            CREATE TABLE IF NOT EXISTS last_admissions (
+                member_id INTEGER,
+                utilization_type TEXT,
+                admission_date TEXT,
+                discharge_date TEXT,
+                PRIMARY KEY (member_id, utilization_type)
+            ) WITHOUT ROWID;
+            """
         )
-
-    if table_name == "teams":
-        as_of_date = df["start_date"].unique()[0]
+        c.execute(
+            "DELETE FROM last_admissions WHERE utilization_type = ?",
+            (utilization_type,),
+        )
+        # ordered the same way discharge_admit_diff sorts visits
         c.execute(
             f"""
-        UPDATE teams
-        SET end_date = {as_of_date}
-        WHERE teams.member_id IN (SELECT member_id FROM temp)
-        AND teams.start_date < {as_of_date}
-        AND teams.end_date IS NULL;
+            INSERT INTO last_admissions
+            SELECT member_id, ?, admission_date, discharge_date FROM (
+                SELECT member_id, admission_date, {discharge_sql} AS discharge_date,
+                ROW_NUMBER() OVER (
+                    PARTITION BY member_id
+                    ORDER BY admission_date DESC, {discharge_sql} DESC
+                ) AS visit_order
+                FROM {source}
+                WHERE member_id IS NOT NULL
+            )
+            WHERE visit_order = 1;
+            """,
+            (utilization_type,),
+        )
+
+
+def create_watermark_table(conn):
+    """
+    Creates the load_watermarks table if it does not exist.
+    It holds the last loaded value of the watermark column
+    for each append-only table.
+
+    Args:
+        conn(Sqlite3 Connection): connection to the database
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS load_watermarks (
+            table_name TEXT PRIMARY KEY,
+            watermark_col TEXT,
+            watermark TEXT,
+            updated TEXT
+        );
+        """
+    )
+
+
+def get_watermark(table_name, conn, watermark_col):
+    """
+    Returns the persisted watermark for the table from load_watermarks.
+
+    If the table has no watermark yet the max of the watermark column
+    in the table is recorded and returned.
+
+    Args:
+        table_name(str): name of the table
+        conn(Sqlite3 Connection): connection to the database
+        watermark_col(str): column the watermark is taken from
+
+    Returns:
+        str: watermark value, None if the table is empty
+    """
+    create_watermark_table(conn)
+    watermark = conn.execute(
+        "SELECT watermark FROM load_watermarks WHERE table_name = ?", (table_name,)
+    ).fetchone()
+
+    if watermark is None:
+        watermark = set_watermark(table_name, conn, watermark_col)
+        conn.commit()
+        return watermark
+    return watermark[0]
+
+
+def set_watermark(table_name, conn, watermark_col, watermark=None):
+    """
+    Records the watermark for the table in load_watermarks.
+    Committing is left to the caller.
+
+    Args:
+        table_name(str): name of the table
+        conn(Sqlite3 Connection): connection to the database
+        watermark_col(str): column the watermark is taken from
+        watermark(str): new watermark, if None the max of watermark_col
+            in the table is used
+
+    Returns:
+        str: watermark value that was recorded
+    """
+    if watermark is None:
+        watermark = conn.execute(
+            f"SELECT MAX({watermark_col}) FROM {table_name}"
+        ).fetchone()[0]
+
+    create_watermark_table(conn)
+    conn.execute(
+        """
+        INSERT INTO load_watermarks VALUES (?, ?, ?, datetime('now'))
+        ON CONFLICT (table_name) DO UPDATE
+        SET watermark_col = excluded.watermark_col,
+        watermark = excluded.watermark,
+        updated = excluded.updated;
+        """,
+        (table_name, watermark_col, watermark),
+    )
+    return watermark
+
+
+def create_table_changes_table(conn):
+    """
+    Creates the table_changes table if it does not exist.
+    It holds a change stamp for each table that is bumped whenever
+    a loader writes to the table, so cached query results that read
+    from the table can be dropped.
+
+    Args:
+        conn(Sqlite3 Connection): connection to the database
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS table_changes (
+            table_name TEXT PRIMARY KEY,
+            change_count INTEGER,
+            changed TEXT
+        );
         """
+    )
+
+
+def stamp_table_change(table_name, conn):
+    """
+    Bumps the change stamp of the table in table_changes.
+    Committing is left to the caller.
+
+    Args:
+        table_name(str): name of the table written to
+        conn(Sqlite3 Connection): connection to the database
+    """
+    create_table_changes_table(conn)
+    conn.execute(
+        """
+        INSERT INTO table_changes VALUES (?, 1, datetime('now'))
+        ON CONFLICT (table_name) DO UPDATE
+        SET change_count = change_count + 1,
+        changed = excluded.changed;
+        """,
+        (table_name,),
+    )
+
+
+def add_facility_ids(table_name, facility_col, conn):
+    """
+    Adds a facility_id column to a table created before facility ids were
+    stored and fills it in from the facilities table using facility_col.
+    Tables that already have the column are left as is.
+
+    Args:
+        table_name(str): name of the table
+        facility_col(str): column holding the facility name
+        conn(Sqlite3 Connection): connection to the database
+    """
+    table_cols = [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")]
+    if "facility_id" in table_cols:
+        return None
+
+    with database_write(conn):
+        conn.execute(f"ALTER TABLE {table_name} ADD COLUMN facility_id INTEGER")
+        # facilities.facility is NOCASE so names differing in case match
+        conn.execute(
+            f"""
+            UPDATE {table_name}
+            SET facility_id = (SELECT f.facility_id FROM facilities f
+                            WHERE f.facility = {table_name}.{facility_col})
+            WHERE {facility_col} IS NOT NULL;
+            """
         )
+        stamp_table_change(table_name, conn)
+    print(f"{table_name}: facility_id added")
+
+
+def append_new_rows(
+    df,
+    table_name,
+    conn,
+    watermark_col,
+    natural_key,
+    id_col=None,
+    lookback_days=0,
+):
+    """
+    Append-only load for ledger style tables such as payments.
+
+    Only rows on or after the table's watermark (less lookback_days) are
+    considered. Rows in that window are deduped against the table on the
+    natural key, so reloading the boundary day never adds a row twice.
+    Identical rows in df are legitimate, such as two equal payments on a day,
+    so a row is only appended for each copy beyond those already in the table.
+    Existing rows are never updated. The watermark in load_watermarks
+    is moved forward in the same transaction as the insert.
+
+    If id_col is given it is left out of the insert, if df has it, and SQLite
+    assigns the next id, which needs id_col to be the INTEGER PRIMARY KEY.
+
+    Args:
+        df(DataFrame): pandas dataframe with new and possibly old rows
+        table_name(str): name of the table to append to
+        conn(Sqlite3 Connection): connection to the database
+        watermark_col(str): date column the watermark is taken from
+        natural_key(list): columns that identify a row without the id column
+        id_col(str): name of a generated id column
+        lookback_days(int): days before the watermark to check for
+            late arriving rows
+
+    Returns:
+        int: number of rows appended
+    """
+    watermark = get_watermark(table_name, conn, watermark_col)
+
+    window_sql = ""
+    if watermark is not None:
+        window_start = watermark
+        if lookback_days:
+            window_start = (
+                pd.to_datetime(watermark) - pd.Timedelta(days=lookback_days)
+            ).strftime("%Y-%m-%d")
+        df = df[df[watermark_col] >= window_start]
+        window_sql = f"t.{watermark_col} >= '{window_start}' AND"
+
+    if table_name != "ppts":
+        df = filter_current_members(df, conn)
+    if (id_col is not None) and (id_col in df.columns):
+        df = df.drop([id_col], axis=1)
+
+    if df.shape[0] == 0:
+        print(f"{table_name}: 0 appended")
+        return 0
+
+    schema = table_schema(table_name)
+    staging_table = f"staging_{table_name}"
+    stage_temp_table(df, conn, staging_table, schema)
+
+    insert_cols = ", ".join(col for col in df.columns)
+    staged_cols = ", ".join(f"s.{col}" for col in df.columns)
+    key_cols = ", ".join(natural_key)
+    compare_sql = " AND ".join([f"t.{col} IS s.{col}" for col in natural_key])
+
+    c = conn.cursor()
+    with database_write(conn):
+        changes_before = conn.total_changes
         c.execute(
             f"""
-        UPDATE teams
-        SET end_date = (SELECT disenrollment_date FROM enrollment
-                        WHERE member_id=teams.member_id)
-        WHERE teams.member_id IN (SELECT member_id FROM enrollment
-        WHERE disenrollment_date NOT NULL)
-        AND teams.end_date IS NULL;
-        """
+            INSERT INTO {table_name} ({insert_cols})
+            SELECT {staged_cols} FROM
+                (SELECT *, ROW_NUMBER() OVER (PARTITION BY {key_cols}) AS copy_number
+                FROM {staging_table}) s
+            WHERE s.copy_number >
+                (SELECT COUNT(*) FROM {table_name} t
+                WHERE {window_sql} {compare_sql})
+            ORDER BY s.{watermark_col};
+            """
         )
+        appended = conn.total_changes - changes_before
+
+        new_watermark = c.execute(
+            f"SELECT MAX({watermark_col}) FROM {staging_table}"
+        ).fetchone()[0]
+        if (new_watermark is not None) and (
+            (watermark is None) or (new_watermark > watermark)
+        ):
+            set_watermark(table_name, conn, watermark_col, new_watermark)
+        if appended:
+            stamp_table_change(table_name, conn)
 
-    c.execute(f"DROP TABLE IF EXISTS temp")
+    c.execute(f"DROP TABLE IF EXISTS temp.{staging_table}")
     conn.commit()
+
+    print(f"{table_name}: {appended} appended")
+    return appended
@@ -0,0 +1,703 @@
+###Declared SQLite schema for each table in the dashboard database
+###Column types match docs/dashboard_database.xlsx,
+###dates are stored as ISO text (YYYY-MM-DD)
+###and yes/no flags as integers
+###Tables keyed on more than one column are created WITHOUT ROWID
+###WITHOUT ROWID tables cannot store a NULL key, so key columns listed in
+###key_fill have missing values replaced with the given value and any row
+###still missing a key value is dropped, with the count printed per column
+###Tables with row_hash store a hash of each row so updates only rewrite changed rows
+
+table_schemas = {
+    "addresses": {
+        "without_rowid": True,
+        "columns": {
+            "member_id": "INTEGER",
+            "lat": "FLOAT",
+            "lon": "FLOAT",
+            "active": "INTEGER",
+            "address": "TEXT",
+            "as_of": "TEXT",
+            "city": "TEXT",
+            "state": "TEXT",
+            "zip": "TEXT",
+        },
+    },
+    "admission_claims": {
+        "without_rowid": False,
+        "columns": {
+            "claim_id": "TEXT",
+            "member_id": "INTEGER",
+            "first_service_date": "TEXT",
+            "last_service_date": "TEXT",
+            "length_of_stay_days": "INTEGER",
+            "length_of_stay_hours": "INTEGER",
+            "place_of_service": "INTEGER",
+            "pos_description": "TEXT",
+            "provider": "TEXT",
+            "facility_id": "INTEGER",
+            "bill_type": "INTEGER",
+            "bill_type_description": "TEXT",
+            "admission_type": "INTEGER",
+            "admission_type_description": "TEXT",
+            "admit_hour_code": "FLOAT",
+            "admit_hour_code_description": "TEXT",
+            "discharge_status": "INTEGER",
+            "discharge_status_description": "TEXT",
+            "discharge_hour_code_description": "FLOAT",
+            "discharge_hour_description": "TEXT",
+            "principal_dx": "TEXT",
+            "admitting_dx": "TEXT",
+            "dow": "TEXT",
+            "hour_category": "TEXT",
+        },
+    },
+    "alfs": {
+        "without_rowid": True,
+        "columns": {
+            "admission_date": "TEXT",
+            "facility_name": "TEXT",
+            "discharge_date": "TEXT",
+            "facility_type": "TEXT",
+            "discharge_type": "TEXT",
+            "los": "FLOAT",
+            "member_id": "INTEGER",
+            "discharge_facility": "TEXT",
+        },
+    },
+    "appointments": {
+        "without_rowid": True,
+        "columns": {
+            "appt_date": "TEXT",
+            "create_date": "TEXT",
+            "center": "TEXT",
+            "status": "TEXT",
+            "type": "TEXT",
+            "category": "TEXT",
+            "member_id": "INTEGER",
+            "cancelation_reason": "TEXT",
+            "chief_complaint": "TEXT",
+        },
+    },
+    "authorizations": {
+        "without_rowid": True,
+        "columns": {
+            "authorization_number": "TEXT",
+            "entered_date": "TEXT",
+            "modified_date": "TEXT",
+            "member_id": "INTEGER",
+            "approval_effective_date": "TEXT",
+            "approval_expiration_date": "TEXT",
+            "expected_service_date": "TEXT",
+            "authorization_type": "TEXT",
+            "service_type": "TEXT",
+            "diagnosis": "TEXT",
+            "description_of_services": "TEXT",
+            "service_units_authorized": "INTEGER",
+            "canceled": "TEXT",
+            "referring_provider": "TEXT",
+            "vendor": "TEXT",
+        },
+    },
+    "burns": {
+        "without_rowid": False,
+        "columns": {
+            "member_id": "INTEGER",
+            "date_time_occurred": "TEXT",
+            "date_discovered": "TEXT",
+            "location": "TEXT",
+            "description": "TEXT",
+            "burn_location": "TEXT",
+            "burn_degree": "TEXT",
+            "adaptive_equipment_not_used": "FLOAT",
+            "decrease_in_center_attendance": "FLOAT",
+            "decrease_in_home_care": "FLOAT",
+            "delay_of_scheduled_home_care": "FLOAT",
+            "diagnosis_of_dementia": "FLOAT",
+            "equipment_malfunction": "FLOAT",
+            "hot_food": "FLOAT",
+            "hot_water": "FLOAT",
+            "improper_food_handling": "FLOAT",
+            "improper_use_of_chemicals": "FLOAT",
+            "improperly_sored_chemicals": "FLOAT",
+            "lack_of_education_caregiver": "FLOAT",
+            "lack_of_education_contractor": "FLOAT",
+            "lack_of_education_participant": "FLOAT",
+            "lack_of_education_staff": "FLOAT",
+            "non_compliance_with_medications": "FLOAT",
+            "non_compliance_with_care_plan_caregiver": "FLOAT",
+            "non_compliance_with_care_plan_contractor": "FLOAT",
+            "non_compliance_with_care_plan_participant": "FLOAT",
+            "non_compliance_with_care_plan_staff": "FLOAT",
+            "non_compliance_with_pace_policies": "FLOAT",
+            "participant_cognitive_impairment": "FLOAT",
+            "participant_cooking": "FLOAT",
+            "participant_cooking_instructed_not_to_cook": "FLOAT",
+            "participant_did_not_wait_for_assistance": "FLOAT",
+            "participant_smoking": "FLOAT",
+            "participant_curling_iron": "FLOAT",
+            "participant_iron": "FLOAT",
+            "participant_lighter": "FLOAT",
+            "participant_left_unsupervised": "FLOAT",
+            "no_applicable_policies": "FLOAT",
+            "sun_exposure": "FLOAT",
+            "unknown_conributing_factor": "FLOAT",
+            "other_contributing_factor": "TEXT",
+            "assessment_activities": "FLOAT",
+            "assessment_dietary": "FLOAT",
+            "assessment_home_care": "FLOAT",
+            "assessment_ot": "FLOAT",
+            "assessment_pcp": "FLOAT",
+            "assessment_pt": "FLOAT",
+            "assessment_rn": "FLOAT",
+            "assessment_sw": "FLOAT",
+            "education_contracted_provider": "FLOAT",
+            "education_family_caregiver": "FLOAT",
+            "education_participant": "FLOAT",
+            "education_staff": "FLOAT",
+            "implemented_file_burn_prevention_program": "FLOAT",
+            "increased_center_attendance": "FLOAT",
+            "increased_home_care": "FLOAT",
+            "increased_pt_ot": "FLOAT",
+            "increased_staff_at_contracted_provider_facility": "FLOAT",
+            "increased_staff_at_pace_center": "FLOAT",
+            "initiated_contractor_oversight": "FLOAT",
+            "initiated_quality_improvement_activities": "FLOAT",
+            "installed_fire_extinguisher": "FLOAT",
+            "installed_smoke_detectors": "FLOAT",
+            "medication_change": "FLOAT",
+            "medication_evaluation": "FLOAT",
+            "modified_environment_participants_home": "FLOAT",
+            "modified_environment_assisted_living_facility": "FLOAT",
+            "modified_environment_hospital": "FLOAT",
+            "incident_id": "INTEGER",
+        },
+    },
+    "center_days": {
+        "without_rowid": True,
+        "columns": {
+            "days": "TEXT",
+            "member_id": "INTEGER",
+            "as_of": "TEXT",
+        },
+    },
+    "centers": {
+        "without_rowid": True,
+        "columns": {
+            "center": "TEXT",
+            "member_id": "INTEGER",
+            "start_date": "TEXT",
+            "end_date": "TEXT",
+        },
+    },
+    "claims_detail": {
+        "without_rowid": False,
+        "columns": {
+            "claim_id": "TEXT",
+            "claim_line_id": "INTEGER",
+            "claim_type": "TEXT",
+            "first_dos": "TEXT",
+            "last_dos": "TEXT",
+            "received_date": "TEXT",
+            "claim_line_status": "TEXT",
+            "participant_id": "INTEGER",
+            "member_id": "INTEGER",
+            "center": "TEXT",
+            "drg": "FLOAT",
+            "provider_patient_id": "TEXT",
+            "vendor": "TEXT",
+            "facility_id": "INTEGER",
+            "rendering_provider": "TEXT",
+            "provider_network": "TEXT",
+            "referring_provider": "TEXT",
+            "ub_attending_provider": "FLOAT",
+            "ub_other_provider": "FLOAT",
+            "auth_number": "TEXT",
+            "diag_code1": "TEXT",
+            "diag_code2": "TEXT",
+            "diag_code3": "TEXT",
+            "diag_code4": "TEXT",
+            "principle_diag": "TEXT",
+            "diagnosis68": "TEXT",
+            "diagnosis69": "TEXT",
+            "diagnosis70": "TEXT",
+            "diagnosis71": "TEXT",
+            "diagnosis72": "TEXT",
+            "diagnosis73": "TEXT",
+            "diagnosis74": "TEXT",
+            "diagnosis75": "TEXT",
+            "p_o_s": "TEXT",
+            "procedure_code": "TEXT",
+            "revenue_code": "TEXT",
+            "modifier1": "TEXT",
+            "modifier2": "TEXT",
+            "modifier3": "TEXT",
+            "modifier4": "TEXT",
+            "bill_type": "FLOAT",
+            "service_type": "TEXT",
+            "line_charges": "FLOAT",
+            "line_units": "FLOAT",
+            "line_paid": "FLOAT",
+            "adjudication_run_i_d": "TEXT",
+            "payables_batch": "TEXT",
+            "in_accounting_date": "TEXT",
+            "check_number": "TEXT",
+            "check_date": "TEXT",
+            "claim_line_created_date": "TEXT",
+            "comments": "TEXT",
+            "e_o_b_code": "TEXT",
+        },
+    },
+    "demographics": {
+        "without_rowid": False,
+        "row_hash": True,
+        "columns": {
+            "member_id": "INTEGER",
+            "dob": "TEXT",
+            "race": "TEXT",
+            "language": "TEXT",
+            "gender": "INTEGER",
+        },
+    },
+    "dx": {
+        "without_rowid": True,
+        "columns": {
+            "member_id": "INTEGER",
+            "dx_desc": "TEXT",
+            "icd10": "TEXT",
+            "documents": "TEXT",
+            "date_added": "TEXT",
+            "pace_hcc": "TEXT",
+            "raps_status": "TEXT",
+            "active_dx": "INTEGER",
+        },
+    },
+    "enrollment": {
+        "without_rowid": True,
+        "row_hash": True,
+        "columns": {
+            "center": "TEXT",
+            "member_id": "INTEGER",
+            "medicare": "INTEGER",
+            "medicaid": "INTEGER",
+            "enrollment_date": "TEXT",
+            "disenrollment_date": "TEXT",
+            "disenroll_reason": "TEXT",
+            "disenroll_type": "TEXT",
+        },
+    },
+    "er_only": {
+        "without_rowid": False,
+        "columns": {
+            "member_id": "INTEGER",
+            "admission_date": "TEXT",
+            "facility": "TEXT",
+            "facility_id": "INTEGER",
+            "diagnosis": "TEXT",
+            "w_six_months": "INTEGER",
+            "dow": "TEXT",
+            "days_since_last_admission": "FLOAT",
+            "visit_id": "INTEGER",
+        },
+    },
+    "falls": {
+        "without_rowid": False,
+        "columns": {
+            "member_id": "INTEGER",
+            "date_time_occurred": "TEXT",
+            "date_discovered": "TEXT",
+            "location": "TEXT",
+            "activity_at_time_of_fall": "TEXT",
+            "assistance_at_time_of_fall": "TEXT",
+            "footwear": "TEXT",
+            "clutter": "INTEGER",
+            "disrepair": "INTEGER",
+            "dme_not_in_use": "INTEGER",
+            "found_on_floor": "INTEGER",
+            "furniture": "INTEGER",
+            "gait_device_non_compliance": "INTEGER",
+            "needed_to_use_restroom": "INTEGER",
+            "oxygen_tubing": "INTEGER",
+            "poor_lighting": "INTEGER",
+            "rugs": "INTEGER",
+            "seatbelt_unbuckled": "INTEGER",
+            "seatbelt_unbuckled_by_participant": "INTEGER",
+            "transfer_without_assistance": "INTEGER",
+            "uneven_pavement": "INTEGER",
+            "wet_floor": "INTEGER",
+            "other_environmental_factors": "TEXT",
+            "body_pain": "INTEGER",
+            "chest_pain": "INTEGER",
+            "dizziness": "INTEGER",
+            "fainted": "INTEGER",
+            "headache": "INTEGER",
+            "incontinence": "INTEGER",
+            "increased_confusion": "INTEGER",
+            "loss_of_balance": "INTEGER",
+            "poor_vision": "INTEGER",
+            "shortness_of_breath": "INTEGER",
+            "weakness": "INTEGER",
+            "other_associated_symptoms": "TEXT",
+            "description_of_event": "TEXT",
+            "source_of_this_information": "TEXT",
+            "according_to_ppt_caregiver_what_could_have_prevented_fall": "TEXT",
+            "severity": "TEXT",
+            "family_notified_by_pace": "FLOAT",
+            "family_not_notified_reason": "TEXT",
+            "family_member_notified": "TEXT",
+            "family_notified_external": "TEXT",
+            "participant_examined_by_pace": "FLOAT",
+            "participant_not_examined_reason": "TEXT",
+            "participant_examined_external": "TEXT",
+            "treatment_administered": "FLOAT",
+            "treatment_administered_comment": "TEXT",
+            "hypoglycemia": "FLOAT",
+            "hypotension": "FLOAT",
+            "syncope": "FLOAT",
+            "follow_up_xray": "FLOAT",
+            "follow_up_labs": "FLOAT",
+            "follow_up_er": "FLOAT",
+            "follow_up_hospital": "FLOAT",
+            "follow_up_paramedics": "FLOAT",
+            "follow_up_comment": "TEXT",
+            "environmental_factors": "TEXT",
+            "medical_factors": "TEXT",
+            "pharmacologic_factors": "TEXT",
+            "dementia_factors": "TEXT",
+            "improper_footwear": "FLOAT",
+            "improper_transfer_caregiver": "FLOAT",
+            "improper_transfer_family_member": "FLOAT",
+            "improper_transfer_pace_contractor": "FLOAT",
+            "improper_transfer_pace_staff": "FLOAT",
+            "lost_balance_items_not_properly_stored": "FLOAT",
+            "lost_balance_legs_buckled": "FLOAT",
+            "lost_balance_location_in_disrepair": "FLOAT",
+            "intervention_medication_eval_change": "FLOAT",
+            "intervention_clinic_medical": "FLOAT",
+            "intervention_nutrition_services": "FLOAT",
+            "intervention_pt": "FLOAT",
+            "intervention_ot": "FLOAT",
+            "intervention_day_center": "FLOAT",
+            "intervention_dme": "FLOAT",
+            "intervention_other": "TEXT",
+            "action_family_education": "FLOAT",
+            "action_home_care_assessment": "FLOAT",
+            "action_implemented_falls_prevention_program": "FLOAT",
+            "action_implemented_new_policy": "FLOAT",
+            "action_increased_ot_pt": "FLOAT",
+            "action_initiated_contractor_oversight": "FLOAT",
+            "action_initiated_quality_improvement_activities": "FLOAT",
+            "action_medication_evaluation_change": "FLOAT",
+            "action_modified_alf_environment": "FLOAT",
+            "action_modified_hospital_environment": "FLOAT",
+            "action_modified_nf_environment": "FLOAT",
+            "action_modified_pace_center_environment": "FLOAT",
+            "action_modified_ppt_home_environment": "FLOAT",
+            "action_ot_assessment": "FLOAT",
+            "action_pcp_assessment": "FLOAT",
+            "action_ppt_education": "FLOAT",
+            "action_pt_assessment": "FLOAT",
+            "action_revised_existing_policy": "FLOAT",
+            "action_rn_assessment": "FLOAT",
+            "action_staff_education": "FLOAT",
+            "care_plan_changed": "FLOAT",
+            "location_details": "TEXT",
+            "incident_id": "INTEGER",
+        },
+    },
+    "infections": {
+        "without_rowid": False,
+        "columns": {
+            "date_time_occurred": "TEXT",
+            "date_discovered": "TEXT",
+            "member_id": "INTEGER",
+            "presenting_signs_and_symptoms": "TEXT",
+            "infection_type": "TEXT",
+            "other_infection_type": "TEXT",
+            "diagnostic_test": "TEXT",
+            "medication_prescribed": "TEXT",
+            "where_infection_was_acquired": "TEXT",
+            "infection_treated_by": "TEXT",
+            "infection_treatment_date": "TEXT",
+            "incident_id": "INTEGER",
+        },
+    },
+    "influ": {
+        "without_rowid": True,
+        "row_hash": True,
+        "columns": {
+            "member_id": "INTEGER",
+            "vacc_series": "TEXT",
+            "date_administered": "TEXT",
+            "dose_status": "INTEGER",
+        },
+    },
+    "inpatient": {
+        "without_rowid": False,
+        "columns": {
+            "member_id": "INTEGER",
+            "admission_date": "TEXT",
+            "discharge_date": "TEXT",
+            "los": "FLOAT",
+            "facility": "TEXT",
+            "facility_id": "INTEGER",
+            "discharge_disposition": "TEXT",
+            "admission_scheduled": "TEXT",
+            "admit_reason": "TEXT",
+            "diagnosis": "TEXT",
+            "readmit": "TEXT",
+            "admission_type": "TEXT",
+            "w_six_months": "INTEGER",
+            "dow": "TEXT",
+            "er": "INTEGER",
+            "days_since_last_admission": "FLOAT",
+            "visit_id": "INTEGER",
+        },
+    },
+    "med_errors": {
+        "without_rowid": False,
+        "columns": {
+            "member_id": "INTEGER",
+            "date_time_occurred": "TEXT",
+            "date_discovered": "TEXT",
+            "location": "TEXT",
+            "responsibility_pharmacy": "INTEGER",
+            "responsibility_clinic": "INTEGER",
+            "responsibility_home_care": "INTEGER",
+            "responsibility_facility": "INTEGER",
+            "responsible_facility_name": "TEXT",
+            "other_responsible_party": "TEXT",
+            "severity": "TEXT",
+            "wrong_dose": "FLOAT",
+            "wrong_dose_not_administered": "FLOAT",
+            "wrong_med_tx": "FLOAT",
+            "wrong_med_tx_not_administered": "FLOAT",
+            "wrong_ppt": "FLOAT",
+            "wrong_ppt_not_administered": "FLOAT",
+            "wrong_route": "FLOAT",
+            "wrong_label_not_administered": "FLOAT",
+            "wrong_time_day": "FLOAT",
+            "dose_omitted_not_administered": "FLOAT",
+            "expired_order": "FLOAT",
+            "transcription": "FLOAT",
+            "not_ordered": "FLOAT",
+            "med_given_despite_hold_order_vs": "FLOAT",
+            "med_tx_given_with_known_allergy": "FLOAT",
+            "med_tx_given_beyond_stop_date": "FLOAT",
+            "other_error_code": "TEXT",
+            "order_written_correctly": "TEXT",
+            "description": "TEXT",
+            "change_in_delivery_method": "FLOAT",
+            "change_in_pharmacy": "FLOAT",
+            "communication_with_inpatient_hospice": "FLOAT",
+            "communication_with_acs": "FLOAT",
+            "communication_with_alf": "FLOAT",
+            "communication_with_hospital": "FLOAT",
+            "communication_with_nursing_facility": "FLOAT",
+            "communication_with_pharmacy": "FLOAT",
+            "administered_by_unauthorized_staff": "FLOAT",
+            "new_staff_member": "FLOAT",
+            "order_transcription_error": "FLOAT",
+            "participant_id_error": "FLOAT",
+            "pharmacy_error": "FLOAT",
+            "physician_prescription_error": "FLOAT",
+            "similar_name": "FLOAT",
+            "staff_error": "FLOAT",
+            "other_contributing_factor": "TEXT",
+            "pcp_notified": "TEXT",
+            "pcp_notified_date_time": "TEXT",
+            "pcp_notified_details": "TEXT",
+            "measures_taken_to_prevent_recurrence": "TEXT",
+            "family_education": "FLOAT",
+            "home_care_assessment": "FLOAT",
+            "implemented_falls_prevention_program": "FLOAT",
+            "implemented_new_policy": "FLOAT",
+            "increased_ot_pt": "FLOAT",
+            "initiated_contractor_oversight": "FLOAT",
+            "initiated_quality_improvement_activities": "FLOAT",
+            "medication_evaluation_change": "FLOAT",
+            "modified_alf_environment": "FLOAT",
+            "modified_hospital_environment": "FLOAT",
+            "modified_nf_environment": "FLOAT",
+            "modified_pace_center_environment": "FLOAT",
+            "modified_ppt_home_environment": "FLOAT",
+            "ot_assessment": "FLOAT",
+            "pcp_assessment": "FLOAT",
+            "ppt_education": "FLOAT",
+            "pt_assessment": "FLOAT",
+            "revised_existing_policy": "FLOAT",
+            "rn_assessment": "FLOAT",
+            "staff_education": "FLOAT",
+            "increase_home_care": "FLOAT",
+            "increased_center_attendance": "FLOAT",
+            "change_in_contracted_provider": "FLOAT",
+            "change_to_medication_administration_process": "FLOAT",
+            "change_to_participant_identification_process": "FLOAT",
+            "changes_to_medication_prescription_process": "FLOAT",
+            "changes_to_medication_transcription_process": "FLOAT",
+            "implemented_a_new_medication_delivery_system": "FLOAT",
+            "requested_a_corrective_action_plan_from_contracted_provider": "FLOAT",
+            "staff_involved": "FLOAT",
+            "comments": "TEXT",
+            "incident_id": "INTEGER",
+        },
+    },
+    "medications": {
+        "without_rowid": True,
+        "row_hash": True,
+        "columns": {
+            "member_id": "INTEGER",
+            "desc": "TEXT",
+            "name": "TEXT",
+            "start_date": "TEXT",
+            "discontinue_date": "TEXT",
+            "estimated_end_date": "TEXT",
+            "most_recent_script": "TEXT",
+            "status": "TEXT",
+            "class": "TEXT",
+            "discontinue_type": "TEXT",
+        },
+    },
+    "monthly_census": {
+        "without_rowid": False,
+        "columns": {
+            "month": "TEXT",
+            "providence": "INTEGER",
+            "woonsocket": "INTEGER",
+            "westerly": "INTEGER",
+            "total": "INTEGER",
+        },
+    },
+    "payments": {
+        "without_rowid": False,
+        "columns": {
+            "id_col": "INTEGER",
+            "claim_id": "TEXT",
+            "date_paid": "TEXT",
+            "date_claim": "TEXT",
+            "service_date": "TEXT",
+            "service_date_to": "TEXT",
+            "specialty_code": "TEXT",
+            "service": "TEXT",
+            "account": "INTEGER",
+            "account_description": "TEXT",
+            "billed": "TEXT",
+            "total_paid": "FLOAT",
+            "ub_invoice": "TEXT",
+            "auth_id": "TEXT",
+            "source_auth_id": "TEXT",
+            "member_id": "INTEGER",
+            "check_num": "TEXT",
+            "vendor": "TEXT",
+            "facility_id": "INTEGER",
+            "medicaid_eligibility": "TEXT",
+            "length_of_service": "FLOAT",
+            "total_units": "TEXT",
+            "dme_item": "TEXT",
+            "provider": "TEXT",
+            "service_code": "TEXT",
+            "service_code_descrip": "TEXT",
+            "service_code2": "TEXT",
+            "service_code_descrip2": "TEXT",
+        },
+    },
+    "pneumo": {
+        "without_rowid": True,
+        "columns": {
+            "member_id": "INTEGER",
+            "vacc_series": "TEXT",
+            "date_administered": "TEXT",
+            "dose_status": "INTEGER",
+        },
+    },
+    "ppts": {
+        "without_rowid": False,
+        "columns": {
+            "member_id": "INTEGER",
+            "last": "TEXT",
+            "first": "TEXT",
+        },
+    },
+    "referrals": {
+        "without_rowid": True,
+        "key_fill": {"referral_source": "Unknown"},
+        "columns": {
+            "referral_date": "TEXT",
+            "caller_name": "TEXT",
+            "caller_type": "TEXT",
+            "participant_name": "TEXT",
+            "member_id": "INTEGER",
+            "received_by": "TEXT",
+            "intake_staff": "TEXT",
+            "referral_source": "TEXT",
+            "center": "TEXT",
+            "intake_visit": "TEXT",
+            "first_visit_day": "TEXT",
+            "enrollment_signed": "TEXT",
+            "enrollment_effective": "TEXT",
+            "comment": "TEXT",
+            "close_date": "TEXT",
+            "close_type": "TEXT",
+            "close_details": "TEXT",
+        },
+    },
+    "teams": {
+        "without_rowid": True,
+        "columns": {
+            "team": "TEXT",
+            "member_id": "INTEGER",
+            "start_date": "TEXT",
+            "end_date": "TEXT",
+        },
+    },
+    "wounds": {
+        "without_rowid": True,
+        "key_fill": {"wound_location": "Unknown"},
+        "row_hash": True,
+        "columns": {
+            "member_id": "INTEGER",
+            "date_time_occurred": "TEXT",
+            "date_healed": "TEXT",
+            "living_situation": "TEXT",
+            "living_detail": "TEXT",
+            "day_center": "TEXT",
+            "wound_type": "TEXT",
+            "other_details": "TEXT",
+            "ulcer_stage": "TEXT",
+            "burn_degree": "TEXT",
+            "wound_location": "TEXT",
+            "chronic": "FLOAT",
+            "notes": "TEXT",
+        },
+    },
+}
+
+###Secondary indexes built after each table is loaded
+###Most queries filter on member_id and a date column, or on a date range alone
+###Indexes already covered by the start of a table's primary key are not listed
+
+table_indexes = {
+    "admission_claims": [["member_id", "first_service_date"], ["first_service_date"]],
+    "alfs": [["admission_date"]],
+    "appointments": [["appt_date"]],
+    "authorizations": [["member_id", "approval_effective_date"]],
+    "burns": [["member_id", "date_time_occurred"], ["date_time_occurred"]],
+    "claims_detail": [["member_id", "first_dos"], ["first_dos"]],
+    "dx": [["icd10"]],
+    "enrollment": [["enrollment_date"], ["disenrollment_date"]],
+    "er_only": [["member_id", "admission_date"], ["admission_date"]],
+    "falls": [["member_id", "date_time_occurred"], ["date_time_occurred"]],
+    "infections": [["member_id", "date_time_occurred"], ["date_time_occurred"]],
+    "influ": [["date_administered"]],
+    "inpatient": [
+        ["member_id", "admission_date"],
+        ["admission_date"],
+        ["discharge_date"],
+    ],
+    "med_errors": [["member_id", "date_time_occurred"], ["date_time_occurred"]],
+    "medications": [["member_id", "start_date"]],
+    "payments": [["member_id", "date_paid"], ["date_paid"]],
+    "pneumo": [["date_administered"]],
+    "referrals": [["referral_date"]],
+    "wounds": [["date_time_occurred"]],
+}
@@ -5,6 +5,7 @@ import warnings
 import re
 import string
 import numpy as np
+import pandas as pd
 
 warnings.simplefilter(action="ignore", category=FutureWarning)
 
@@ -103,54 +104,183 @@ def create_indicator_col(df, indicator_cat, indicator_cols):
     return df
 
 
-def create_id_col(df, pk, id_col, create_col=True):
+# ids are member_id * id_member_multiplier + YYYYMMDD * 1000 + sequence number,
+# ids made before the sequence number was added are below id_member_multiplier
+id_member_multiplier = 10 ** 11
+
+
+def create_id_col(df, pk, id_col):
     """
     Takes a dataframe and adds a unique id_col.
-    This column is the merger of the member_id and date column as ints,
-    then any duplicated columns have a 1 added to them until there
-    are no duplicates
+    The id is the member_id, the date as YYYYMMDD and a 3 digit sequence
+    number for the row within the member's rows on that date, so ids of
+    different members or dates never collide.
+
+    The sequence number is the row's rank among the member's rows on that
+    date ordered by a hash of the pk columns, the natural key of the row,
+    numbered in one pass with a grouped cumcount. Ids do not depend on the
+    order of the rows and editing a column outside the pk does not change
+    them, except for rows sharing every pk value, which are ordered by a
+    hash of their contents. Adding a row on a member and date can renumber
+    that member's other rows on the date.
+    Rows missing a member_id or date are dropped
+    and rows that only differ in id_col are dropped.
+
+    Ids in the member/date/sequence format replace the member_id + YYYYMMDD
+    ids made before, so tables keyed on them are rebuilt once when first
+    loaded with the new ids.
 
     Args:
         df(DataFrame): pandas dataframe to add id_col to
-        pk(list or tuple): member id column name and a date column name
+        pk(list or tuple): member id column name and a date column name,
+            followed by any other columns identifying the row,
             to be used to crate an ID column
         id_col: name of the id column
-        create_col(bool): indicates if the column should be added to the df
 
     Returns:
         pandas Series: the newly created id column
     """
     df.dropna(subset=["member_id"], inplace=True)
-    member_ints = df[pk[0]].astype(int)
-    date_ints = df[pk[1]].dt.strftime("%Y%m%d").astype(int)
+    missing_dates = df[pk[1]].isnull()
+    if missing_dates.any():
+        print(f"{id_col}: {missing_dates.sum()} rows without a {pk[1]} dropped")
+        df.drop(df.index[missing_dates], inplace=True)
+
+    content_cols = [col for col in df.columns if col != id_col]
+    df.drop_duplicates(subset=content_cols, inplace=True, keep="last")
+
+    dates = df[pk[1]]
+    id_parts = pd.DataFrame(
+        {
+            "member_id": df[pk[0]].astype(np.int64).values,
+            "date": (dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day)
+            .astype(np.int64)
+            .values,
+            "key_hash": pd.util.hash_pandas_object(df[list(pk)], index=False).values,
+            "row_hash": pd.util.hash_pandas_object(
+                df[content_cols], index=False
+            ).values,
+        }
+    )
+
+    # rank each row within its member and date by its pk hash
+    id_parts.sort_values(["member_id", "date", "key_hash", "row_hash"], inplace=True)
+    seq = id_parts.groupby(["member_id", "date"]).cumcount().sort_index()
+    if (seq >= 1000).any():
+        raise ValueError(f"{id_col}: more than 1000 rows for a member on one date")
+    id_parts.sort_index(inplace=True)
+
+    ids = (
+        id_parts["member_id"].values * id_member_multiplier
+        + id_parts["date"].values * 1000
+        + seq.values
+    )
 
-    if create_col:
-        df[id_col] = member_ints + date_ints
+    return pd.Series(ids, index=df.index)
 
-    if df[id_col].duplicated().sum() != 0:
-        df[id_col] += df[id_col].duplicated()
-        create_id_col(df, pk, id_col, create_col=False)
 
-    df.drop_duplicates(
-        subset=[col for col in df.columns if col != id_col], inplace=True, keep="last"
+def code_y_n_values(values):
+    """
+    Codes a categorical column of Yes/No as 1/0, ignoring case.
+    Each distinct value is coded once and mapped back to the rows.
+
+    Args:
+        values(Series): categorical column to code
+
+    Returns:
+        Series: Int8 column if every value was Yes or No,
+            otherwise object column with other values title cased
+    """
+    coded = (
+        pd.Series(values.cat.categories, dtype=object)
+        .str.title()
+        .replace({"Yes": 1, "No": 0})
     )
+    # code -1 is a missing value, the appended NaN keeps it missing
+    coded_values = np.append(coded.values, np.nan)[values.cat.codes.values]
+
+    if coded.isin([0, 1]).all():
+        coded_values = pd.array(coded_values.astype(float), dtype="Int8")
 
-    return df[id_col]
+    return pd.Series(coded_values, index=values.index)
 
 
-def code_y_n(df):
+def code_y_n(df, y_n_cols=None):
     """
-    Takes a pandas dataframe and codes any columns containing Yes/No as 1/0
+    Takes a pandas dataframe and codes Yes/No columns as 1/0
+
+    If y_n_cols are not given, any text column containing No is coded,
+    checking the distinct values of each text column only.
 
     Args:
         df(DataFrame): pandas dataframe containing yes/no columns
+        y_n_cols(list): columns to code
 
     Returns:
         DataFrame: dataframe with replacements made
     """
-    for col in df.columns:
-        if "No" in df[col].unique():
-            df[col] = df[col].str.title()
-            df[col].replace({"Yes": 1, "No": 0}, inplace=True)
+    if y_n_cols is None:
+        cols = df.select_dtypes(include=["object", "category"]).columns
+    else:
+        cols = y_n_cols
+
+    for col in cols:
+        values = df[col].astype("category")
+        if (y_n_cols is not None) or ("No" in values.cat.categories):
+            df[col] = code_y_n_values(values)
     return df
 
+
+def visit_keys(df, cols, facilities):
+    """
+    Creates typed join keys for visits; an integer member, an integer day
+    and an integer facility code.
+
+    Args:
+        df(DataFrame): pandas dataframe of visits
+        cols(list): names of the member, date and facility columns in df
+        facilities(Index): facilities to code against, shared by both sides
+            of a join so equal facilities get equal codes
+
+    Returns:
+        DataFrame: member, day and facility columns with df's index
+    """
+    member_col, date_col, facility_col = cols
+    member = pd.to_numeric(df[member_col]).fillna(-1).astype(np.int64)
+    day = pd.to_datetime(df[date_col]).values.astype("datetime64[D]").astype(np.int64)
+    facility = pd.Categorical(df[facility_col], categories=facilities).codes
+
+    return pd.DataFrame(
+        {"member": member.values, "day": day, "facility": facility}, index=df.index
+    )
+
+
+def visits_found_in(df, other, df_cols, other_cols):
+    """
+    Finds the visits in df that are also in other, matching on member,
+    day and facility with a typed multi-column join.
+
+    Can be used to link any two sets of visits, ie; ER visits to inpatient
+    admissions or claims to utilization.
+
+    Args:
+        df(DataFrame): pandas dataframe of visits to check
+        other(DataFrame): pandas dataframe of visits to look in
+        df_cols(list): names of the member, date and facility columns in df
+        other_cols(list): names of the member, date and facility columns in other
+
+    Returns:
+        array: boolean array, True where the visit in df is found in other
+    """
+    facilities = pd.Index(df[df_cols[2]].dropna().unique()).union(
+        pd.Index(other[other_cols[2]].dropna().unique())
+    )
+
+    df_keys = visit_keys(df, df_cols, facilities)
+    other_keys = visit_keys(other, other_cols, facilities).drop_duplicates()
+    other_keys["found"] = True
+
+    found = df_keys.merge(other_keys, on=["member", "day", "facility"], how="left")
+
+    return found["found"].notnull().values
+
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import sqlite3
+import numpy as np
+import pandas as pd
+from data_to_sql.sql_table_utils import database_write
+from file_paths import database_path
+
+# alternate facility names found in the cognify, payment and claim files
+# mapped to the decided common name
+facility_aliases = {
+    "Roger Williams Hospital": "Roger Williams Medical Center",
+    "Roger Williams Med Center": "Roger Williams Medical Center",
+    "Kent Hospital": "Kent County Memorial Hospital",
+    "Fatima Hospital": "Our Lady of Fatima Hospital",
+    "Psych Our Lady of Fatima": "Our Lady of Fatima Hospital",
+    "Our Lady of Fatima Hosp": "Our Lady of Fatima Hospital",
+    "Our Lady of Fatima": "Our Lady of Fatima Hospital",
+    "FirstHealth Moore Reginal Hospital": "Firsthealth of the Carolinas",
+    "Steere House Nursing & Rehab Center": "Steere House Nursing & Rehabilitation",
+    "Crestwood Nursing Home": "Crestwood Nursing & Rehabilitation Center",
+    "St. Antoine Residence": "Saint Antoine Residence",
+    "The Green House Homes at Saint Elizabeth Home": "Saint Elizabeth Home East Greenwich",
+    "The Miriam Hospital Lab": "The Miriam Hospital",
+    "Hosp The Miriam Hospital": "The Miriam Hospital",
+    "Bayberry Commons": "Bayberry Commons Nursing & Rehabilitation Center",
+    "Cedar Crest Nursing Centre": "Cedar Crest Nursing Center",
+    "Berkshire Place, Ltd.": "Berkshire Place Nursing and Rehab",
+    "Scandinavian Home Inc": "Scandinavian Home",
+}
+
+
+def create_facility_tables(conn):
+    """
+    Creates the facilities dimension and its alias index if they do not exist
+
+    facilities holds one row per common facility name; names differing
+    only in case share an id. facility_aliases maps every name found in
+    the source files to the facility_id of its common name.
+
+    Args:
+        conn(Sqlite3 Connection): connection to the database
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS facilities (
+            facility_id INTEGER PRIMARY KEY,
+            facility TEXT NOT NULL UNIQUE COLLATE NOCASE
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS facility_aliases (
+            alias TEXT PRIMARY KEY,
+            facility_id INTEGER REFERENCES facilities (facility_id)
+        ) WITHOUT ROWID;
+        """
+    )
+
+
+def facility_ids(aliases, facilities):
+    """
+    Returns the facility_id of each common facility name, adding any
+    new names to the facilities table and recording the name each
+    was found as in the facility_aliases table.
+
+    Args:
+        aliases(Series): facility names as found in the source file
+        facilities(Series): common name for each alias
+
+    Returns:
+        array: facility_id for each common name
+    """
+    conn = sqlite3.connect(database_path)
+
+    # processors normalizing facilities run at the same time under luigi
+    # workers, so the tables are written while holding the database lock
+    with database_write(conn):
+        create_facility_tables(conn)
+
+        conn.executemany(
+            "INSERT OR IGNORE INTO facilities (facility) VALUES (?)",
+            [(facility,) for facility in facilities.unique()],
+        )
+
+        known = pd.read_sql("SELECT facility_id, facility FROM facilities", conn)
+        id_lookup = dict(zip(known["facility"].str.lower(), known["facility_id"]))
+        ids = facilities.str.lower().map(id_lookup).values
+
+        conn.executemany(
+            """
+            INSERT INTO facility_aliases VALUES (?, ?)
+            ON CONFLICT (alias) DO UPDATE
+            SET facility_id = excluded.facility_id;
+            """,
+            list(zip(aliases.tolist(), ids.tolist())),
+        )
+    conn.close()
+
+    return ids
+
+
+def normalize_facilities(df, facility_col, id_col="facility_id"):
+    """
+    Facility names in indicated facility column are
+        stripped of trailing spaces and replaced with decided common names.
+    The facility_id of the common name is added in id_col.
+
+    Names are cleaned once per distinct value and mapped back to the rows.
+
+    Args:
+        df(DataFrame): pandas dataframe to have facilities replaced
+        facility_col(str): name of col to have facilities replaced in
+        id_col(str): name of the facility_id column to add,
+            None to only replace the names
+
+    Returns:
+        df(DataFrame): df with cleaned facility column
+    """
+    codes, aliases = pd.factorize(df[facility_col])
+    aliases = pd.Series(aliases, dtype=object)
+    facilities = aliases.str.rstrip().replace(facility_aliases)
+
+    # code -1 is a missing name, the appended NaN keeps it missing
+    df[facility_col] = np.append(facilities.values, np.nan)[codes]
+
+    if id_col is not None:
+        ids = facility_ids(aliases, facilities)
+        df[id_col] = pd.array(np.append(ids, np.nan)[codes], dtype="Int64")
+
+    return df
@@ -2,6 +2,7 @@
 
 import pandas as pd
 from file_paths import raw_data, processed_data
+from process_db_data.facility_names import normalize_facilities
 from process_db_data.process_utilization import admission_dow, time_of_visit_bins
 
 
@@ -12,6 +13,7 @@ def process_admission_claims():
     All columns are made lowercase
     Facility names in provider column are
         replaced with decided common names
+    facility_id of the common name is added
     Day of week column is added
     Time of visit is binned in a new column
     Indicated columns are dropped
@@ -30,20 +32,7 @@ def process_admission_claims():
 
     admit_claims.columns = [col.lower() for col in admit_claims.columns]
 
-    hosp_replace = {
-        "Roger Williams Med Center": "Roger Williams Medical Center",
-        "Psych Our Lady of Fatima": "Our Lady of Fatima Hospital",
-        "Our Lady of Fatima Hosp": "Our Lady of Fatima Hospital",
-        "Our Lady of Fatima": "Our Lady of Fatima Hospital",
-        "The Miriam Hospital Lab": "The Miriam Hospital",
-        "Hosp The Miriam Hospital": "The Miriam Hospital",
-        "Bayberry Commons": "Bayberry Commons Nursing & Rehabilitation Center",
-        "Cedar Crest Nursing Centre": "Cedar Crest Nursing Center",
-        "Berkshire Place, Ltd.": "Berkshire Place Nursing and Rehab",
-        "Scandinavian Home Inc": "Scandinavian Home",
-    }
-
-    admit_claims["provider"].replace(hosp_replace, inplace=True)
+    admit_claims = normalize_facilities(admit_claims, "provider")
 
     # admit_claims = create_dx_desc_cols(admit_claims)
 
@@ -1,5 +1,14 @@
-import pandas as pd
-from file_paths import processed_data, raw_data
+from process_db_data.source_specs import read_source
+from file_paths import processed_data
+
+
+appts_spec = {
+    "file": "appts.csv",
+    "clean_columns": False,
+    "drop": ["Unnamed: 8"],
+    "dates": ["appt_date", "create_date"],
+    "drop_training_member": True,
+}
 
 
 def process_appointments():
@@ -15,12 +24,8 @@ def process_appointments():
     Outputs:
         csv: processed data file
     """
-    appts = pd.read_csv(
-        f"{raw_data}\\appts.csv", parse_dates=["appt_date", "create_date"]
-    )
-    appts.drop(["Unnamed: 8"], axis=1, inplace=True)
+    appts = read_source(appts_spec)
     appts["chief_complaint"] = appts["chief_complaint"].astype(str).str.strip(".")
-    appts = appts[appts.member_id != 1003]
     appts.drop_duplicates(subset=["member_id", "type", "appt_date"], inplace=True)
     appts.to_csv(f"{processed_data}\\appts.csv", index=False)
 
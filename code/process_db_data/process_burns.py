@@ -1,8 +1,20 @@
 #!/usr/bin/env python3
 
-import pandas as pd
 from process_db_data.process_incidents import process_incidents
-from file_paths import raw_data
+
+
+burns_spec = {
+    "file": "burns.csv",
+    "drop": [
+        "first_name",
+        "last_name",
+        "submitted_by",
+        "center",
+        "control_number",
+    ],
+    "dates": ["date_time_occurred", "date_discovered"],
+    "y_n": "detect",
+}
 
 
 def process_burns():
@@ -21,15 +33,7 @@ def process_burns():
     Outputs:
         csv: processed data file
     """
-    burns = pd.read_csv(f"{raw_data}\\burns.csv")
-    cols_to_drop = [
-        "First Name",
-        "Last Name",
-        "Submitted By",
-        "Center",
-        "Control Number",
-    ]
-    return process_incidents(burns, cols_to_drop, "burns", break_location=False)
+    return process_incidents(burns_spec, "burns", break_location=False)
 
 
 if __name__ == "__main__":
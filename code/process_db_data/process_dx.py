@@ -1,7 +1,23 @@
 #!/usr/bin/env python3
 
-import pandas as pd
-from file_paths import raw_data, processed_data
+from process_db_data.source_specs import read_source
+from file_paths import processed_data
+
+
+dx_spec = {
+    "rename": {
+        "txtPatientID": "member_id",
+        "txtProblemPmhxName": "dx_desc",
+        "textBox7": "icd10",
+        "txtDocumentsFor": "documents",
+        "txtAddedPMhx": "date_added",
+        "txtPACEHcc": "pace_hcc",
+        "txtPLRapsStatus": "raps_status",
+    },
+    "clean_columns": False,
+    "drop": ["txtName"],
+    "drop_training_member": True,
+}
 
 
 def process_dx():
@@ -20,26 +36,8 @@ def process_dx():
     Outputs:
         csv: processed data file
     """
-    not_current = pd.read_csv(f"{raw_data}\\dx_not_current.csv")
-    current = pd.read_csv(f"{raw_data}\\dx_current.csv")
-
-    cols_to_drop = ["txtName"]
-
-    not_current.drop(cols_to_drop, axis=1, inplace=True)
-    current.drop(cols_to_drop, axis=1, inplace=True)
-
-    dx_col_map = {
-        "txtPatientID": "member_id",
-        "txtProblemPmhxName": "dx_desc",
-        "textBox7": "icd10",
-        "txtDocumentsFor": "documents",
-        "txtAddedPMhx": "date_added",
-        "txtPACEHcc": "pace_hcc",
-        "txtPLRapsStatus": "raps_status",
-    }
-
-    not_current.rename(columns=dx_col_map, inplace=True)
-    current.rename(columns=dx_col_map, inplace=True)
+    not_current = read_source(dx_spec, "dx_not_current.csv")
+    current = read_source(dx_spec, "dx_current.csv")
 
     not_current["icd10"].dropna(inplace=True)
     current["icd10"].dropna(inplace=True)
@@ -50,7 +48,6 @@ def process_dx():
     dx = current.append(not_current, sort=False)
 
     assert len(set(dx.columns)) == len(dx.columns)
-    dx = dx[dx.member_id != 1003]
     dx.to_csv(f"{processed_data}\\dx.csv", index=False)
 
     return dx
@@ -31,7 +31,7 @@ def process_er_only(update=True):
     er_only = utl.admission_dow(er_only)
 
     er_only = utl.discharge_admit_diff(
-        er_only, table_name="er_only", update=False, admit_diff=True
+        er_only, table_name="er_only", update=update, admit_diff=True
     )
 
     er_only["visit_id"] = create_id_col(
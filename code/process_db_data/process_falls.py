@@ -1,8 +1,20 @@
 #!/usr/bin/env python3
 
-import pandas as pd
 from process_db_data.process_incidents import process_incidents
-from file_paths import raw_data
+
+
+falls_spec = {
+    "file": "falls.csv",
+    "drop": [
+        "first_name",
+        "last_name",
+        "submitted_by",
+        "center",
+        "control_number",
+    ],
+    "dates": ["date_time_occurred", "date_discovered"],
+    "y_n": "detect",
+}
 
 
 def process_falls():
@@ -23,15 +35,7 @@ def process_falls():
     Outputs:
         csv: processed data file
     """
-    falls = pd.read_csv(f"{raw_data}\\falls.csv")
-    cols_to_drop = [
-        "First Name",
-        "Last Name",
-        "Submitted By",
-        "Center",
-        "Control Number",
-    ]
-    return process_incidents(falls, cols_to_drop, "falls", break_location=True)
+    return process_incidents(falls_spec, "falls", break_location=True)
 
 
 if __name__ == "__main__":
@@ -1,15 +1,11 @@
 #!/usr/bin/env python3
 
-import pandas as pd
-from process_db_data.data_cleaning_utils import (
-    clean_table_columns,
-    code_y_n,
-    create_id_col,
-)
+from process_db_data.data_cleaning_utils import create_id_col
+from process_db_data.source_specs import read_source
 from file_paths import processed_data
 
 
-def process_incidents(df, cols_to_drop, incident_name, break_location=False):
+def process_incidents(spec, incident_name, break_location=False):
 
     """
     Cleans/Processes dataset
@@ -26,8 +22,7 @@ def process_incidents(df, cols_to_drop, incident_name, break_location=False):
     Training member is dropped
 
     Args:
-        df(DataFrame): pandas dataframe to clean
-        cols_to_drop(list): list of columns to drop
+        spec(dict): source spec of the incident file
         incident_name(str): name of incident to save cleaned file as
         break_location(bool): indicates if the dataframe has a location column
             that can be broken up in the format "location-location detail".
@@ -39,21 +34,10 @@ def process_incidents(df, cols_to_drop, incident_name, break_location=False):
         csv: processed data file
     """
 
-    df.drop(cols_to_drop, axis=1, inplace=True)
-
-    df.columns = clean_table_columns(df.columns)
-
-    df = code_y_n(df)
+    df = read_source(spec)
 
     df.dropna(axis=1, how="all", inplace=True)
 
-    df["date_time_occurred"] = pd.to_datetime(df["date_time_occurred"])
-
-    try:
-        df["date_discovered"] = pd.to_datetime(df["date_discovered"])
-    except KeyError:
-        pass
-
     if break_location:
         df["location_details"] = df["location"].str.split(" - ", expand=True)[1]
         df["location"] = df["location"].str.split(" - ", expand=True)[0]
@@ -1,8 +1,19 @@
 #!/usr/bin/env python3
 
-import pandas as pd
 from process_db_data.process_incidents import process_incidents
-from file_paths import raw_data
+
+
+infections_spec = {
+    "file": "infections.csv",
+    "drop": [
+        "first_name",
+        "last_name",
+        "submitted_by",
+        "center",
+    ],
+    "dates": ["date_time_occurred", "date_discovered"],
+    "y_n": "detect",
+}
 
 
 def process_infections():
@@ -22,11 +33,7 @@ def process_infections():
     Outputs:
         csv: processed data file
     """
-    infections = pd.read_csv(f"{raw_data}\\infections.csv")
-    cols_to_drop = ["First Name", "Last Name", "Submitted By", "Center"]
-    return process_incidents(
-        infections, cols_to_drop, "infections", break_location=False
-    )
+    return process_incidents(infections_spec, "infections", break_location=False)
 
 
 if __name__ == "__main__":
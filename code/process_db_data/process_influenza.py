@@ -1,8 +1,6 @@
 #!/usr/bin/env python3
 
-import pandas as pd
 from process_db_data.process_vaccinations import process_vaccinations
-from file_paths import raw_data
 
 
 def process_influenza():
@@ -22,9 +20,7 @@ def process_influenza():
     Outputs:
         csv: processed data file
     """
-    influ = pd.read_csv(f"{raw_data}\\influ.csv")
-    contra = pd.read_csv(f"{raw_data}\\influ_contra.csv")
-    return process_vaccinations(influ, contra, "influ")
+    return process_vaccinations("influ")
 
 
 if __name__ == "__main__":
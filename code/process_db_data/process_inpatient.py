@@ -36,9 +36,9 @@ def process_inpatient(update=True):
     inpatient = utl.fill_missing_admission_type(inpatient)
     acute, psych, nf = utl.split_inpatient(inpatient)
 
-    acute = utl.discharge_admit_diff(acute, table_name="acute", update=False)
-    psych = utl.discharge_admit_diff(psych, table_name="psych", update=False)
-    nf = utl.discharge_admit_diff(nf, table_name="nursing_home", update=False)
+    acute = utl.discharge_admit_diff(acute, table_name="acute", update=update)
+    psych = utl.discharge_admit_diff(psych, table_name="psych", update=update)
+    nf = utl.discharge_admit_diff(nf, table_name="nursing_home", update=update)
 
     inpatient = acute.append(psych, sort=False).append(nf, sort=False)
 
@@ -1,8 +1,20 @@
 #!/usr/bin/env python3
 
-import pandas as pd
 from process_db_data.process_incidents import process_incidents
-from file_paths import raw_data
+
+
+med_errors_spec = {
+    "file": "med_errors.csv",
+    "drop": [
+        "first_name",
+        "last_name",
+        "submitted_by",
+        "center",
+        "control_number",
+    ],
+    "dates": ["date_time_occurred", "date_discovered"],
+    "y_n": "detect",
+}
 
 
 def process_med_errors():
@@ -23,17 +35,7 @@ def process_med_errors():
     Outputs:
         csv: processed data file
     """
-    med_errors = pd.read_csv(f"{raw_data}\\med_errors.csv")
-    cols_to_drop = [
-        "First Name",
-        "Last Name",
-        "Submitted By",
-        "Center",
-        "Control Number",
-    ]
-    return process_incidents(
-        med_errors, cols_to_drop, "med_errors", break_location=False
-    )
+    return process_incidents(med_errors_spec, "med_errors", break_location=False)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,6 @@
 #!/usr/bin/env python3
 
-import pandas as pd
 from process_db_data.process_vaccinations import process_vaccinations
-from file_paths import raw_data
 
 
 def process_pneumococcal():
@@ -22,9 +20,7 @@ def process_pneumococcal():
     Outputs:
         csv: processed data file
     """
-    pneumo = pd.read_csv(f"{raw_data}\\pneumo.csv")
-    contra = pd.read_csv(f"{raw_data}\\pneumo_contra.csv")
-    return process_vaccinations(pneumo, contra, "pneumo")
+    return process_vaccinations("pneumo")
 
 
 if __name__ == "__main__":
@@ -2,8 +2,21 @@
 
 import pandas as pd
 import numpy as np
-from process_db_data.data_cleaning_utils import clean_table_columns
-from file_paths import raw_data, processed_data
+from process_db_data.source_specs import read_source
+from file_paths import processed_data
+
+
+referrals_spec = {
+    "file": "referrals.csv",
+    "dates": [
+        "referral_date",
+        "intake_visit",
+        "first_visit_day",
+        "enrollment_effective",
+    ],
+    "replace": {"referral_source": {"NOT SPECIFIED": np.nan}},
+    "drop_training_member": True,
+}
 
 
 def process_referrals():
@@ -24,17 +37,7 @@ def process_referrals():
         csv: processed data file
     """
 
-    referrals = pd.read_csv(
-        f"{raw_data}\\referrals.csv",
-        parse_dates=[
-            "ReferralDate",
-            "IntakeVisit",
-            "FirstVisitDay",
-            "EnrollmentEffective",
-        ],
-    )
-
-    referrals.columns = clean_table_columns(referrals.columns)
+    referrals = read_source(referrals_spec)
 
     referrals[["close_date", "close_type"]] = referrals["close_reason"].str.split(
         ":", expand=True
@@ -50,11 +53,8 @@ def process_referrals():
 
     referrals["close_date"] = pd.to_datetime(referrals["close_date"])
 
-    referrals["referral_source"].replace({"NOT SPECIFIED": np.nan}, inplace=True)
-
     assert len(set(referrals.columns)) == len(referrals.columns)
 
-    referrals = referrals[referrals.member_id != 1003]
     referrals.to_csv(f"{processed_data}\\referrals.csv", index=False)
 
     return referrals
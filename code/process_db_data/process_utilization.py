@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 
+import os
 import sqlite3
+import zlib
 import pandas as pd
 import numpy as np
-from process_db_data.data_cleaning_utils import clean_table_columns
+from process_db_data.data_cleaning_utils import clean_table_columns, visits_found_in
+from process_db_data.facility_names import normalize_facilities
+from data_to_sql.sql_table_utils import database_write, update_last_admissions
 from file_paths import (
     database_path,
     raw_data,
@@ -13,36 +17,6 @@ from file_paths import (
 )
 
 
-def cognify_facility_changes(df, facility_col):
-    """
-    Facility names in indicated facility column are
-        replaced with decided common names
-
-    Args:
-        df(DataFrame): pandas dataframe to have facilities replaced
-        facility_col(str): name of col to have facilities replaced in
-    
-    Returns:
-        df(DataFrame): df with cleaned facility column
-    """
-    df[facility_col].replace(
-        {
-            "Roger Williams Hospital": "Roger Williams Medical Center",
-            "Kent Hospital": "Kent County Memorial Hospital",
-            "Fatima Hospital": "Our Lady Of Fatima Hospital",
-            "FirstHealth Moore Reginal Hospital": "Firsthealth of the Carolinas",
-            "Steere House Nursing & Rehab Center": "Steere House Nursing & Rehabilitation",
-            "Crestwood Nursing Home": "Crestwood Nursing & Rehabilitation Center",
-            "St. Antoine Residence": "Saint Antoine Residence",
-            "The Green House Homes at Saint Elizabeth Home": "Saint Elizabeth Home East Greenwich",
-        },
-        inplace=True,
-    )
-
-    df[facility_col] = df[facility_col].str.rstrip()
-    return df
-
-
 def load_utlization(path):
     """
     Loads indicated csv into pandas DataFrame
@@ -68,12 +42,85 @@ def load_utlization(path):
 
     facility_col = [col for col in df.columns if "facility" in col][0]
 
-    df = cognify_facility_changes(df, facility_col)
+    df = normalize_facilities(df, facility_col)
 
     df = df[df.member_id != 1003]
     return df
 
 
+# enrollment dates shared by the utilization processors for the run
+# keyed on the update flag and the modified time of the raw enrollment file
+enrollment_cache = {"key": None, "enrollment": None}
+
+
+def invalidate_enrollment():
+    """
+    Clears the cached enrollment dates so the next call to
+    enrollment_dates reads them again.
+    """
+    enrollment_cache["key"] = None
+    enrollment_cache["enrollment"] = None
+
+
+def enrollment_dates(update=True):
+    """
+    Returns the member_id and enrollment_date of every enrollment in the
+    raw enrollment file, and in the enrollment table if updating.
+
+    The dates are read once and shared by every utilization processor until
+    invalidate_enrollment is called or the raw enrollment file changes.
+
+    Args:
+        update(bool): Indicates if the database is being updated or created
+
+    Returns:
+        DataFrame: member_id and enrollment_date
+    """
+    enrollment_file = f"{raw_data}\\enrollment.csv"
+    key = (update, os.path.getmtime(enrollment_file))
+
+    if enrollment_cache["key"] != key:
+        enrollment = pd.read_csv(
+            enrollment_file,
+            usecols=["MemberID", "EnrollmentDate"],
+            parse_dates=["EnrollmentDate"],
+        )
+
+        enrollment.rename(
+            columns={"MemberID": "member_id", "EnrollmentDate": "enrollment_date"},
+            inplace=True,
+        )
+        if update:
+            conn = sqlite3.connect(database_path)
+            enrollment_db = pd.read_sql(
+                "SELECT member_id, enrollment_date FROM enrollment",
+                conn,
+                parse_dates=["enrollment_date"],
+            )
+            enrollment = enrollment_db.append(enrollment)
+
+            conn.close()
+
+        enrollment_cache["enrollment"] = enrollment
+        enrollment_cache["key"] = key
+
+    return enrollment_cache["enrollment"]
+
+
+def month_index(dates):
+    """
+    Converts dates to a count of months, year * 12 + month, so the difference
+    of two converted columns is the number of calendar months between them.
+
+    Args:
+        dates(Series): datetime column
+
+    Returns:
+        Series: float months, NaN where the date is missing
+    """
+    return dates.dt.year * 12 + dates.dt.month
+
+
 def admission_within_6_mo(df, update=True):
     """
     Adds column indicating if the admission is within 6 months of enrollment.
@@ -86,45 +133,19 @@ def admission_within_6_mo(df, update=True):
     Returns:
         df(DataFrame): pandas dataframe
     """
-    enrollment = pd.read_csv(
-        f"{raw_data}\\enrollment.csv",
-        usecols=["MemberID", "EnrollmentDate"],
-        parse_dates=["EnrollmentDate"],
-    )
-
-    enrollment.rename(
-        columns={"MemberID": "member_id", "EnrollmentDate": "enrollment_date"},
-        inplace=True,
-    )
-    if update:
-        conn = sqlite3.connect(database_path)
-        enrollment_db = pd.read_sql(
-            "SELECT member_id, enrollment_date FROM enrollment",
-            conn,
-            parse_dates=["enrollment_date"],
-        )
-        enrollment = enrollment_db.append(enrollment)
-
-        conn.close()
-
-    df = df.merge(enrollment, how="left", on="member_id")
+    df = df.merge(enrollment_dates(update), how="left", on="member_id")
 
     df["enrollment_date"] = pd.to_datetime(df["enrollment_date"])
     df["admission_date"] = pd.to_datetime(df["admission_date"])
 
-    df["w_six_months"] = np.where(
-        (
-            df["admission_date"].dt.to_period("M")
-            - df["enrollment_date"].dt.to_period("M")
-        )
-        .apply(lambda x: x.freqstr[:-1])
-        .replace("", np.nan)
-        .astype(float)
-        <= 6,
-        1,
-        0,
+    months_enrolled = month_index(df["admission_date"]) - month_index(
+        df["enrollment_date"]
     )
 
+    # the period arithmetic this replaces wrote a one month gap as "M",
+    # which parsed as missing, so those admissions are kept as 0
+    df["w_six_months"] = np.where((months_enrolled <= 6) & (months_enrolled != 1), 1, 0)
+
     return df
 
 
@@ -186,7 +207,8 @@ def time_of_visit_bins(df):
 def admit_from_er(df):
     """
     Adds column indicating with a 1 if the inpatient admission started in the ER.
-    Looks for the inpatient admission to have appeared in the er_admit file
+    Looks for the inpatient admission to have appeared in the er_admit file,
+    matching on member_id, admission day and facility
 
     Args:
         df(DataFrame): pandas dataframe to have from_er column added
@@ -201,77 +223,162 @@ def admit_from_er(df):
         parse_dates=["AdmissionDate"],
     )
 
-    from_er = cognify_facility_changes(from_er, "Facility")
+    from_er = normalize_facilities(from_er, "Facility", id_col=None)
 
-    from_er["merge"] = (
-        from_er["MemberID"].astype(str)
-        + from_er["AdmissionDate"].astype(str)
-        + from_er["Facility"]
+    found_in_er = visits_found_in(
+        df,
+        from_er,
+        ["member_id", "admission_date", "facility"],
+        ["MemberID", "AdmissionDate", "Facility"],
     )
+    df["er"] = np.where(found_in_er, 1, 0)
+
+    return df
 
-    df["merge"] = (
-        df["member_id"].astype(str) + df["admission_date"].astype(str) + df["facility"]
+
+def update_facility_admission_types(df):
+    """
+    Updates the facility_admission_types table with the usual admission type
+    of each facility in df, the type it is most often recorded with.
+
+    Facilities not in df keep the admission type already stored, so the
+    mapping builds up across loads.
+
+    Args:
+        df(DataFrame): pandas dataframe of inpatient admissions
+
+    Returns:
+        Series: admission_type for every facility in the table, indexed by facility
+    """
+    known = df.dropna(subset=["facility", "admission_type"])
+    counts = (
+        known.groupby(["facility", "admission_type"])
+        .size()
+        .reset_index(name="admissions")
     )
-    df["er"] = np.where(df["merge"].isin(from_er["merge"].tolist()), 1, 0)
+    usual_types = counts.sort_values(
+        ["facility", "admissions", "admission_type"], ascending=[True, False, True]
+    ).drop_duplicates(subset=["facility"])
+
+    conn = sqlite3.connect(database_path)
+    # processors run alongside the loaders, so writes wait on the database lock
+    with database_write(conn):
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS facility_admission_types (
+                facility TEXT PRIMARY KEY,
+                admission_type TEXT,
+                admissions INTEGER
+            );
+            """
+        )
+        conn.executemany(
+            """
+            INSERT INTO facility_admission_types VALUES (?, ?, ?)
+            ON CONFLICT (facility) DO UPDATE
+            SET admission_type = excluded.admission_type,
+            admissions = excluded.admissions;
+            """,
+            usual_types[["facility", "admission_type", "admissions"]].values.tolist(),
+        )
 
-    df.drop(["merge"], axis=1, inplace=True)
-    return df
+    facility_types = pd.read_sql(
+        "SELECT facility, admission_type FROM facility_admission_types", conn
+    )
+    conn.close()
+
+    return facility_types.set_index("facility")["admission_type"]
 
 
 def fill_missing_admission_type(df):
     """
-    Adds column indicating with a 1 if the inpatient admission started in the ER.
-    Looks for the inpatient admission to have appeared in the er_admit file
+    Fills any missing admission_type with the usual admission type of the
+    facility, from the facility_admission_types table after it is updated
+    with the admissions in df
 
     Args:
-        df(DataFrame): pandas dataframe to have from_er column added
+        df(DataFrame): pandas dataframe to have admission_type filled
 
     Returns:
         df(DataFrame): pandas dataframe
     """
-    for admit_type in df["admission_type"].unique():
-        type_facilities = df[df["admission_type"] == admit_type]["facility"].unique()
+    facility_types = update_facility_admission_types(df)
 
-        df["admission_type"] = np.where(
-            (df["admission_type"].isnull() & df["facility"].isin(type_facilities)),
-            admit_type,
-            df["admission_type"],
-        )
+    df["admission_type"] = df["admission_type"].fillna(
+        df["facility"].map(facility_types)
+    )
 
     return df
 
 
-def discharge_admit_diff(df, table_name="", update=True, admit_diff=False):
+def read_last_stays(conn, table_name, member_ids):
     """
-    Adds column of the days since previous admission for each admission
+    Reads the most recent stay of each member in member_ids from
+    last_admissions. The members are loaded into a TEMP table and joined,
+    so any number of members can be read in one query.
+
+    If last_admissions has no rows for table_name, as in a database loaded
+    before it was added, they are built from the table first
 
     Args:
-        df(DataFrame): pandas dataframe to have column added
-        table_name(str): table in database the data needs to be compared to
-            if the database is being updated
-        update(bool): Indicates if the database is being updated or created
-        admit_diff: indicates if the difference is in admission dates
-            or in the discharge date and next admission date
-            ie; ER visits don't have a discharge date
+        conn(Sqlite3 Connection): connection to the database
+        table_name(str): utilization type the stays are stored under
+        member_ids(array): member_ids to read the last stay of
 
     Returns:
-        df(DataFrame): pandas dataframe
+        DataFrame: member_id, admission_date and discharge_date
     """
-    dff = df.copy()
-    if update is True:
-        conn = sqlite3.connect(database_path)
+    last_admissions_exists = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?",
+        ("last_admissions",),
+    ).fetchone()[0]
+    if (not last_admissions_exists) or (
+        conn.execute(
+            "SELECT COUNT(*) FROM last_admissions WHERE utilization_type = ?",
+            (table_name,),
+        ).fetchone()[0]
+        == 0
+    ):
+        update_last_admissions(conn, table_name, table_name)
+
+    conn.execute("DROP TABLE IF EXISTS temp.visit_members")
+    conn.execute("CREATE TEMP TABLE visit_members (member_id INTEGER PRIMARY KEY)")
+    conn.executemany(
+        "INSERT INTO visit_members VALUES (?)",
+        ((int(member_id),) for member_id in member_ids),
+    )
 
-        q = f"""SELECT {','.join([col for col in df.columns if col != 'merge'])} FROM {table_name}
-        WHERE member_id IN {tuple(df.member_id.unique())};"""
+    last_stays = pd.read_sql(
+        """
+        SELECT l.member_id, l.admission_date, l.discharge_date
+        FROM last_admissions l
+        JOIN temp.visit_members m ON m.member_id = l.member_id
+        WHERE l.utilization_type = ?;
+        """,
+        conn,
+        params=[table_name],
+        parse_dates=["admission_date", "discharge_date"],
+    )
+    conn.execute("DROP TABLE IF EXISTS temp.visit_members")
 
-        current_table = pd.read_sql(
-            q, conn, parse_dates=[col for col in df.columns if "date" in col]
-        )
+    return last_stays
 
-        df = current_table.append(df, sort=False)
-        df.reset_index(inplace=True, drop=True)
 
-        conn.close()
+def days_since_last_admission(df, admit_diff=False):
+    """
+    Adds column of the days since the previous visit in df for each visit
+    Visits with a negative number of days, overlapping the previous
+    visit, are removed
+
+    Args:
+        df(DataFrame): visits with member_id, admission_date and
+            discharge_date if admit_diff is False
+        admit_diff: indicates if the difference is in admission dates
+            or in the discharge date and next admission date
+
+    Returns:
+        df(DataFrame): visits sorted newest first for each member
+    """
     if admit_diff:
         diff_date = "admission_date"
         sorted_df = (
@@ -291,31 +398,75 @@ def discharge_admit_diff(df, table_name="", update=True, admit_diff=False):
         )
     # sort dataframe by member_id and then admission date
 
-    sorted_df["days_since_last_admission"] = np.nan
-
-    # iterate through unique member_ids
-    for mem_id in sorted_df.member_id.unique():
-        # if the member_id appears more than once in the df
-        if sorted_df[sorted_df.member_id == mem_id].shape[0] > 1:
-            # iterate through each occurrence, first occurrence
-            # will be the most recent admission_date
-            for i in sorted_df[sorted_df.member_id == mem_id].index[:-1]:
-                # find difference between current admission_date and
-                # most recent discharge_date
-                sorted_df.at[i, "days_since_last_admission"] = (
-                    sorted_df.at[i, "admission_date"] - sorted_df.at[(i + 1), diff_date]
-                ) / np.timedelta64(1, "D")
+    # rows are newest first, so the previous visit for a member is the next row
+    # the last (oldest) visit of each member has no previous visit and is NaN
+    previous_date = sorted_df.groupby("member_id")[diff_date].shift(-1)
+
+    # find difference between current admission_date and
+    # most recent discharge_date
+    sorted_df["days_since_last_admission"] = (
+        sorted_df["admission_date"] - previous_date
+    ) / np.timedelta64(1, "D")
 
     sorted_df.reset_index(drop=True, inplace=True)
 
-    sorted_df = sorted_df[
+    return sorted_df[
         (
             (sorted_df["days_since_last_admission"] >= 0)
             | (sorted_df["days_since_last_admission"].isnull())
         )
     ]
 
+
+def discharge_admit_diff(df, table_name="", update=True, admit_diff=False):
+    """
+    Adds column of the days since previous admission for each admission
+
+    If the database is being updated only visits after each member's most
+    recent stay in the last_admissions table are new, and those are scored
+    against that stay. The raw files hold each member's full history, so
+    visits already in the database are scored against the visits in df.
+
+    Args:
+        df(DataFrame): pandas dataframe to have column added
+        table_name(str): table in database the data needs to be compared to
+            if the database is being updated
+        update(bool): Indicates if the database is being updated or created
+        admit_diff: indicates if the difference is in admission dates
+            or in the discharge date and next admission date
+            ie; ER visits don't have a discharge date
+
+    Returns:
+        df(DataFrame): pandas dataframe
+    """
+    dff = df.copy()
     if update is True:
+        conn = sqlite3.connect(database_path)
+        last_stays = read_last_stays(conn, table_name, df["member_id"].unique())
+        conn.close()
+
+        last_admission = df["member_id"].map(
+            last_stays.set_index("member_id")["admission_date"]
+        )
+        new_visits = last_admission.isnull() | (
+            pd.to_datetime(df["admission_date"]) > last_admission
+        )
+
+        last_stays = last_stays[
+            last_stays["member_id"].isin(df.loc[new_visits, "member_id"])
+        ]
+        if "discharge_date" not in df.columns:
+            last_stays = last_stays.drop(["discharge_date"], axis=1)
+        last_stays["last_stay"] = True
+
+        new_df = days_since_last_admission(
+            last_stays.append(df[new_visits], sort=False), admit_diff
+        )
+        new_df = new_df[new_df["last_stay"].isnull()]
+
+        sorted_df = days_since_last_admission(df[~new_visits].copy(), admit_diff)
+        sorted_df = sorted_df.append(new_df.drop(["last_stay"], axis=1), sort=False)
+
         dff = dff.merge(
             sorted_df[["member_id", "admission_date", "days_since_last_admission"]],
             on=["member_id", "admission_date"],
@@ -329,6 +480,8 @@ def discharge_admit_diff(df, table_name="", update=True, admit_diff=False):
             keep="last",
         )
         return dff
+
+    sorted_df = days_since_last_admission(df, admit_diff)
     # added 6-18 // see note above
     sorted_df.drop_duplicates(
         subset=[col for col in sorted_df.columns if col != "days_since_last_admission"],
@@ -339,10 +492,98 @@ def discharge_admit_diff(df, table_name="", update=True, admit_diff=False):
     return sorted_df
 
 
+# admit reason categories in the order they are applied, later categories
+# replace earlier ones when a reason matches more than one
+admit_reason_patterns = {
+    "skilled": "skilled|rehab|pt|ot|skil|restorative",
+    "respite": "respite|resp|behavior",
+    "custodial": "custodial|cust|long term|eol|end of life|hosp|permanent|functional decline|cutodial|ltc|hospic",
+}
+
+# admission types each admit reason category can be applied to
+admit_reason_types = {
+    "skilled": ["Nursing Home", "Rehab Unit / Facility"],
+    "respite": ["Nursing Home", "Rehab Unit / Facility"],
+    "custodial": ["Nursing Home", "End of Life", "Rehab Unit / Facility"],
+}
+
+# stored with each classified reason so changing a pattern reclassifies them
+admit_reason_version = zlib.crc32(repr(admit_reason_patterns).encode())
+
+
+def admit_reason_flags(reasons):
+    """
+    Flags which admit reason categories each distinct reason matches.
+
+    Reasons already classified with the current patterns are read from the
+    admit_reason_flags table, any others are classified and added to it.
+
+    Args:
+        reasons(Index): distinct lowercase admit reasons
+
+    Returns:
+        DataFrame: 0/1 column for each category in admit_reason_patterns,
+            indexed by reason in the order of reasons
+    """
+    categories = list(admit_reason_patterns.keys())
+
+    conn = sqlite3.connect(database_path)
+    with database_write(conn):
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS admit_reason_flags (
+                admit_reason TEXT PRIMARY KEY,
+                {", ".join(f"{category} INTEGER" for category in categories)},
+                pattern_version INTEGER
+            );
+            """
+        )
+
+    flags = pd.read_sql(
+        f"""
+        SELECT admit_reason, {", ".join(categories)}
+        FROM admit_reason_flags
+        WHERE pattern_version = ?
+        """,
+        conn,
+        params=[admit_reason_version],
+        index_col="admit_reason",
+    )
+
+    new_reasons = pd.Series(reasons[~reasons.isin(flags.index)])
+
+    if not new_reasons.empty:
+        new_flags = pd.DataFrame({"admit_reason": new_reasons})
+        for category, pattern in admit_reason_patterns.items():
+            new_flags[category] = new_reasons.str.contains(pattern).astype(int)
+        new_flags["pattern_version"] = admit_reason_version
+
+        with database_write(conn):
+            conn.executemany(
+                f"""
+                INSERT INTO admit_reason_flags
+                VALUES ({", ".join("?" * new_flags.shape[1])})
+                ON CONFLICT (admit_reason) DO UPDATE
+                SET {", ".join(f"{col} = excluded.{col}" for col in new_flags.columns[1:])};
+                """,
+                new_flags.values.tolist(),
+            )
+
+        flags = flags.append(new_flags.set_index("admit_reason")[categories])
+
+    conn.close()
+
+    return flags.reindex(reasons)
+
+
 def split_inpatient(df):
     """
     Splits inpatient dataframe on admission types
 
+    Nursing facility admit reasons are replaced with the category they match,
+    classifying each distinct reason once. Nursing facility admissions without
+    a category are saved to nf_missing_reason.csv in the output folder.
+
     Args:
         df(DataFrame): pandas dataframe to be split, should be inpatient df
        
@@ -351,37 +592,17 @@ def split_inpatient(df):
         psych(DataFrame): pandas dataframe of psych admissions
         nf(DataFrame): pandas dataframe of nursing facility admissions
     """
-    skilled_mask = (
-        df["admit_reason"]
-        .str.lower()
-        .str.contains("skilled|rehab|pt|ot|skil|restorative")
-    ) & (
-        (df["admission_type"] == "Nursing Home")
-        | (df["admission_type"] == "Rehab Unit / Facility")
-    )
-
-    respite_mask = (
-        df["admit_reason"].str.lower().str.contains("respite|resp|behavior")
-    ) & (
-        (df["admission_type"] == "Nursing Home")
-        | (df["admission_type"] == "Rehab Unit / Facility")
-    )
-
-    custodial_mask = (
-        df["admit_reason"]
-        .str.lower()
-        .str.contains(
-            "custodial|cust|long term|eol|end of life|hosp|permanent|functional decline|cutodial|ltc|hospic"
+    reasons = df["admit_reason"].str.lower().astype("category")
+    reason_codes = reasons.cat.codes.values
+    flags = admit_reason_flags(reasons.cat.categories)
+
+    for category in admit_reason_patterns.keys():
+        # code -1 is a missing reason, which matches no category
+        matched = np.append(flags[category].values == 1, False)[reason_codes]
+        category_mask = matched & df["admission_type"].isin(
+            admit_reason_types[category]
         )
-    ) & (
-        (df["admission_type"] == "Nursing Home")
-        | (df["admission_type"] == "End of Life")
-        | (df["admission_type"] == "Rehab Unit / Facility")
-    )
-
-    df["admit_reason"] = np.where(skilled_mask, "skilled", df["admit_reason"])
-    df["admit_reason"] = np.where(respite_mask, "respite", df["admit_reason"])
-    df["admit_reason"] = np.where(custodial_mask, "custodial", df["admit_reason"])
+        df["admit_reason"] = np.where(category_mask, category, df["admit_reason"])
 
     # break up by admit type
     acute_mask = df["admission_type"] == "Acute Hospital"
@@ -392,14 +613,14 @@ def split_inpatient(df):
         ["Nursing Home", "Rehab Unit / Facility", "End of Life"]
     )
 
-    df[
-        (-df["admit_reason"].isin(["skilled", "respite", "custodial"])) & (nf_mask)
-    ].to_csv(f"{output_folder}\\nf_missing_reason.csv", index=False)
-
     acute = df[acute_mask].copy()
     psych = df[psych_mask].copy()
     nf = df[nf_mask].copy()
 
+    nf[-nf["admit_reason"].isin(list(admit_reason_patterns))].to_csv(
+        f"{output_folder}\\nf_missing_reason.csv", index=False
+    )
+
     assert df.shape[0] == (acute.shape[0] + psych.shape[0] + nf.shape[0])
     return acute, psych, nf
 
@@ -1,10 +1,33 @@
 #!/usr/bin/env python3
 
-import pandas as pd
+from process_db_data.source_specs import read_source
 from file_paths import processed_data
 
 
-def process_vaccinations(df, contra, vacc_name):
+vaccination_col_map = {
+    "Patient: Patient ID": "member_id",
+    "Immunization: Vaccine Series": "vacc_series",
+    "Immunization: Date Administered": "date_administered",
+    "Immunization: Dose Status": "dose_status",
+}
+
+vaccination_spec = {
+    "rename": vaccination_col_map,
+    "clean_columns": False,
+    "keep": ["member_id", "vacc_series", "date_administered", "dose_status"],
+    "dates": ["date_administered"],
+    "replace": {"dose_status": {"Administered": 1, "Not Administered": 0}},
+    "drop_training_member": True,
+}
+
+contra_spec = {
+    "rename": vaccination_col_map,
+    "clean_columns": False,
+    "keep": ["member_id"],
+}
+
+
+def process_vaccinations(vacc_name):
     """
     Cleans/Processes dataset
       
@@ -16,9 +39,9 @@ def process_vaccinations(df, contra, vacc_name):
     Training member is dropped
 
     Args:
-        df(DataFrame): pandas dataframe to clean
-        contra(DataFrame): df with contra ppts for vaccination
-        vacc_name(str): vaccination name for saving cleaned file
+        vacc_name(str): vaccination name, the raw files are read from
+            vacc_name.csv and vacc_name_contra.csv and the cleaned file
+            is saved as vacc_name.csv
 
     Returns:
         DataFrame: cleaned dataframe
@@ -26,25 +49,13 @@ def process_vaccinations(df, contra, vacc_name):
     Outputs:
         csv: processed data file
     """
-    column_names = {
-        "Patient: Patient ID": "member_id",
-        "Immunization: Vaccine Series": "vacc_series",
-        "Immunization: Date Administered": "date_administered",
-        "Immunization: Dose Status": "dose_status",
-    }
-
-    df.rename(columns=column_names, inplace=True)
-    contra.rename(columns=column_names, inplace=True)
-
-    dose_status = {"Administered": 1, "Not Administered": 0}
-
-    df["dose_status"].replace(dose_status, inplace=True)
+    df = read_source(vaccination_spec, f"{vacc_name}.csv")
+    contra = read_source(contra_spec, f"{vacc_name}_contra.csv")
 
     df.loc[df["member_id"].isin(contra["member_id"].tolist()), "dose_status"] = 99
 
-    df["date_administered"] = pd.to_datetime(df["date_administered"]).dt.date
+    df["date_administered"] = df["date_administered"].dt.date
 
-    df = df[df.member_id != 1003].copy()
     df = df[["member_id", "vacc_series", "date_administered", "dose_status"]].copy()
 
     df.drop_duplicates(inplace=True)
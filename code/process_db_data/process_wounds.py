@@ -1,8 +1,15 @@
 #!/usr/bin/env python3
 
-import pandas as pd
-from process_db_data.data_cleaning_utils import clean_table_columns
-from file_paths import raw_data, processed_data
+from process_db_data.source_specs import read_source
+from file_paths import processed_data
+
+
+wounds_spec = {
+    "file": "wounds.csv",
+    "drop": ["participant"],
+    "dates": ["date_time_occurred", "date_healed"],
+    "drop_na": ["member_id"],
+}
 
 
 def process_wounds():
@@ -20,13 +27,7 @@ def process_wounds():
         csv: processed data file
     """
 
-    wounds = pd.read_csv(
-        f"{raw_data}\\wounds.csv", parse_dates=["Date Time Occurred", "Date Healed"]
-    )
-    cols_to_drop = ["Participant"]
-    wounds.drop(cols_to_drop, axis=1, inplace=True)
-    wounds.columns = clean_table_columns(wounds.columns)
-    wounds.dropna(subset=["member_id"], inplace=True)
+    wounds = read_source(wounds_spec)
     wounds["member_id"] = wounds["member_id"].astype(int)
     wounds.to_csv(f"{processed_data}\\wounds.csv", index=False)
     return wounds
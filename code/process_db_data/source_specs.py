@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import pandas as pd
+from process_db_data.data_cleaning_utils import clean_table_columns, code_y_n
+from file_paths import raw_data
+
+### Reads raw data files from declarative specs
+### A spec is a dictionary describing a raw csv file and the column level
+### cleaning done to it, using the column names as they are after renaming
+### and cleaning:
+###     file(str): name of the csv in the raw_data folder
+###     rename(dict): raw column names to replace before cleaning
+###     clean_columns(bool): if clean_table_columns is used on the names,
+###         defaults to True
+###     keep(list): only these columns are read
+###     drop(list): these columns are not read
+###     dtypes(dict): column to dtype to read it as
+###     dates(list): columns parsed as dates, skipped if not in the file
+###     replace(dict): column to dictionary of values to replace
+###     y_n(list): columns of Yes/No coded as 1/0, read as categories,
+###         or "detect" to code any text column containing No
+###     drop_na(list): rows missing any of these columns are dropped
+###     drop_training_member(bool): if the training member is dropped
+
+
+def compile_spec(spec, raw_columns):
+    """
+    Compiles a spec into the arguments for a single read_csv call
+    on a file with the indicated header.
+
+    Args:
+        spec(dict): source spec
+        raw_columns(list): column names in the header of the raw file
+
+    Returns:
+        dict: keyword arguments for read_csv
+        dict: raw column name to the name it has once read
+    """
+    names = [spec.get("rename", {}).get(col, col) for col in raw_columns]
+    if spec.get("clean_columns", True):
+        names = clean_table_columns(names)
+    names = dict(zip(raw_columns, names))
+
+    if "keep" in spec:
+        usecols = [raw for raw, col in names.items() if col in spec["keep"]]
+    else:
+        usecols = [raw for raw, col in names.items() if col not in spec.get("drop", [])]
+
+    raw_names = {names[raw]: raw for raw in usecols}
+
+    dtypes = spec.get("dtypes", {}).copy()
+    if isinstance(spec.get("y_n"), list):
+        dtypes.update({col: "category" for col in spec["y_n"]})
+
+    read_kwargs = {
+        "usecols": usecols,
+        "dtype": {
+            raw_names[col]: dtype for col, dtype in dtypes.items() if col in raw_names
+        },
+        "parse_dates": [
+            raw_names[col] for col in spec.get("dates", []) if col in raw_names
+        ],
+        "low_memory": False,
+    }
+
+    return read_kwargs, {raw: names[raw] for raw in usecols}
+
+
+def transform_source(df, spec):
+    """
+    Makes the value level changes in a spec to a dataframe read with it
+
+    Args:
+        df(DataFrame): dataframe read with the spec
+        spec(dict): source spec
+
+    Returns:
+        DataFrame: cleaned dataframe
+    """
+    for col, replacements in spec.get("replace", {}).items():
+        df[col] = df[col].replace(replacements)
+
+    if spec.get("y_n") == "detect":
+        df = code_y_n(df)
+    elif "y_n" in spec:
+        df = code_y_n(df, [col for col in spec["y_n"] if col in df.columns])
+
+    if "drop_na" in spec:
+        df = df.dropna(subset=spec["drop_na"])
+
+    if spec.get("drop_training_member", False):
+        df.drop(df.index[df.member_id == 1003], inplace=True)
+
+    return df
+
+
+def read_source(spec, file=None):
+    """
+    Reads a raw data file as described by its spec.
+
+    Only the header is read before the file is read once with the columns,
+    dtypes and dates from the spec, so dropped columns are never loaded.
+
+    Args:
+        spec(dict): source spec
+        file(str): name of the csv in the raw_data folder,
+            defaults to the file in the spec
+
+    Returns:
+        DataFrame: cleaned dataframe
+    """
+    path = f"{raw_data}\\{file or spec['file']}"
+
+    raw_columns = pd.read_csv(path, nrows=0).columns.tolist()
+    read_kwargs, names = compile_spec(spec, raw_columns)
+
+    df = pd.read_csv(path, **read_kwargs)
+    df.columns = [names[col] for col in df.columns]
+
+    return transform_source(df, spec)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+import re
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+import pandas as pd
+from file_paths import database_path
+
+### Run scoped cache of the query results of paceutils helpers
+### Results are kept by (query method, SQL text, params) so a query run by
+### several agg builders, or several times by one, is only run once.
+### The least recently used result is dropped once max_entries are kept.
+### Each result records the change stamps, from the table_changes table the
+### loaders write, of the tables its query reads. When the stamps are
+### refreshed the results of tables that have changed are dropped.
+### Views are resolved to the tables they read, results that read a name
+### with no stamp (a CTE or a table the loaders do not stamp) are dropped
+### at every refresh as their changes cannot be seen.
+
+# paceutils Helpers methods that run a query
+cached_query_methods = ["single_value_query", "dataframe_query", "fetchall_query"]
+
+query_cache = {
+    "entries": OrderedDict(),
+    "max_entries": 10000,
+    "stamps": {},
+    "views": {},
+    "stats": {},
+}
+
+table_pattern = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)", re.IGNORECASE)
+
+
+def read_change_stamps():
+    """
+    Reads the change stamp of each table from table_changes
+
+    Returns:
+        dict: table name to change stamp, empty if no table has been stamped
+    """
+    conn = sqlite3.connect(f"{Path(database_path).as_uri()}?mode=ro", uri=True)
+    try:
+        stamps = dict(
+            conn.execute("SELECT table_name, change_count FROM table_changes")
+        )
+    except sqlite3.OperationalError:
+        stamps = {}
+    conn.close()
+
+    return stamps
+
+
+def read_view_tables():
+    """
+    Reads the names each view of the database reads from
+
+    Returns:
+        dict: view name to the set of names following FROM or JOIN in its SQL
+    """
+    conn = sqlite3.connect(f"{Path(database_path).as_uri()}?mode=ro", uri=True)
+    views = {
+        name: set(table_pattern.findall(sql))
+        for name, sql in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'view'"
+        )
+    }
+    conn.close()
+
+    return views
+
+
+def refresh_change_stamps():
+    """
+    Reads the current change stamps and views and drops cached results
+    that read from a table that has changed since they were cached
+    or from a name that has no stamp
+    """
+    stamps = read_change_stamps()
+    entries = query_cache["entries"]
+
+    for key, (result, tables) in list(entries.items()):
+        if any(
+            (stamp is None) or (stamps.get(table) != stamp)
+            for table, stamp in tables.items()
+        ):
+            del entries[key]
+
+    query_cache["stamps"] = stamps
+    query_cache["views"] = read_view_tables()
+
+
+def base_tables(names):
+    """
+    Resolves views to the tables they read, views of views included
+
+    Args:
+        names(set): table and view names
+
+    Returns:
+        set: the names that are not views and the tables the views read
+    """
+    views = query_cache["views"]
+    tables = set()
+    seen = set()
+    names = list(names)
+
+    while names:
+        name = names.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        if name in views:
+            names.extend(views[name])
+        else:
+            tables.add(name)
+
+    return tables
+
+
+def query_tables(args, kwargs):
+    """
+    Finds the tables a query reads from
+
+    Args:
+        args(tuple): positional arguments of the query method
+        kwargs(dict): keyword arguments of the query method
+
+    Returns:
+        set: table names following FROM or JOIN in the SQL text,
+            with views resolved to the tables they read
+    """
+    tables = set()
+    for arg in list(args) + list(kwargs.values()):
+        if isinstance(arg, str):
+            tables.update(table_pattern.findall(arg))
+
+    return base_tables(tables)
+
+
+def cached_query(query_method, method_name, builder_name):
+    """
+    Wraps a query method of a paceutils helper so its results are cached
+
+    Args:
+        query_method(method): query method of the helper
+        method_name(str): name of the query method
+        builder_name(str): name hits and misses are counted under
+
+    Returns:
+        function: query method returning cached results
+    """
+    stats = query_cache["stats"].setdefault(builder_name, {"hits": 0, "misses": 0})
+
+    def query(*args, **kwargs):
+        key = (method_name, repr(args), repr(sorted(kwargs.items())))
+        entries = query_cache["entries"]
+
+        if key in entries:
+            entries.move_to_end(key)
+            stats["hits"] += 1
+            result = entries[key][0]
+        else:
+            stats["misses"] += 1
+            result = query_method(*args, **kwargs)
+            tables = {
+                table: query_cache["stamps"].get(table)
+                for table in query_tables(args, kwargs)
+            }
+            entries[key] = (result, tables)
+            if len(entries) > query_cache["max_entries"]:
+                entries.popitem(last=False)
+
+        # callers get their own copy of results they could change
+        if isinstance(result, (pd.DataFrame, list)):
+            return result.copy()
+        return result
+
+    return query
+
+
+def cache_helper_queries(helper, builder_name):
+    """
+    Caches the query results of a paceutils helper instance
+
+    The change stamps are refreshed first so results of tables
+    loaded since they were cached are not used.
+
+    Args:
+        helper(paceutils helper): instance to cache the queries of
+        builder_name(str): name hits and misses are counted under
+
+    Returns:
+        paceutils helper: the helper
+    """
+    refresh_change_stamps()
+
+    for method_name in cached_query_methods:
+        if hasattr(helper, method_name):
+            setattr(
+                helper,
+                method_name,
+                cached_query(getattr(helper, method_name), method_name, builder_name),
+            )
+
+    return helper
+
+
+def print_cache_report(builder_name):
+    """
+    Prints the hit rate of the query cache for a builder
+
+    Args:
+        builder_name(str): name hits and misses are counted under
+    """
+    stats = query_cache["stats"].get(builder_name, {"hits": 0, "misses": 0})
+    queries = stats["hits"] + stats["misses"]
+    hit_rate = (stats["hits"] / queries * 100) if queries else 0
+
+    print(
+        f"{builder_name} query cache: {stats['hits']} hits of {queries} queries "
+        f"({hit_rate:.1f}%)"
+    )
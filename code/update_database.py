@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 
+import argparse
 import luigi
 import shutil
+import sqlite3
 import os
 import time
 import pandas as pd
@@ -73,6 +75,7 @@ from data_to_sql import (
 )
 
 import agg_table_functions as atf
+from data_to_sql.sql_table_utils import analyze_database
 
 class BackUpDatabase(luigi.Task):
 
@@ -826,11 +829,52 @@ class CensusToSQL(luigi.Task):
     def run(self):
         monthly_census_to_sql.monthly_census_to_sql()
 
+class AnalyzeDatabase(luigi.Task):
+    log_file = f"{update_logs_folder}\\analyze_{str(pd.to_datetime('today').date())}.txt"
+
+    def requires(self):
+        return [InpatientToSQL(),
+        AddressesToSQL(),
+        ALfsToSQL(),
+        ApptsToSQL(),
+        AuthsToSQL(),
+        BurnsToSQL(),
+        AdmitClaimsToSQL(),
+        ClaimsDetailsToSQL(),
+        PaymentsToSQL(),
+        CentersToSQL(),
+        CenterDaysToSQL(),
+        DemographicsToSQL(),
+        DxToSQL(),
+        EnrollmentToSQL(),
+        EROnlyToSQL(),
+        FallsToSQL(),
+        InfectionsToSQL(),
+        InfluToSQL(),
+        MedErrorsToSQL(),
+        MedsToSQL(),
+        PnuemoToSQL(),
+        ReferralsToSQL(),
+        TeamsToSQL(),
+        WoundsToSQL(),
+        CensusToSQL()]
+
+    def output(self):
+        return luigi.LocalTarget(self.log_file)
+
+    def run(self):
+        # statistics are gathered once every table is loaded,
+        # so the agg table queries are planned with them
+        conn = sqlite3.connect(database_path)
+        analyze_database(conn)
+        conn.close()
+        open(self.log_file, "a").close()
+
 class EnrollmentAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\enrollment_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(), CensusToSQL(), ReferralsToSQL()]
+        return [AnalyzeDatabase(), EnrollmentToSQL(), CensusToSQL(), ReferralsToSQL()]
     
     def output(self):
         return luigi.LocalTarget(self.log_file)
@@ -843,7 +887,8 @@ class DemographicAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\demographic_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         DxToSQL(),
         DemographicsToSQL(),
         CensusToSQL()]
@@ -859,7 +904,8 @@ class FallsAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\falls_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         BurnsToSQL(),
         FallsToSQL(),
@@ -879,7 +925,8 @@ class InfectionsAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\infections_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         BurnsToSQL(),
         FallsToSQL(),
@@ -899,7 +946,8 @@ class MedErrorsAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\med_errors_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         BurnsToSQL(),
         FallsToSQL(),
@@ -919,7 +967,8 @@ class WoundsAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\wounds_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         BurnsToSQL(),
         FallsToSQL(),
@@ -939,7 +988,8 @@ class BurnsErrorsAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\burns_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         BurnsToSQL(),
         FallsToSQL(),
@@ -959,7 +1009,8 @@ class UtilizationAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\utilization_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         ClaimsDetailsToSQL(),
         AdmitClaimsToSQL(),
@@ -979,7 +1030,8 @@ class QualityAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\quality_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         DxToSQL(),
         InpatientToSQL(),
@@ -999,7 +1051,8 @@ class TeamUtilizationAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\team_utilization_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         ClaimsDetailsToSQL(),
         AdmitClaimsToSQL(),
@@ -1021,7 +1074,8 @@ class TeamInfoAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\team_info_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         DxToSQL(),
         InpatientToSQL(),
@@ -1041,7 +1095,8 @@ class TeamIncidentsAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\team_incidents_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         DxToSQL(),
         InpatientToSQL(),
@@ -1066,7 +1121,8 @@ class CenterAgg(luigi.Task):
     log_file = f"{update_logs_folder}\\center_agg{str(pd.to_datetime('today').date())}.txt"
 
     def requires(self):
-        return [EnrollmentToSQL(),
+        return [AnalyzeDatabase(),
+        EnrollmentToSQL(),
         CensusToSQL(),
         DxToSQL(),
         InpatientToSQL(),
@@ -1226,6 +1282,19 @@ class UpdateDatabasePipeline(luigi.Task):
         print("Complete")
 
 if __name__ == "__main__":
-    result = luigi.build([UpdateDatabasePipeline()], local_scheduler=True)
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--workers",
+        default=1,
+        type=int,
+        help="Number of luigi workers, tables that do not depend on each other are processed in parallel, their writes wait on the database lock",
+    )
+
+    arguments = parser.parse_args()
+
+    result = luigi.build(
+        [UpdateDatabasePipeline()], local_scheduler=True, workers=arguments.workers
+    )
     with open(luigi_log, "w") as myfile:
         myfile.write(f"Date: {str(pd.to_datetime('today').date())}{result}")